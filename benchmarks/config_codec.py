@@ -0,0 +1,48 @@
+"""Benchmark parsing and serializing of full configurations
+
+Run from the repository root:
+
+```
+PYTHONPATH=src python benchmarks/config_codec.py
+```
+"""
+import timeit
+
+from microscan.binary import decode_config
+from microscan.binary import encode_config
+from microscan.config import ENUM_TABLES
+from microscan.config import LazyMicroscanConfiguration
+from microscan.config import MicroscanConfiguration
+from microscan.config import Parity
+
+
+NUMBER = 2000
+
+
+def report(name, func, number=NUMBER):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print('%-48s %10.2f us' % (name, seconds * 1e6))
+
+
+def main():
+    config = MicroscanConfiguration()
+    config_strings = config.to_config_string(separator=b'\n').split(b'\n')
+    data = encode_config(config)
+    table = ENUM_TABLES[Parity]
+
+    report('Parity(value)', lambda: Parity(b'2'), number=100000)
+    report('ENUM_TABLES[Parity].decode(value)',
+           lambda: table.decode(b'2'), number=100000)
+    report('MicroscanConfiguration.from_config_strings',
+           lambda: MicroscanConfiguration.from_config_strings(config_strings))
+    report('LazyMicroscanConfiguration.from_config_strings',
+           lambda: LazyMicroscanConfiguration.from_config_strings(
+               config_strings))
+    report('MicroscanConfiguration.to_config_string',
+           config.to_config_string)
+    report('decode_config', lambda: decode_config(data))
+    report('encode_config', lambda: encode_config(config))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark the per-call overhead of the XML-RPC and binary RPC transports
+
+Both servers run in this process and serve an object whose read_barcode()
+returns immediately, so the timings only contain transport overhead. Run
+from the repository root:
+
+```
+PYTHONPATH=src python benchmarks/rpc_overhead.py
+```
+"""
+import os
+import tempfile
+import threading
+import timeit
+from xmlrpc.client import ServerProxy
+from xmlrpc.server import SimpleXMLRPCRequestHandler
+from xmlrpc.server import SimpleXMLRPCServer
+
+from microscan.rpc import RPCClient
+from microscan.rpc import RPCServer
+
+
+NUMBER = 500
+PIPELINE = 100
+
+
+class Target:
+    def read_barcode(self):
+        return '0123456789012'
+
+
+class QuietRequestHandler(SimpleXMLRPCRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def report(name, func, number=NUMBER, calls_per_run=1):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print('%-48s %10.2f us' % (name, seconds / calls_per_run * 1e6))
+
+
+def main():
+    xmlrpc_server = SimpleXMLRPCServer(
+        ('localhost', 0), requestHandler=QuietRequestHandler)
+    xmlrpc_server.register_instance(Target())
+    threading.Thread(target=xmlrpc_server.serve_forever, daemon=True).start()
+    proxy = ServerProxy(
+        'http://localhost:%d' % xmlrpc_server.server_address[1])
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'microscan.sock')
+    rpc_server = RPCServer(path, Target())
+    threading.Thread(target=rpc_server.serve_forever, daemon=True).start()
+    client = RPCClient(path)
+    calls = [('read_barcode', ())] * PIPELINE
+
+    try:
+        report('XML-RPC read_barcode', proxy.read_barcode)
+        report('binary RPC read_barcode',
+               lambda: client.call('read_barcode'))
+        report('binary RPC read_barcode, pipelined x%d' % PIPELINE,
+               lambda: client.pipeline(calls), number=NUMBER // PIPELINE,
+               calls_per_run=PIPELINE)
+    finally:
+        client.close()
+        rpc_server.shutdown()
+        rpc_server.server_close()
+        os.unlink(path)
+        os.rmdir(directory)
+        xmlrpc_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
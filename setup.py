@@ -18,6 +18,7 @@ setup(
     entry_points={
         'console_scripts': [
             'microscan_server=microscan.tools.server:main',
+            'microscan_replay=microscan.tools.replay:main',
         ],
     },
 
@@ -0,0 +1,92 @@
+"""Persistent on-disk cache of device configurations
+
+Reading the full configuration of a device with `<K?>` pauses scanning and
+takes a few seconds. A `ConfigCache` passed to `MicroscanDriver` stores the
+configuration after each full read or write, and on connect the driver only
+queries a few spot-check K-codes to confirm that the cached configuration is
+still current:
+
+```
+cache = ConfigCache('/var/cache/microscan')
+driver = MicroscanDriver('/dev/ttyUSB0', config_cache=cache)
+driver.connect()  # full <K?> dump only if the spot check fails
+```
+
+Cache entries are keyed by port name and an optional device identity string,
+for example the serial number printed on the reader, so that swapping the
+reader on a port can be detected without relying on the spot check.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from .config import MicroscanConfiguration
+
+
+"""K-codes queried to verify a cached configuration against the device
+
+The settings that `read_barcode()` depends on (trigger mode and characters)
+plus the host port settings and the most commonly changed symbology settings.
+"""
+DEFAULT_SPOT_CHECK = (
+    b'K100', b'K200', b'K201', b'K229', b'K470', b'K473', b'K474')
+
+_FILENAME_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class ConfigCache:
+    """Directory of cached device configurations, one file per device
+
+    Each file holds the configuration as K-strings, one per line, preceded by
+    a line with the SHA-256 fingerprint of the configuration lines. Files
+    whose fingerprint does not match their content are ignored.
+    """
+    def __init__(self, directory, spot_check=DEFAULT_SPOT_CHECK):
+        self.directory = directory
+        self.spot_check = tuple(spot_check)
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, portname, device_id=None):
+        """Path of the cache file for a port and device identity"""
+        key = '%s\0%s' % (portname, device_id or '')
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        readable = _FILENAME_UNSAFE.sub('_', portname).strip('_')
+        return os.path.join(
+            self.directory, '%s-%s.kcfg' % (readable or 'port', digest))
+
+    def load(self, portname, device_id=None):
+        """Return the cached MicroscanConfiguration, or None if not cached"""
+        try:
+            with open(self.path(portname, device_id), 'rb') as f:
+                fingerprint, _, content = f.read().partition(b'\n')
+        except FileNotFoundError:
+            return None
+        if hashlib.sha256(content).hexdigest().encode('ascii') != fingerprint:
+            return None
+        return MicroscanConfiguration.from_config_strings(
+            content.split(b'\n'))
+
+    def store(self, portname, config, device_id=None):
+        """Write a configuration to the cache, replacing any previous entry
+        """
+        content = config.to_config_string(separator=b'\n')
+        fingerprint = hashlib.sha256(content).hexdigest().encode('ascii')
+        path = self.path(portname, device_id)
+        # write to a temporary file first so that readers never see a
+        # partially written cache file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(fingerprint + b'\n' + content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def invalidate(self, portname, device_id=None):
+        """Remove the cache entry for a device, if any"""
+        try:
+            os.unlink(self.path(portname, device_id))
+        except FileNotFoundError:
+            pass
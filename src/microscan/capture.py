@@ -0,0 +1,395 @@
+"""Recording of serial sessions and their replay through a fake port
+
+`CaptureWriter` is a trace hook (see `microscan.trace`) that writes every
+chunk of bytes exchanged between a `MicroscanDriver` and its device to a
+compact binary capture file. `read_capture()` reads such a file back as a
+sequence of `TraceEvent` tuples, and `ReplayPort` feeds the inbound side of a
+capture to a driver, standing in for a `serial.Serial` object:
+
+```
+events = list(read_capture('session.mscap'))
+driver = MicroscanDriver('replay')
+results = replay_session(driver, ReplayPort(events, speed=10))
+```
+
+Capture file layout, all values little-endian:
+
+- header: magic `MSCP`, format version (uint8), wall clock time of the start
+  of the capture (float64, seconds since the epoch), length of the port name
+  (uint8), port name (ASCII)
+- operation record: tag 0 (uint8), operation id (uint16), name length
+  (uint8), name (ASCII). Written once per distinct operation name before the
+  first data record referencing it.
+- data record: tag 1 for outbound or 2 for inbound (uint8), operation id
+  (uint16), operation sequence number (uint32), seconds since the start of
+  the capture (float64), data length (uint32), data
+"""
+import struct
+import threading
+import time
+
+from .trace import INBOUND
+from .trace import OUTBOUND
+from .trace import TraceEvent
+
+
+MAGIC = b'MSCP'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBdB')
+_TAG = struct.Struct('<B')
+_OPERATION = struct.Struct('<HB')
+_DATA = struct.Struct('<HIdI')
+
+_TAG_OPERATION = 0
+_TAG_OUTBOUND = 1
+_TAG_INBOUND = 2
+
+_DIRECTION_TO_TAG = {OUTBOUND: _TAG_OUTBOUND, INBOUND: _TAG_INBOUND}
+_TAG_TO_DIRECTION = {_TAG_OUTBOUND: OUTBOUND, _TAG_INBOUND: INBOUND}
+
+
+class CaptureFormatError(Exception):
+    """Raised when reading a file that is not a valid capture file"""
+
+
+class ReplayMismatch(Exception):
+    """Raised by a strict ReplayPort when written bytes differ from capture
+    """
+
+
+class CaptureWriter:
+    """Trace hook recording all traffic of a driver to a capture file
+
+    `file` may be a path or a binary file object opened for writing. Register
+    the writer before connecting to capture the initial configuration dump:
+
+    ```
+    driver = MicroscanDriver('COM1')
+    with CaptureWriter('session.mscap', portname='COM1') as capture:
+        driver.add_trace_hook(capture)
+        driver.connect()
+        ...
+    ```
+    """
+    def __init__(self, file, portname=''):
+        if isinstance(file, (str, bytes)):
+            self._file = open(file, 'wb')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._lock = threading.Lock()
+        self._operation_ids = {}
+        self._start = time.monotonic()
+
+        portname = portname.encode('ascii', errors='replace')[:255]
+        self._file.write(
+            _HEADER.pack(MAGIC, VERSION, time.time(), len(portname)) +
+            portname)
+
+    def __call__(self, event):
+        with self._lock:
+            operation_id = self._operation_ids.get(event.operation)
+            if operation_id is None:
+                operation_id = len(self._operation_ids)
+                self._operation_ids[event.operation] = operation_id
+                name = event.operation.encode('ascii')[:255]
+                self._file.write(
+                    _TAG.pack(_TAG_OPERATION) +
+                    _OPERATION.pack(operation_id, len(name)) + name)
+            self._file.write(
+                _TAG.pack(_DIRECTION_TO_TAG[event.direction]) +
+                _DATA.pack(
+                    operation_id, event.sequence,
+                    event.timestamp - self._start, len(event.data)) +
+                event.data)
+
+    def close(self):
+        with self._lock:
+            if self._owns_file:
+                self._file.close()
+            else:
+                self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _read_exactly(file, size):
+    data = file.read(size)
+    if len(data) != size:
+        raise CaptureFormatError('Unexpected end of capture file')
+    return data
+
+
+def read_capture_header(file):
+    """Read the header of a capture file
+
+    Returns a tuple of wall clock start time and port name.
+    """
+    magic, version, start_time, name_length = _HEADER.unpack(
+        _read_exactly(file, _HEADER.size))
+    if magic != MAGIC:
+        raise CaptureFormatError('Not a microscan capture file')
+    if version != VERSION:
+        raise CaptureFormatError(
+            'Unsupported capture file version %d' % version)
+    portname = _read_exactly(file, name_length).decode('ascii')
+    return start_time, portname
+
+
+def read_capture(file):
+    """Iterate over the TraceEvents stored in a capture file
+
+    `file` may be a path or a binary file object. Event timestamps are
+    seconds since the start of the capture.
+    """
+    if isinstance(file, (str, bytes)):
+        with open(file, 'rb') as f:
+            yield from read_capture(f)
+        return
+
+    read_capture_header(file)
+    operations = {}
+    while True:
+        tag = file.read(1)
+        if not tag:
+            return
+        tag, = _TAG.unpack(tag)
+        if tag == _TAG_OPERATION:
+            operation_id, name_length = _OPERATION.unpack(
+                _read_exactly(file, _OPERATION.size))
+            operations[operation_id] = _read_exactly(
+                file, name_length).decode('ascii')
+        elif tag in _TAG_TO_DIRECTION:
+            operation_id, sequence, timestamp, length = _DATA.unpack(
+                _read_exactly(file, _DATA.size))
+            yield TraceEvent(
+                _TAG_TO_DIRECTION[tag], operations[operation_id], sequence,
+                timestamp, _read_exactly(file, length))
+        else:
+            raise CaptureFormatError('Unknown record type %d' % tag)
+
+
+class ReplayPort:
+    """Fake serial port that plays back the inbound side of a capture
+
+    Inbound data becomes available at the time offsets recorded in the
+    capture, divided by `speed`. Set `speed=None` to make data available as
+    fast as possible. The replay timeline is re-synchronized with every write,
+    i.e. data received after a command in the capture is delivered relative
+    to the time the driver sends that command during replay, and never before.
+
+    Blocking reads return early once the capture shows no further data before
+    the next write, instead of waiting for the full `timeout`.
+
+    With `strict=True`, every write is compared to the next outbound chunk of
+    the capture and ReplayMismatch is raised on a difference.
+    """
+    def __init__(self, events, speed=1.0, strict=False, timeout=1):
+        if speed is not None and speed <= 0:
+            raise ValueError('speed must be positive or None')
+        self.events = list(events)
+        self._next = 0
+        self._buffer = bytearray()
+        self._anchor = None
+        self.speed = speed
+        self.strict = strict
+        self.timeout = timeout
+        self.is_open = True
+        self.out_waiting = 0
+
+    @property
+    def exhausted(self):
+        """True once all captured data has been delivered"""
+        return self._next >= len(self.events) and not self._buffer
+
+    def _capture_now(self):
+        if self.speed is None:
+            return float('inf')
+        if self._anchor is None:
+            first = self.events[0].timestamp if self.events else 0.0
+            self._anchor = (first, time.monotonic())
+        capture_time, wall_time = self._anchor
+        return capture_time + (time.monotonic() - wall_time) * self.speed
+
+    def _release(self):
+        """Move inbound chunks that are due into the input buffer
+
+        Returns the wall clock seconds until the next inbound chunk is due,
+        or None if the next event is a write or the capture is exhausted.
+        """
+        now = self._capture_now()
+        events = self.events
+        while self._next < len(events):
+            event = events[self._next]
+            if event.direction == OUTBOUND:
+                return None
+            if event.timestamp > now:
+                return (event.timestamp - now) / self.speed
+            self._buffer += event.data
+            self._next += 1
+        return None
+
+    def _read_until(self, done):
+        """Wait until `done(buffer)` is True, the timeout expires, or the
+        capture has no more data for the current command"""
+        deadline = None if self.timeout is None else (
+            time.monotonic() + self.timeout)
+        while True:
+            delay = self._release()
+            if done(self._buffer) or delay is None:
+                return
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                delay = min(delay, remaining)
+            time.sleep(delay)
+
+    def _take(self, size):
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def write(self, data):
+        # everything received before this write in the capture has arrived
+        events = self.events
+        while (self._next < len(events) and
+               events[self._next].direction == INBOUND):
+            self._buffer += events[self._next].data
+            self._next += 1
+
+        if self._next < len(events):
+            event = events[self._next]
+            if self.strict and bytes(data) != event.data:
+                raise ReplayMismatch(
+                    'Expected write of %r, got %r' % (event.data, data))
+            self._next += 1
+            self._anchor = (event.timestamp, time.monotonic())
+        elif self.strict:
+            raise ReplayMismatch('Unexpected write of %r' % data)
+        return len(data)
+
+    def skip(self, end):
+        """Drop the captured events before index `end` without delivering
+        them, along with any data not read yet"""
+        self._next = max(self._next, end)
+        self._buffer.clear()
+        if self._next < len(self.events):
+            self._anchor = (
+                self.events[self._next].timestamp, time.monotonic())
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._release()
+        self._buffer.clear()
+
+    @property
+    def in_waiting(self):
+        self._release()
+        return len(self._buffer)
+
+    def read(self, size=1):
+        self._read_until(lambda buffer: len(buffer) >= size)
+        return self._take(size)
+
+    def readline(self):
+        self._read_until(lambda buffer: b'\n' in buffer)
+        end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+        return self._take(end)
+
+    def read_all(self):
+        self._release()
+        return self._take(len(self._buffer))
+
+    def close(self):
+        self.is_open = False
+
+
+# driver operations that replay_session() repeats, with their arguments
+# taken from the capture
+REPLAYED_OPERATIONS = ('read_config', 'write_config', 'read_barcode', 'write')
+
+
+def _operation_spans(events):
+    """Split captured events into (operation, start, end) tuples for the
+    outermost operations
+
+    Events of a nested operation, e.g. read_settings() called by connect(),
+    belong to the span of the operation around it. Operations are numbered
+    in the order they start, so a span followed directly by one with a lower
+    sequence number is nested in that one, e.g. the read_settings() that
+    read_barcode() calls before its own traffic after a lazy connect. Plain
+    writes are a span each.
+    """
+    last = {}
+    for index, event in enumerate(events):
+        if event.operation != 'write':
+            last[event.sequence] = index
+
+    # [operation, sequence (None for plain writes), start, end]
+    spans = []
+
+    def add(span):
+        while spans and span[1] is not None and spans[-1][1] is not None \
+                and spans[-1][1] > span[1] and spans[-1][3] == span[2]:
+            span[2] = spans.pop()[2]
+        spans.append(span)
+
+    current = None
+    for index, event in enumerate(events):
+        if current is not None:
+            operation, sequence, start = current
+            if event.operation != 'write' and (
+                    event.sequence == sequence or (
+                        event.sequence > sequence and index < last[sequence])):
+                continue
+            add([operation, sequence, start, index])
+            current = None
+        if event.operation == 'write':
+            if event.direction == OUTBOUND:
+                add(['write', None, index, index + 1])
+            continue
+        current = (event.operation, event.sequence, index)
+    if current is not None:
+        operation, sequence, start = current
+        add([operation, sequence, start, len(events)])
+    return [(operation, start, end) for operation, _, start, end in spans]
+
+
+def replay_session(driver, port):
+    """Repeat the operations of a captured session against a replay port
+
+    The driver methods recorded in the capture (read_config, write_config,
+    read_barcode, and plain writes) are called in their original order, with
+    `port` attached to the driver in place of a serial port. Operations
+    nested in another operation are repeated by the outer one. Other
+    operations, e.g. connect() or read_settings(), are skipped together with
+    their traffic, as their arguments are not captured. Returns a list of
+    (operation, result, duration in seconds) tuples.
+
+    A driver without a configuration is put in lazy mode, like after
+    `attach(port, lazy=True)`, so that operations skipped while connecting
+    do not leave it without one.
+    """
+    driver.port = port
+    if driver._config is None:
+        driver._config_pending = True
+        driver._settings = {}
+    results = []
+    for operation, start, end in _operation_spans(port.events):
+        if operation not in REPLAYED_OPERATIONS:
+            port.skip(end)
+            continue
+        args = (port.events[start].data, ) if operation == 'write' else ()
+        start = time.perf_counter()
+        result = getattr(driver, operation)(*args)
+        results.append((operation, result, time.perf_counter() - start))
+    return results
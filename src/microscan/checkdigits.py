@@ -0,0 +1,231 @@
+"""Verify the check digits of symbols on the host
+
+The reader verifies check digits itself, but it only passes them on for some
+symbologies and settings, and the host cannot tell from a bare symbol which
+symbology it was. A `CheckDigitVerifier` decides from the reader's
+configuration which symbols carry a check digit and validates it:
+
+- Code 39 (K470) with check digit and check digit output enabled: modulo 43
+- EAN-13, UPC-A, EAN-8 and UPC-E (K473): modulo 10
+
+If the symbology identifier is enabled (K450), each symbol starts with its
+AIM identifier, e.g. `]A1` or `]E0`, which determines the symbology.
+Otherwise, a symbol is only checked if exactly one of the enabled
+symbologies can produce its data: digits-only symbols of EAN/UPC lengths
+can be EAN/UPC, symbols of Code 39 characters can be Code 39, and Code 128
+(K474) and Code 93 (K475) can produce any symbol. For example, with Code 39
+and Code 128 enabled, no symbol is checked without symbology identifiers.
+
+The verifier is a symbol listener that passes a `CheckedSymbol` to its own
+listeners, or drops symbols with wrong check digits:
+
+```
+verifier = CheckDigitVerifier(driver.config, drop_invalid=True)
+verifier.add_symbol_listener(print)
+driver.add_symbol_listener(verifier)
+```
+"""
+from collections import namedtuple
+import logging
+
+from .config import CheckDigitOutputStatus
+from .config import CheckDigitStatus
+from .config import Code128Status
+from .config import Code39Status
+from .config import Code93Status
+from .config import EANStatus
+from .config import SeparatorStatus
+from .config import SupplementalsStatus
+from .config import SymbologyIDStatus
+from .config import UPCStatus
+from .config import unescape_chars
+
+
+logger = logging.getLogger(__name__)
+
+
+CheckedSymbol = namedtuple(
+    'CheckedSymbol', ['sequence', 'timestamp', 'data', 'check_digit'])
+CheckedSymbol.__doc__ = """A Symbol with the result of its verification
+
+`check_digit` is True if the check digit is correct, False if it is wrong,
+and None if the symbol has no check digit that the host can verify.
+"""
+
+# value of each Code 39 character in the modulo 43 check
+CODE39_VALUES = {
+    c: value for value, c in enumerate(
+        '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-. $/+%')}
+DIGIT_VALUES = {c: value for value, c in enumerate('0123456789')}
+# EAN/UPC weights, applied from the right, starting with the check digit
+EAN_WEIGHTS = (1, 3) * 9
+# lengths of EAN-13/UPC-A and EAN-8/UPC-E symbols
+EAN_LENGTHS = (12, 13, 8)
+
+
+def mod43_valid(data):
+    """True if the last character of `data` is its Code 39 check character
+
+    Returns None if `data` contains characters outside the Code 39 set, for
+    example from the full ASCII extension.
+    """
+    try:
+        values = [CODE39_VALUES[c] for c in data]
+    except KeyError:
+        return None
+    if len(values) < 2:
+        return False
+    return sum(values[:-1]) % 43 == values[-1]
+
+
+def mod10_valid(digits):
+    """True if the last digit of `digits` is its EAN/UPC check digit"""
+    try:
+        total = sum(
+            DIGIT_VALUES[c] * weight
+            for c, weight in zip(reversed(digits), EAN_WEIGHTS))
+    except KeyError:
+        return False
+    return len(digits) > 1 and total % 10 == 0
+
+
+def upc_e_to_upc_a(digits):
+    """Expand an 8 digit UPC-E symbol to the 12 digits of its UPC-A form"""
+    system, d, check = digits[0], digits[1:7], digits[7]
+    last = d[5]
+    if last in '012':
+        body = d[0:2] + last + '0000' + d[2:5]
+    elif last == '3':
+        body = d[0:3] + '00000' + d[3:5]
+    elif last == '4':
+        body = d[0:4] + '00000' + d[4]
+    else:
+        body = d[0:5] + '0000' + last
+    return system + body + check
+
+
+class CheckDigitVerifier:
+    """Verifies check digits as configured in a MicroscanConfiguration
+
+    Symbols are passed to the listeners as CheckedSymbol, except those with
+    wrong check digits if `drop_invalid` is set. The counters `checked`,
+    `invalid` and `dropped` count verified symbols, wrong check digits and
+    dropped symbols.
+    """
+    def __init__(self, config, drop_invalid=False):
+        self.drop_invalid = drop_invalid
+        self._symbol_listeners = ()
+        self.checked = 0
+        self.invalid = 0
+        self.dropped = 0
+        self.update_config(config)
+
+    def update_config(self, config):
+        """Take the settings relevant for verification from `config`"""
+        code39 = config.code39
+        self.code39_enabled = code39.status == Code39Status.Enabled
+        self.code39 = (
+            self.code39_enabled and
+            code39.check_digit_status == CheckDigitStatus.Enabled and
+            code39.check_digit_output == CheckDigitOutputStatus.Enabled)
+        # symbologies that may produce any data, so that the symbology of a
+        # symbol cannot be told from its data
+        self.other_symbologies = (
+            config.code128.status == Code128Status.Enabled or
+            config.code93.status == Code93Status.Enabled)
+        upc_ean = config.upc_ean
+        self.ean = (
+            upc_ean.upc_status == UPCStatus.Enabled or
+            upc_ean.ean_status == EANStatus.Enabled)
+        self.supplementals = \
+            upc_ean.supplementals_status != SupplementalsStatus.Disabled
+        self.separator = None
+        if upc_ean.separator_status == SeparatorStatus.Enabled:
+            # control characters are escaped in the configuration, e.g. ^]
+            self.separator = unescape_chars(
+                upc_ean.separator_character or b'').decode('ascii')
+        self.symbology_id = (
+            config.narrow_margins_and_symbology_id.symbology_id_status ==
+            SymbologyIDStatus.Enabled)
+
+    def _ean_digits(self, data):
+        """The main EAN/UPC digits of `data` without supplemental"""
+        if self.supplementals:
+            if self.separator and self.separator in data:
+                data = data[:data.index(self.separator)]
+            elif len(data) not in EAN_LENGTHS:
+                for extra in (2, 5):
+                    if len(data) - extra in EAN_LENGTHS:
+                        return data[:-extra]
+        return data
+
+    def _ean_valid(self, digits):
+        if len(digits) == 8:
+            # EAN-8 or UPC-E
+            return mod10_valid(digits) or mod10_valid(upc_e_to_upc_a(digits))
+        return mod10_valid(digits)
+
+    def verify(self, data):
+        """Check the check digit of symbol data
+
+        Returns True or False, or None if the symbol carries no check digit
+        that can be verified.
+        """
+        if self.symbology_id:
+            if data[:1] != ']' or len(data) < 3:
+                return None
+            symbology, modifier, data = data[1], data[2], data[3:]
+            if symbology == 'A':
+                # modifiers 1 and 5: checked and transmitted
+                if modifier in '15':
+                    return mod43_valid(data)
+                return None
+            if symbology == 'E':
+                digits = self._ean_digits(data)
+                if modifier == '4':
+                    return mod10_valid(digits)
+                if len(digits) == 8:
+                    return mod10_valid(upc_e_to_upc_a(digits))
+                return mod10_valid(digits)
+            return None
+        if self.other_symbologies:
+            return None
+        digits = self._ean_digits(data) if self.ean else ''
+        ean = len(digits) in EAN_LENGTHS and digits.isdigit()
+        code39 = self.code39_enabled and all(c in CODE39_VALUES for c in data)
+        if ean and not code39:
+            return self._ean_valid(digits)
+        if code39 and not ean and self.code39:
+            return mod43_valid(data)
+        return None
+
+    def add_symbol_listener(self, listener):
+        """Register a callable that receives a CheckedSymbol for each symbol
+        that is not dropped"""
+        self._symbol_listeners += (listener, )
+
+    def remove_symbol_listener(self, listener):
+        """Unregister a listener previously passed to add_symbol_listener()"""
+        self._symbol_listeners = tuple(
+            other for other in self._symbol_listeners if other != listener)
+
+    def __call__(self, symbol):
+        """Verify a Symbol and pass it on, returns the CheckedSymbol or None
+        if it was dropped"""
+        if not symbol.data:
+            return None
+        valid = self.verify(symbol.data)
+        if valid is not None:
+            self.checked += 1
+            if not valid:
+                self.invalid += 1
+                if self.drop_invalid:
+                    self.dropped += 1
+                    return None
+        checked = CheckedSymbol(*symbol[:3], check_digit=valid)
+        for listener in self._symbol_listeners:
+            try:
+                listener(checked)
+            except Exception:
+                logger.exception('Symbol listener %r failed' % listener)
+        return checked
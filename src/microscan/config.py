@@ -13,7 +13,23 @@ in regex patterns in place of `.` to match any ASCII character as well as any
 escaped ASCII character. The full list of ASCII characters and how they are
 escaped is on page A-11 of the MS3 user manual.
 """
-ASCII_CHAR = b'.|\^[A-Z\[\\\]\^_]'
+ASCII_CHAR = rb'.|\^[A-Z\[\\\]\^_]'
+
+ESCAPED_CHARS = frozenset(
+    b'^' + bytes([char]) for char in b'ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_')
+
+
+def unescape_chars(raw):
+    """The bytes for characters escaped as in ASCII_CHAR, for example
+    `unescape_chars(b'^M^J') == b'\\r\\n'`
+
+    `raw` may also be an ASCII string, as in the defaults of settings.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode('ascii')
+    return re.sub(
+        rb'\^([A-Z\[\\\]\^_])', lambda match: bytes([match.group(1)[0] - 64]),
+        raw)
 
 
 class MicroscanConfigException(Exception):
@@ -43,41 +59,556 @@ class UnknownConfigString(MicroscanConfigException):
     """
 
 
+# === Setting fields ===
+
+
+class LookupTable:
+    """Precomputed bidirectional mapping between config and Python values
+
+    Config values are the byte strings used in K-strings, Python values are
+    what setting objects hold, for example enum members or baud rates as int.
+    Both directions are plain dict lookups.
+    """
+    def __init__(self, name, mapping):
+        self.name = name
+        self.to_python = dict(mapping)
+        self.to_config = {
+            value: configval for configval, value in self.to_python.items()}
+
+    def decode(self, configval):
+        """Python value for a config value, raises ValueError if unknown"""
+        try:
+            return self.to_python[configval]
+        except (KeyError, TypeError):
+            raise ValueError(
+                '%r is not a valid config value for %s, must be one of %s' %
+                (configval, self.name,
+                 ', '.join(repr(v) for v in self.to_python)))
+
+    def encode(self, value):
+        """Config value for a Python value, raises ValueError if unknown"""
+        try:
+            return self.to_config[value]
+        except (KeyError, TypeError):
+            raise ValueError(
+                '%r is not a valid %s, must be one of %s' %
+                (value, self.name,
+                 ', '.join(repr(v) for v in self.to_config)))
+
+
+"""A LookupTable for every enum class in this module, keyed by enum class
+
+Filled in as settings are defined and completed at the end of the module.
+Settings use these tables instead of calling the enum classes, which is
+considerably slower than a dict lookup.
+"""
+ENUM_TABLES = {}
+
+
+def _enum_table(enum_cls):
+    try:
+        return ENUM_TABLES[enum_cls]
+    except KeyError:
+        table = ENUM_TABLES[enum_cls] = LookupTable(
+            enum_cls.__name__, {member.value: member for member in enum_cls})
+        return table
+
+
+def _fail():
+    """Used in generated parsers to reject a value in an expression"""
+    raise ValueError
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('ascii')
+
+
+class Field:
+    """A single comma-separated value of a K-string
+
+    Setting classes list their fields in the `FIELDS` attribute. The `name`
+    is both the constructor argument and the attribute name on instances of
+    the setting. Empty values in a K-string are represented by None.
+
+    Subclasses define the regular expression `PATTERN` matching a value, and
+    how values are decoded, encoded, and validated. The `*_source()` methods
+    return Python expressions used in the code that KSetting generates for
+    each setting class, by default calling the corresponding methods.
+    """
+    PATTERN = b'.*'
+    MAY_CONTAIN_COMMA = True
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.default = default
+
+    @property
+    def pattern(self):
+        return b'(%s)?' % self.PATTERN
+
+    def decode(self, raw):
+        """Python value of the non-empty bytes `raw`, ValueError if invalid"""
+        return raw
+
+    def encode(self, value):
+        """Bytes for the K-string of a value other than None"""
+        return _to_bytes(value)
+
+    def is_valid(self, value):
+        """Whether a value is valid for this field
+
+        None is valid if it is the default value of the field.
+        """
+        if value is None:
+            return self.default is None
+        return self.check(value)
+
+    def check(self, value):
+        return True
+
+    def decode_source(self, var, namespace, index):
+        namespace['_decode%d' % index] = self.decode
+        return '_decode%d(%s)' % (index, var)
+
+    def check_source(self, var):
+        """Condition on the decoded value in `var` that the generated parser
+        checks in addition to decode_source(), or None"""
+        return None
+
+    def encode_source(self, var, namespace, index):
+        namespace['_encode%d' % index] = self.encode
+        return '_encode%d(%s)' % (index, var)
+
+    def _invalid(self, value):
+        return InvalidConfigString(
+            '%r is not a valid value for %s' % (value, self.name))
+
+
+class LookupField(Field):
+    """Value from a fixed set, converted with a LookupTable"""
+    MAY_CONTAIN_COMMA = False
+
+    def __init__(self, name, default, table):
+        super().__init__(name, default)
+        self.table = table
+        values = list(table.to_python)
+        if all(len(value) == 1 for value in values):
+            self.PATTERN = b'[%s]' % b''.join(sorted(values))
+        else:
+            self.PATTERN = b'|'.join(re.escape(value) for value in values)
+
+    def decode(self, raw):
+        return self.table.decode(raw)
+
+    def encode(self, value):
+        return self.table.encode(value)
+
+    def check(self, value):
+        try:
+            return value in self.table.to_config
+        except TypeError:
+            return False
+
+    def decode_source(self, var, namespace, index):
+        namespace['_decode%d' % index] = self.table.to_python
+        return '_decode%d[%s]' % (index, var)
+
+    def encode_source(self, var, namespace, index):
+        namespace['_encode%d' % index] = self.table.to_config
+        return '_encode%d[%s]' % (index, var)
+
+
+class EnumField(LookupField):
+    """Enum member, the type of the enum is taken from the default"""
+    def __init__(self, name, default):
+        super().__init__(name, default, _enum_table(type(default)))
+
+
+class BaudRateField(LookupField):
+    """Baud rate as integer, encoded as index into BAUD_RATES"""
+    def __init__(self, name, default=9600):
+        super().__init__(name, default, BAUD_RATE_TABLE)
+
+
+class IntField(Field):
+    """Non-negative integer in decimal digits
+
+    The K-string may contain between `min_digits` and `max_digits` digits,
+    and the value must be between `minimum` and `maximum`.
+    """
+    MAY_CONTAIN_COMMA = False
+
+    def __init__(
+            self, name, default, minimum=0, maximum=None, min_digits=1,
+            max_digits=None):
+        super().__init__(name, default)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.min_digits = min_digits
+        self.max_digits = max_digits
+        if max_digits is None:
+            self.PATTERN = rb'\d{%d,}' % min_digits
+        elif min_digits == max_digits:
+            self.PATTERN = rb'\d{%d}' % min_digits
+        else:
+            self.PATTERN = rb'\d{%d,%d}' % (min_digits, max_digits)
+
+    def _digits_condition(self, var):
+        condition = '%s.isdigit()' % var
+        if self.min_digits > 1:
+            condition += ' and len(%s) >= %d' % (var, self.min_digits)
+        if self.max_digits is not None:
+            condition += ' and len(%s) <= %d' % (var, self.max_digits)
+        return condition
+
+    def _valid_digits(self, raw):
+        return raw.isdigit() and self.min_digits <= len(raw) and (
+            self.max_digits is None or len(raw) <= self.max_digits)
+
+    def decode(self, raw):
+        if not self._valid_digits(raw) or not self.check(int(raw)):
+            raise ValueError('%r is not a valid value for %s' % (
+                raw, self.name))
+        return int(raw)
+
+    def encode(self, value):
+        raw = _to_bytes(value)
+        if not self._valid_digits(raw):
+            raise self._invalid(value)
+        return raw
+
+    def check(self, value):
+        return (
+            isinstance(value, int) and not isinstance(value, bool) and
+            value >= self.minimum and
+            (self.maximum is None or value <= self.maximum))
+
+    def decode_source(self, var, namespace, index):
+        return 'int(%s) if %s else _fail()' % (
+            var, self._digits_condition(var))
+
+    def check_source(self, var):
+        conditions = []
+        if self.minimum > 0:
+            conditions.append('%s >= %d' % (var, self.minimum))
+        if self.maximum is not None:
+            conditions.append('%s <= %d' % (var, self.maximum))
+        return ' and '.join(conditions) or None
+
+    def encode_source(self, var, namespace, index):
+        namespace['_encode%d' % index] = self.encode
+        condition = '%s.__class__ is int and %s >= %d' % (
+            var, var, 10 ** (self.min_digits - 1) if self.min_digits > 1
+            else 0)
+        if self.max_digits is not None:
+            condition += ' and %s < %d' % (var, 10 ** self.max_digits)
+        return "b'%%d' %% %s if %s else _encode%d(%s)" % (
+            var, condition, index, var)
+
+
+class TextField(Field):
+    """Up to `max_length` characters, held as bytes when parsed"""
+    def __init__(self, name, default=None, max_length=1):
+        super().__init__(name, default)
+        self.max_length = max_length
+        self.PATTERN = b'.{1,%d}' % max_length
+
+    def decode(self, raw):
+        if len(raw) > self.max_length:
+            raise ValueError('%r is too long for %s' % (raw, self.name))
+        return raw
+
+    def encode(self, value):
+        raw = _to_bytes(value)
+        if len(raw) > self.max_length:
+            raise self._invalid(value)
+        return raw
+
+    def check(self, value):
+        return (
+            isinstance(value, (bytes, str)) and
+            len(value) <= self.max_length)
+
+    def decode_source(self, var, namespace, index):
+        return '%s if len(%s) <= %d else _fail()' % (
+            var, var, self.max_length)
+
+    def encode_source(self, var, namespace, index):
+        namespace['_encode%d' % index] = self.encode
+        return '%s if %s.__class__ is bytes and len(%s) <= %d else ' \
+            '_encode%d(%s)' % (var, var, var, self.max_length, index, var)
+
+
+class CharField(Field):
+    """Single ASCII character, control characters escaped as in ASCII_CHAR
+    """
+    PATTERN = ASCII_CHAR
+
+    def _valid_char(self, raw):
+        return len(raw) == 1 or raw in ESCAPED_CHARS
+
+    def decode(self, raw):
+        if not self._valid_char(raw):
+            raise ValueError('%r is not a character' % (raw, ))
+        return raw
+
+    def encode(self, value):
+        raw = _to_bytes(value)
+        if not self._valid_char(raw):
+            raise self._invalid(value)
+        return raw
+
+    def check(self, value):
+        if isinstance(value, str):
+            value = value.encode('ascii', 'replace')
+        return isinstance(value, bytes) and self._valid_char(value)
+
+    def decode_source(self, var, namespace, index):
+        namespace['ESCAPED_CHARS'] = ESCAPED_CHARS
+        return '%s if len(%s) == 1 or %s in ESCAPED_CHARS else _fail()' % (
+            var, var, var)
+
+    def encode_source(self, var, namespace, index):
+        namespace['_encode%d' % index] = self.encode
+        return '%s if %s.__class__ is bytes and len(%s) == 1 else ' \
+            '_encode%d(%s)' % (var, var, var, index, var)
+
+
+class HexCharField(Field):
+    """Single character encoded as two hex digits, held as the two digits"""
+    PATTERN = b'[0-9a-fA-F]{2}'
+    MAY_CONTAIN_COMMA = False
+    _PATTERN = re.compile(PATTERN)
+
+    def decode(self, raw):
+        if not self._PATTERN.fullmatch(raw):
+            raise ValueError('%r is not a hex encoded character' % (raw, ))
+        return raw
+
+    def encode(self, value):
+        raw = _to_bytes(value)
+        if not self._PATTERN.fullmatch(raw):
+            raise self._invalid(value)
+        return raw
+
+    def check(self, value):
+        if isinstance(value, str):
+            value = value.encode('ascii', 'replace')
+        return (
+            isinstance(value, bytes) and
+            self._PATTERN.fullmatch(value) is not None)
+
+
+class UnusedField(Field):
+    """Placeholder for a value that is always empty"""
+    PATTERN = b''
+    MAY_CONTAIN_COMMA = False
+
+    def __init__(self):
+        super().__init__(None)
+
+    @property
+    def pattern(self):
+        return b'()'
+
+    def decode(self, raw):
+        raise ValueError('Unused value must be empty')
+
+
+def _compile_setting(cls):
+    """Generate methods and K_PATTERN of a KSetting subclass from its FIELDS
+
+    The generated code is specialized for the fields of the setting: values
+    are unpacked, converted and formatted without loops over the fields and,
+    for most field types, without function calls. Methods and attributes
+    defined on the class itself are not replaced.
+
+    The generated from_config_string() rejects values that the fields cannot
+    decode or that are out of range. Empty values are parsed as None, as
+    readers leave some values empty, so is_valid() is False for them unless
+    None is the default of the field.
+    """
+    fields = cls.FIELDS
+    namespace = {
+        'InvalidConfigString': InvalidConfigString,
+        '_fail': _fail,
+    }
+    raw_vars = ['_raw%d' % i for i in range(len(fields))]
+    params = []
+    init_lines = []
+    decode_lines = []
+    decoded = []
+    encode_lines = []
+    encoded = []
+    format_parts = []
+    checks = []
+    for i, (field, raw) in enumerate(zip(fields, raw_vars)):
+        if field.name is None:
+            decode_lines.append('if %s: _fail()' % raw)
+            format_parts.append(b'')
+            continue
+        var = '_v%d' % i
+        namespace['_default%d' % i] = field.default
+        namespace['_field%d' % i] = field
+        params.append('%s=_default%d' % (field.name, i))
+        init_lines.append('self.%s = %s' % (field.name, field.name))
+        decode_lines.append('%s = (%s) if %s else None' % (
+            var, field.decode_source(raw, namespace, i), raw))
+        check = field.check_source(var)
+        if check is not None:
+            decode_lines.append('if %s is not None and not (%s): _fail()' % (
+                var, check))
+        decoded.append(var)
+        encode_lines.append('%s = self.%s' % (var, field.name))
+        encoded.append("b'' if %s is None else (%s)" % (
+            var, field.encode_source(var, namespace, i)))
+        format_parts.append(b'%s')
+        checks.append('_field%d.is_valid(self.%s)' % (i, field.name))
+    namespace['_FORMAT'] = b'<%s,%s>' % (cls.K_CODE, b','.join(format_parts))
+    prefix = namespace['_PREFIX'] = b'<%s,' % cls.K_CODE
+
+    # Values containing commas increase the number of parts after splitting
+    # at commas. If only one field can contain commas, the surplus parts
+    # belong to that field. Otherwise the string is split with the regex.
+    comma_fields = [
+        i for i, field in enumerate(fields) if field.MAY_CONTAIN_COMMA]
+    if len(comma_fields) == 1 and not cls.ALLOW_EXTRA:
+        rejoin = [
+            'if len(parts) < %d:' % len(fields),
+            '    parts = cls._split_config_string(str_)',
+            'else:',
+            '    end = len(parts) - %d' % (len(fields) - comma_fields[0] - 1),
+            "    parts[%d:end] = [b','.join(parts[%d:end])]" % (
+                comma_fields[0], comma_fields[0]),
+        ]
+    else:
+        rejoin = ['parts = cls._split_config_string(str_)']
+
+    indent = '\n' + ' ' * 8
+    source = '''
+def __init__(self, %(params)s):
+    %(init)s
+
+def from_config_string(cls, str_):
+    """Create %(clsname)s object from string returned by the device
+
+    The str_ argument should be the device response to the <%(k_code)s?>
+    command.
+    """
+    if str_[:%(prefix_length)d] == _PREFIX and str_[-1:] == b'>':
+        parts = str_[%(prefix_length)d:-1].split(b',')
+        if len(parts) != %(count)d:
+            %(rejoin)s
+    else:
+        parts = cls._split_config_string(str_)
+    try:
+        %(unpack)s, = parts
+        %(decode)s
+    except (KeyError, ValueError, TypeError):
+        raise InvalidConfigString(
+            'Cannot decode config string %%s for K-code %%s' %%
+            (str_, cls.K_CODE))
+    return cls(%(decoded)s)
+
+def to_config_string(self):
+    try:
+        %(encode)s
+        return _FORMAT %% (%(encoded)s, )
+    except Exception:
+        return self._encode_fields()
+
+def is_valid(self):
+    return all([%(checks)s])
+''' % {
+        'clsname': cls.__name__,
+        'k_code': cls.K_CODE.decode('ascii'),
+        'prefix_length': len(prefix),
+        'rejoin': (indent + ' ' * 4).join(rejoin),
+        'count': len(fields),
+        'params': ', '.join(params),
+        'init': '\n    '.join(init_lines),
+        'unpack': ', '.join(raw_vars),
+        'decode': indent.join(decode_lines),
+        'decoded': ', '.join(decoded),
+        'encode': indent.join(encode_lines),
+        'encoded': ', '.join(encoded),
+        'checks': ', '.join(checks),
+    }
+    exec(source, namespace)
+
+    generated = {
+        '__init__': namespace['__init__'],
+        'from_config_string': classmethod(namespace['from_config_string']),
+        'to_config_string': namespace['to_config_string'],
+        'is_valid': namespace['is_valid'],
+        'K_PATTERN': b'^<%s,%s%s>$' % (
+            cls.K_CODE, b','.join(field.pattern for field in fields),
+            b'(?:,.*)?' if cls.ALLOW_EXTRA else b''),
+    }
+    for name, value in generated.items():
+        if name not in cls.__dict__:
+            function = getattr(value, '__func__', value)
+            if callable(function):
+                function.__qualname__ = '%s.%s' % (cls.__qualname__, name)
+            setattr(cls, name, value)
+    cls._K_REGEX = re.compile(cls.K_PATTERN)
+
+
 class KSetting:
-    """Base class for all configuration settings"""
-    def to_config_string(self, values):
-        # class must have non-empty K_CODE attribute
-        assert hasattr(self, 'K_CODE')
-        assert isinstance(self.K_CODE, bytes)
-        assert len(self.K_CODE) > 0
-
-        # object must be valid
-        # TODO: write validators for all settings
-        # assert self.is_valid()
-
-        # values must be list
-        assert isinstance(values, list)
-
-        def normalize_value(val):
-            if isinstance(val, bytes):
-                return val
-            elif val is None:
-                return b''
-            else:
-                return str(val).encode('ascii')
+    """Base class for all configuration settings
+
+    Subclasses define a `K_CODE` and list their values in `FIELDS`, in the
+    order in which they appear in the K-string. The constructor,
+    from_config_string(), to_config_string(), is_valid() and the `K_PATTERN`
+    regular expression are generated from the fields when the class is
+    created:
+
+    ```
+    class Trigger(KSetting):
+        K_CODE = b'K200'
+        FIELDS = [
+            EnumField('trigger_mode', TriggerMode.ContinuousRead),
+            IntField('trigger_filter_duration', 244),
+        ]
+    ```
 
-        # normalize values to bytes, None gets cast to empty string
-        values = [normalize_value(val) for val in values]
-        str_ = b'<%s,%s>' % (self.K_CODE, b','.join(values))
+    Set `ALLOW_EXTRA` to True to ignore additional values after the declared
+    fields when parsing.
+    """
+    FIELDS = None
+    ALLOW_EXTRA = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get('FIELDS') is not None:
+            _compile_setting(cls)
+
+    @classmethod
+    def _split_config_string(cls, str_):
+        """Split a K-string into raw values with the K_PATTERN regex
 
-        # test the generated K-string against the pattern used for decoding
-        if not re.match(self.K_PATTERN, str_):
+        Used by the generated from_config_string() for strings that cannot be
+        split at commas. Empty values are returned as empty bytes.
+        """
+        match = cls._K_REGEX.match(str_)
+        if match is None:
             raise InvalidConfigString(
-                'Encoding the %s object resulted in an invalid K-string: "%s"'
-                % (self.__class__.__name__, str_.decode('ascii'))
-            )
+                'Cannot decode config string %s for K-code %s' %
+                (str_, cls.K_CODE))
+        return [group or b'' for group in match.groups()]
 
-        return str_
+    def _encode_fields(self):
+        """Field-by-field serialization, raises an error for invalid values
+
+        Used by the generated to_config_string() when its fast path fails.
+        """
+        values = []
+        for field in self.FIELDS:
+            value = None if field.name is None else getattr(self, field.name)
+            values.append(b'' if value is None else field.encode(value))
+        return b'<%s,%s>' % (self.K_CODE, b','.join(values))
 
 
 # === Host Port Connection setting and corresponding enums ===
@@ -113,24 +644,7 @@ BAUD_RATES = {
 }
 
 
-def _serialize_baud_rate(baud_rate):
-    baud_rate_to_config_val = dict(
-        zip(BAUD_RATES.values(), BAUD_RATES.keys()))
-    try:
-        return baud_rate_to_config_val[baud_rate]
-    except IndexError:
-        raise ValueError(
-            '%s is not a valid baud rate, must be one of %s' %
-            (baud_rate, ', '.join(BAUD_RATES.values())))
-
-
-def _deserialize_baud_rate(configval):
-    try:
-        return BAUD_RATES[configval]
-    except IndexError:
-        raise ValueError(
-            '%s is not a valid config value for baud rate, must be one of '
-            '%s' % (configval, ', '.join(BAUD_RATES.keys())))
+BAUD_RATE_TABLE = LookupTable('baud rate', BAUD_RATES)
 
 
 class HostPortConnection(KSetting):
@@ -141,45 +655,12 @@ class HostPortConnection(KSetting):
     consistency with other settings names.
     """
     K_CODE = b'K100'
-    K_PATTERN = b'^<%s,([0-8]),([0-2]),([0-1]),([0-1])>$' % K_CODE
-
-    def __init__(
-            self, baud_rate=9600, parity=Parity.NONE, stop_bits=StopBits.ONE,
-            data_bits=DataBits.SEVEN):
-        self.baud_rate = baud_rate
-        self.parity = parity
-        self.stop_bits = stop_bits
-        self.data_bits = data_bits
-
-    def to_config_string(self):
-        return super().to_config_string([
-            _serialize_baud_rate(self.baud_rate),
-            self.parity.value,
-            self.stop_bits.value,
-            self.data_bits.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create HostPortConnection object from string returned by the device
-
-        The str_ argument should be the device response to the <K100?>
-            command, for example '<K100,4,0,0,0>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            baud_rate, parity, stop_bits, data_bits = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            baud_rate=_deserialize_baud_rate(baud_rate),
-            parity=Parity(parity),
-            stop_bits=StopBits(stop_bits),
-            data_bits=DataBits(data_bits),
-        )
+    FIELDS = [
+        BaudRateField('baud_rate', 9600),
+        EnumField('parity', Parity.NONE),
+        EnumField('stop_bits', StopBits.ONE),
+        EnumField('data_bits', DataBits.SEVEN),
+    ]
 
 
 # === Host Protocol setting and corresponding enums ===
@@ -203,35 +684,17 @@ class HostProtocol(KSetting):
     require additional settings besides the protocol parameter, which are
     currently not supported by this libary. Refer to pages 3-7 to 3-9 in the
     MS3 user manual for detailed explanations of these Host Protocol settings.
+
+    Readers using `PollingModeD` only send symbols when polled, see
+    `microscan.polling.PollingModeD`.
     """
     K_CODE = b'K140'
-    K_PATTERN = b'^<%s,([0-7])(,.*)?>$' % K_CODE
-
-    def __init__(self, protocol=Protocol.PointToPoint):
-        self.protocol = protocol
-        # TODO: protocol 5-7 require additional parameters
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.protocol.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create HostProtocol object from string returned by the device
-
-        The str_ argument should be the device response to the <K140?>
-            command, for example '<K140,0>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            protocol, _ = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(protocol=Protocol(protocol))
+    # TODO: protocol 5-7 require additional parameters, until then they are
+    # ignored when parsing
+    FIELDS = [
+        EnumField('protocol', Protocol.PointToPoint),
+    ]
+    ALLOW_EXTRA = True
 
 
 # === Host RS-232/422 Status setting and corresponding enums ===
@@ -260,32 +723,9 @@ class HostRS422Status(KSetting):
     manual.
     """
     K_CODE = b'K102'
-    K_PATTERN = b'^<%s,([0-1])?>$' % K_CODE
-
-    def __init__(self, status=RS422Status.Disabled):
-        self.status = status
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create HostRS422Status object from string returned by the device
-
-        The str_ argument should be the device response to the <K102?>
-            command, for example '<K102,1>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            status, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(status=RS422Status(status))
+    FIELDS = [
+        EnumField('status', RS422Status.Disabled),
+    ]
 
 
 # === Host RS-232 Auxiliary Port setting and corresponding enums ===
@@ -309,64 +749,15 @@ class RS232AuxiliaryPort(KSetting):
     """See page 3-11 of Microscan MS3 manual for reference
     """
     K_CODE = b'K101'
-    K_PATTERN = (
-        b'<%s,([0-5]),([0-8]),([0-2]),([0-1]),([0-1]),([0-1]),(.{1,2})?>'
-        % K_CODE
-    )
-
-    def __init__(
-            self, aux_port_mode=AuxiliaryPortMode.Disabled, baud_rate=9600,
-            parity=Parity.NONE, stop_bits=StopBits.ONE,
-            data_bits=DataBits.SEVEN,
-            daisy_chain_id_status=DaisyChainIdStatus.Disabled,
-            daisy_chain_id='1/'
-            ):
-        self.aux_port_mode = aux_port_mode
-        self.baud_rate = baud_rate
-        self.parity = parity
-        self.stop_bits = stop_bits
-        self.data_bits = data_bits
-        self.daisy_chain_id_status = daisy_chain_id_status
-        self.daisy_chain_id = daisy_chain_id
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.aux_port_mode.value,
-            _serialize_baud_rate(self.baud_rate),
-            self.parity.value,
-            self.stop_bits.value,
-            self.data_bits.value,
-            self.daisy_chain_id_status.value,
-            self.daisy_chain_id,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create RS232AuxiliaryPort object from string returned by the device
-
-        The str_ argument should be the device response to the <K101?>
-            command, for example '<K101,2,3,1,1,0,1,AB>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            (
-                aux_port_mode, baud_rate, parity, stop_bits, data_bits,
-                daisy_chain_id_status, daisy_chain_id
-            ) = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            aux_port_mode=AuxiliaryPortMode(aux_port_mode),
-            baud_rate=_deserialize_baud_rate(baud_rate),
-            parity=Parity(parity),
-            stop_bits=StopBits(stop_bits),
-            data_bits=DataBits(data_bits),
-            daisy_chain_id_status=DaisyChainIdStatus(daisy_chain_id_status),
-            daisy_chain_id=daisy_chain_id,
-        )
+    FIELDS = [
+        EnumField('aux_port_mode', AuxiliaryPortMode.Disabled),
+        BaudRateField('baud_rate', 9600),
+        EnumField('parity', Parity.NONE),
+        EnumField('stop_bits', StopBits.ONE),
+        EnumField('data_bits', DataBits.SEVEN),
+        EnumField('daisy_chain_id_status', DaisyChainIdStatus.Disabled),
+        TextField('daisy_chain_id', '1/', max_length=2),
+    ]
 
 
 # === Preamble setting and corresponding enums ===
@@ -381,37 +772,10 @@ class Preamble(KSetting):
     """See page 3-20 of Microscan MS3 manual for reference
     """
     K_CODE = b'K141'
-    K_PATTERN = b'^<%s,([0-1])?,(.{1,4})?>$' % K_CODE
-
-    def __init__(self, status=PreambleStatus.Disabled, characters=None):
-        self.status = status
-        self.characters = characters
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-            self.characters,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create Preamble object from string returned by the device
-
-        The str_ argument should be the device response to the <K141?>
-            command, for example '<K141,1,ABCD>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            status, characters = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            status=PreambleStatus(status),
-            characters=characters,
-        )
+    FIELDS = [
+        EnumField('status', PreambleStatus.Disabled),
+        TextField('characters', None, max_length=4),
+    ]
 
 
 # === Postamble setting and corresponding enums ===
@@ -426,37 +790,10 @@ class Postamble(KSetting):
     """See page 3-20 of Microscan MS3 manual for reference
     """
     K_CODE = b'K142'
-    K_PATTERN = b'^<%s,([0-1])?,(.{1,4})?>$' % K_CODE
-
-    def __init__(self, status=PostambleStatus.Disabled, characters=None):
-        self.status = status
-        self.characters = characters
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-            self.characters,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create Postamble object from string returned by the device
-
-        The str_ argument should be the device response to the <K142?>
-            command, for example '<K142,1,A16z>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            status, characters = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            status=PostambleStatus(status),
-            characters=characters,
-        )
+    FIELDS = [
+        EnumField('status', PostambleStatus.Disabled),
+        TextField('characters', None, max_length=4),
+    ]
 
 
 # === LRC Status setting and corresponding enums ===
@@ -477,39 +814,9 @@ class LRC(KSetting):
     enum.
     """
     K_CODE = b'K145'
-    K_PATTERN = b'^<%s,([0-1])?>$' % K_CODE
-
-    def __init__(self, status=LRCStatus.Disabled):
-        self.status = status
-
-    def is_valid(self):
-        return all([
-            isinstance(self.status, LRCStatus),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create LRC object from string returned by the device
-
-        The str_ argument should be the device response to the <K145?>
-            command, for example '<K145,1>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            status, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            status=LRCStatus(status),
-        )
+    FIELDS = [
+        EnumField('status', LRCStatus.Disabled),
+    ]
 
 
 # === Inter Character Delay setting and corresponding enums ===
@@ -519,41 +826,9 @@ class InterCharacterDelay(KSetting):
     """See page 3-22 of Microscan MS3 manual for reference
     """
     K_CODE = b'K144'
-    K_PATTERN = b'^<%s,([\d]{1,3})?>$' % K_CODE
-
-    def __init__(self, delay=0):
-        self.delay = delay
-
-    def is_valid(self):
-        return all([
-            isinstance(self.delay, int),
-            self.delay >= 0,
-            self.delay <= 255,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.delay,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create InterCharacterDelay object from string returned by the device
-
-        The str_ argument should be the device response to the <K144?>
-            command, for example '<K144,123>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            delay, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            delay=int(delay),
-        )
+    FIELDS = [
+        IntField('delay', 0, maximum=255, max_digits=3),
+    ]
 
 
 # === Multisymbol setting and corresponding enums ===
@@ -563,46 +838,10 @@ class Multisymbol(KSetting):
     """See page 4-3 of Microscan MS3 manual for reference
     """
     K_CODE = b'K222'
-    K_PATTERN = b'^<%s,([1-5])?,(.)?>$' % K_CODE
-
-    def __init__(self, number_of_symbols=1, multisymbol_separator=','):
-        self.number_of_symbols = number_of_symbols
-        self.multisymbol_separator = multisymbol_separator
-
-    def is_valid(self):
-        return all([
-            isinstance(self.number_of_symbols, int),
-            self.number_of_symbols >= 0,
-            self.number_of_symbols <= 5,
-            isinstance(self.multisymbol_separator, str),
-            len(self.multisymbol_separator) <= 1,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.number_of_symbols,
-            self.multisymbol_separator,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create Multisymbol object from string returned by the device
-
-        The str_ argument should be the device response to the <K144?>
-            command, for example '<K222,2,|>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            number_of_symbols, multisymbol_separator = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            number_of_symbols=int(number_of_symbols),
-            multisymbol_separator=multisymbol_separator,
-        )
+    FIELDS = [
+        IntField('number_of_symbols', 1, minimum=1, maximum=5, max_digits=1),
+        CharField('multisymbol_separator', ','),
+    ]
 
 
 # === Trigger setting and corresponding enums ===
@@ -621,45 +860,10 @@ class Trigger(KSetting):
     """See page 4-6 of Microscan MS3 manual for reference
     """
     K_CODE = b'K200'
-    K_PATTERN = b'^<%s,([0-5])?,([\d]*)?>$' % K_CODE
-
-    def __init__(
-            self, trigger_mode=TriggerMode.ContinuousRead,
-            trigger_filter_duration=244):
-        self.trigger_mode = trigger_mode
-        self.trigger_filter_duration = trigger_filter_duration
-
-    def is_valid(self):
-        return all([
-            isinstance(self.trigger_mode, TriggerMode),
-            isinstance(self.trigger_filter_duration, int)
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.trigger_mode.value,
-            self.trigger_filter_duration,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create Trigger object from string returned by the device
-
-        The str_ argument should be the device response to the <K200?>
-            command, for example '<K200,1,244>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            trigger_mode, trigger_filter_duration = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            trigger_mode=TriggerMode(trigger_mode),
-            trigger_filter_duration=int(trigger_filter_duration),
-        )
+    FIELDS = [
+        EnumField('trigger_mode', TriggerMode.ContinuousRead),
+        IntField('trigger_filter_duration', 244),
+    ]
 
 
 # === External Trigger State setting and corresponding enums ===
@@ -678,40 +882,9 @@ class ExternalTrigger(KSetting):
     with the `ExternalTriggerState` enum.
     """
     K_CODE = b'K202'
-    K_PATTERN = b'^<%s,([0-1])?>$' % K_CODE
-
-    def __init__(self, external_trigger_state=ExternalTriggerState.Positive):
-        self.external_trigger_state = external_trigger_state
-
-    def is_valid(self):
-        return all([
-            isinstance(self.external_trigger_state, ExternalTriggerState),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.external_trigger_state.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create ExternalTriggerState object from str returned by the device
-
-        The str_ argument should be the device response to the <K202?>
-            command, for example '<K202,1>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            external_trigger_state, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            external_trigger_state=ExternalTriggerState(
-                external_trigger_state),
-        )
+    FIELDS = [
+        EnumField('external_trigger_state', ExternalTriggerState.Positive),
+    ]
 
 
 # === Serial Trigger setting and corresponding enums ===
@@ -721,40 +894,9 @@ class SerialTrigger(KSetting):
     """See page 4-12 of Microscan MS3 manual for reference
     """
     K_CODE = b'K201'
-    K_PATTERN = b'^<%s,(.|\^\])?>$' % K_CODE
-
-    def __init__(self, serial_trigger_character='^'):
-        self.serial_trigger_character = serial_trigger_character
-
-    def is_valid(self):
-        return all([
-            isinstance(self.serial_trigger_character, bytes),
-            len(self.serial_trigger_character) == 1,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.serial_trigger_character,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create SerialTrigger object from string returned by the device
-
-        The str_ argument should be the device response to the <K201?>
-            command, for example '<K201,^>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            serial_trigger_character, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            serial_trigger_character=serial_trigger_character,
-        )
+    FIELDS = [
+        CharField('serial_trigger_character', '^'),
+    ]
 
 
 # === Non-delimited Start and Stop Characters setting ===
@@ -772,40 +914,9 @@ class StartTriggerCharacter(KSetting):
     character, as for example SerialTrigger (K201).
     """
     K_CODE = b'K229'
-    K_PATTERN = b'^<%s,([0-9a-fA-F]{2})?>$' % K_CODE
-
-    def __init__(self, start_trigger_character=None):
-        self.start_trigger_character = start_trigger_character
-
-    def is_valid(self):
-        return all([
-            isinstance(self.start_trigger_character, str),
-            len(self.start_trigger_character) == 1,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.start_trigger_character,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create StartTriggerCharacter object from str returned by the device
-
-        The str_ argument should be the device response to the <K229?>
-            command, for example '<K229,>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            start_trigger_character, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            start_trigger_character=start_trigger_character,
-        )
+    FIELDS = [
+        HexCharField('start_trigger_character', None),
+    ]
 
 
 class StopTriggerCharacter(KSetting):
@@ -820,40 +931,9 @@ class StopTriggerCharacter(KSetting):
     character, as for example SerialTrigger (K201).
     """
     K_CODE = b'K230'
-    K_PATTERN = b'^<%s,([0-9a-fA-F]{2})?>$' % K_CODE
-
-    def __init__(self, stop_trigger_character=None):
-        self.stop_trigger_character = stop_trigger_character
-
-    def is_valid(self):
-        return all([
-            isinstance(self.stop_trigger_character, str),
-            len(self.stop_trigger_character) == 1,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.stop_trigger_character,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create StopTriggerCharacter object from str returned by the device
-
-        The str_ argument should be the device response to the <K230?>
-            command, for example '<K230,>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            stop_trigger_character, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            stop_trigger_character=stop_trigger_character,
-        )
+    FIELDS = [
+        HexCharField('stop_trigger_character', None),
+    ]
 
 
 # === End Read Cycle setting and corresponding enums ===
@@ -871,47 +951,20 @@ class EndReadCycle(KSetting):
     ready_cycle_timeout is measured in tens of milliseconds, e.g. 100 = 1sec
     """
     K_CODE = b'K220'
-    K_PATTERN = b'^<%s,([0-2])?,([\d]*)?>$' % K_CODE
-
-    def __init__(
-            self, end_read_cycle_mode=EndReadCycleMode.Timeout,
-            read_cycle_timeout=100):
-        self.end_read_cycle_mode = end_read_cycle_mode
-        self.ready_cycle_timeout = read_cycle_timeout
-
-    def is_valid(self):
-        return all([
-            isinstance(self.end_read_cycle_mode, EndReadCycleMode),
-            isinstance(self.ready_cycle_timeout, int),
-            self.ready_cycle_timeout >= 0,
-            self.ready_cycle_timeout <= 65535,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.end_read_cycle_mode.value,
-            self.ready_cycle_timeout,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create EndReadCycle object from str returned by the device
-
-        The str_ argument should be the device response to the <K220?>
-            command, for example '<K220,1,100>'
+    FIELDS = [
+        EnumField('end_read_cycle_mode', EndReadCycleMode.Timeout),
+        IntField('read_cycle_timeout', 100, maximum=65535),
+    ]
+
+    @property
+    def ready_cycle_timeout(self):
+        """Alias of `read_cycle_timeout`, kept for backwards compatibility
         """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            end_read_cycle_mode, read_cycle_timeout = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
+        return self.read_cycle_timeout
 
-        return cls(
-            end_read_cycle_mode=EndReadCycleMode(end_read_cycle_mode),
-            read_cycle_timeout=int(read_cycle_timeout)
-        )
+    @ready_cycle_timeout.setter
+    def ready_cycle_timeout(self, value):
+        self.read_cycle_timeout = value
 
 
 # === Decodes Before Output setting and corresponding enums ===
@@ -926,49 +979,13 @@ class DecodesBeforeOutput(KSetting):
     """See page 4-16 of Microscan MS3 manual for reference
     """
     K_CODE = b'K221'
-    K_PATTERN = b'^<%s,([\d]{1,3})?,([0-1])?>$' % K_CODE
-
-    def __init__(
-            self, number_before_output=1,
-            decodes_before_output_mode=DecodesBeforeOutputMode.NonConsecutive):
-        self.number_before_output = number_before_output
-        self.decodes_before_output_mode = decodes_before_output_mode
-
-    def is_valid(self):
-        return all([
-            isinstance(self.number_before_output, int),
-            self.number_before_output >= 1,
-            self.number_before_output <= 255,
-            isinstance(
-                self.decodes_before_output_mode, DecodesBeforeOutputMode),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.number_before_output,
-            self.decodes_before_output_mode.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create DecodesBeforeOutput object from string returned by the device
-
-        The str_ argument should be the device response to the <K221?>
-            command, for example '<K221,10,1>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            number_before_output, decodes_before_output_mode = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            number_before_output=int(number_before_output),
-            decodes_before_output_mode=DecodesBeforeOutputMode(
-                decodes_before_output_mode)
-        )
+    FIELDS = [
+        IntField(
+            'number_before_output', 1, minimum=1, maximum=255, max_digits=3),
+        EnumField(
+            'decodes_before_output_mode',
+            DecodesBeforeOutputMode.NonConsecutive),
+    ]
 
 
 # === Scan Speed setting and corresponding enums ===
@@ -983,41 +1000,10 @@ class ScanSpeed(KSetting):
     settings are stored with a K-code of `K504`.
     """
     K_CODE = b'K500'
-    K_PATTERN = b'^<%s,([\d]{2,3})?>$' % K_CODE
-
-    def __init__(self, scan_speed=350):
-        self.scan_speed = scan_speed
-
-    def is_valid(self):
-        return all([
-            isinstance(self.scan_speed, int),
-            self.scan_speed >= 30,
-            self.scan_speed <= 100,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.scan_speed,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create ScanSpeed object from str returned by the device
-
-        The str_ argument should be the device response to the <K500?>
-            command, for example '<K500,350>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            scan_speed, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            scan_speed=int(scan_speed),
-        )
+    FIELDS = [
+        # no maximum, as the readers default to more than the documented 100
+        IntField('scan_speed', 350, minimum=30, min_digits=2, max_digits=3),
+    ]
 
 
 # === Scanner Setup setting and corresponding enums ===
@@ -1037,61 +1023,17 @@ class ScannerSetup(KSetting):
     settings are stored with a K-code of `K504`.
     """
     K_CODE = b'K504'
-    K_PATTERN = (
-        b'^<%s,([\d]{2,3})?,([0-2])?,([\d]{2,3})?,([\d]{2,3})?>$' % K_CODE)
-
-    def __init__(
-            self, gain_level=350,
-            agc_sampling_mode=AGCSamplingMode.Continuous, agc_min=70,
-            agc_max=245):
-        self.gain_level = gain_level
-        self.agc_sampling_mode = agc_sampling_mode
-        self.agc_min = agc_min
-        self.agc_max = agc_max
-
-    def is_valid(self):
-        return all([
-            isinstance(self.gain_level, int),
-            self.scan_speed >= 40,
-            self.scan_speed <= 255,
-            isinstance(self.agc_sampling_mode, AGCSamplingMode),
-            isinstance(self.agc_min, int),
-            self.agc_min >= 40,
-            self.agc_min <= 250,
-            isinstance(self.agc_max, int),
-            self.agc_max >= 60,
-            self.agc_max <= 255,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.gain_level,
-            self.agc_sampling_mode.value,
-            self.agc_min,
-            self.agc_max,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create ScannerSetup object from str returned by the device
-
-        The str_ argument should be the device response to the <K504?>
-            command, for example '<K504,50,2,60,230>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            gain_level, agc_samling_mode, agc_min, agc_max = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            gain_level=int(gain_level),
-            agc_sampling_mode=AGCSamplingMode(agc_samling_mode),
-            agc_min=int(agc_min),
-            agc_max=int(agc_max),
-        )
+    FIELDS = [
+        # no maximum, as the readers default to more than the documented 255
+        IntField('gain_level', 350, minimum=40, min_digits=2, max_digits=3),
+        EnumField('agc_sampling_mode', AGCSamplingMode.Continuous),
+        IntField(
+            'agc_min', 70, minimum=40, maximum=250, min_digits=2,
+            max_digits=3),
+        IntField(
+            'agc_max', 245, minimum=60, maximum=255, min_digits=2,
+            max_digits=3),
+    ]
 
 
 # === Symbol Detect Status setting and corresponding enums ===
@@ -1111,46 +1053,10 @@ class SymbolDetect(KSetting):
     Setup settings are stored with a K-code of `K504`.
     """
     K_CODE = b'K505'
-    K_PATTERN = b'^<%s,([0-1])?,([\d]{1,3})?>$' % K_CODE
-
-    def __init__(
-            self, status=SymbolDetectStatus.Disabled, transition_counter=14):
-        self.status = status
-        self.transition_counter = transition_counter
-
-    def is_valid(self):
-        return all([
-            isinstance(self.status, SymbolDetectStatus),
-            isinstance(self.transition_counter, int),
-            self.transition_counter >= 0,
-            self.transition_counter <= 255,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-            self.transition_counter,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create SymbolDetect object from string returned by the device
-
-        The str_ argument should be the device response to the <K505?>
-            command, for example '<K505,1>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            status, transition_counter = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            status=SymbolDetectStatus(status),
-            transition_counter=int(transition_counter)
-        )
+    FIELDS = [
+        EnumField('status', SymbolDetectStatus.Disabled),
+        IntField('transition_counter', 14, maximum=255, max_digits=3),
+    ]
 
 
 # === Inter Character Delay setting and corresponding enums ===
@@ -1160,41 +1066,9 @@ class MaximumElement(KSetting):
     """See page 4-20 of Microscan MS3 manual for reference
     """
     K_CODE = b'K502'
-    K_PATTERN = b'^<%s,([\d]{1,5})?>$' % K_CODE
-
-    def __init__(self, maximum_element=0):
-        self.maximum_element = maximum_element
-
-    def is_valid(self):
-        return all([
-            isinstance(self.maximum_element, int),
-            self.maximum_element >= 0,
-            self.maximum_element <= 65535,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.maximum_element,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create MaximumElement object from string returned by the device
-
-        The str_ argument should be the device response to the <K502?>
-            command, for example '<K502,123>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            maximum_element, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            maximum_element=int(maximum_element),
-        )
+    FIELDS = [
+        IntField('maximum_element', 0, maximum=65535, max_digits=5),
+    ]
 
 
 # === Scan Width Enhance setting and corresponding enums ===
@@ -1214,40 +1088,9 @@ class ScanWidthEnhance(KSetting):
     Setup settings are stored with a K-code of `K504`.
     """
     K_CODE = b'K511'
-    K_PATTERN = b'^<%s,([0-1])?>$' % K_CODE
-
-    def __init__(
-            self, status=ScanWidthEnhanceStatus.Disabled):
-        self.status = status
-
-    def is_valid(self):
-        return all([
-            isinstance(self.status, ScanWidthEnhance),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create ScanWidthEnhance object from string returned by the device
-
-        The str_ argument should be the device response to the <K511?>
-            command, for example '<K511,1>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            status, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            status=ScanWidthEnhanceStatus(status),
-        )
+    FIELDS = [
+        EnumField('status', ScanWidthEnhanceStatus.Disabled),
+    ]
 
 
 # === Laser Setup setting and corresponding enums ===
@@ -1277,67 +1120,17 @@ class LaserSetup(KSetting):
     "Scanner Setup".
     """
     K_CODE = b'K700'
-    K_PATTERN = (
-        b'^<%s,([0-1])?,([0-1])?,([\d]{2})?,([\d]{2})?,([0-2])?>$' % K_CODE)
-
-    def __init__(
-            self, laser_on_off_status=LaserOnOffStatus.Enabled,
-            laser_framing_status=LaserFramingStatus.Enabled,
-            laser_on_position=10,
-            laser_off_position=95,
-            laser_power=LaserPower.High):
-        self.laser_on_off_status = laser_on_off_status
-        self.laser_framing_status = laser_framing_status
-        self.laser_on_position = laser_on_position
-        self.laser_off_position = laser_off_position
-        self.laser_power = laser_power
-
-    def is_valid(self):
-        return all([
-            isinstance(self.laser_on_off_status, LaserOnOffStatus),
-            isinstance(self.laser_framing_status, LaserFramingStatus),
-            isinstance(self.laser_on_position, int),
-            self.laser_on_position >= 10,
-            self.laser_on_position <= 80,
-            isinstance(self.laser_off_position, int),
-            self.laser_off_position >= 20,
-            self.laser_off_position <= 95,
-            isinstance(self.laser_power, LaserPower)
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.laser_on_off_status.value,
-            self.laser_framing_status.value,
-            self.laser_on_position,
-            self.laser_off_position,
-            self.laser_power.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create LaserSetup object from string returned by the device
-
-        The str_ argument should be the device response to the <K700?>
-            command, for example '<K700,1,1,10,95,1>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            (
-                on_off_status, framing_status, on_position, off_position, power
-             ) = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            laser_on_off_status=LaserOnOffStatus(on_off_status),
-            laser_framing_status=LaserFramingStatus(framing_status),
-            laser_on_position=int(on_position),
-            laser_off_position=int(off_position),
-            laser_power=LaserPower(power)
-        )
+    FIELDS = [
+        EnumField('laser_on_off_status', LaserOnOffStatus.Enabled),
+        EnumField('laser_framing_status', LaserFramingStatus.Enabled),
+        IntField(
+            'laser_on_position', 10, minimum=10, maximum=80, min_digits=2,
+            max_digits=2),
+        IntField(
+            'laser_off_position', 95, minimum=20, maximum=95, min_digits=2,
+            max_digits=2),
+        EnumField('laser_power', LaserPower.High),
+    ]
 
 
 # === Code 39 setting and corresponding enums ===
@@ -1377,81 +1170,16 @@ class Code39(KSetting):
     """See page 5-3 of Microscan MS3 manual for reference
     """
     K_CODE = b'K470'
-    K_PATTERN = (
-        b'^<%s,([0-1])?,([0-1])?,([0-1])?,([0-1])?,([0-1])?,([\d]{1,2})?,'
-        b'([0-1])?>$' % K_CODE)
-
-    def __init__(
-            self,
-            status=Code39Status.Enabled,
-            check_digit_status=CheckDigitStatus.Disabled,
-            check_digit_output=CheckDigitOutputStatus.Disabled,
-            large_intercharacter_gap=LargeInterCharacterStatus.Disabled,
-            fixed_symbol_length=FixedSymbolLengthStatus.Disabled,
-            symbol_length=10,
-            full_ascii_set=FullASCIISetStatus.Disabled):
-        self.status = status
-        self.check_digit_status = check_digit_status
-        self.check_digit_output = check_digit_output
-        self.large_intercharacter_gap = large_intercharacter_gap
-        self.fixed_symbol_length = fixed_symbol_length
-        self.symbol_length = symbol_length
-        self.full_ascii_set = full_ascii_set
-
-    def is_valid(self):
-        return all([
-            isinstance(self.status, Code39Status),
-            isinstance(self.check_digit_status, CheckDigitStatus),
-            isinstance(self.check_digit_output, CheckDigitOutputStatus),
-            isinstance(
-                self.large_intercharacter_gap, LargeInterCharacterStatus),
-            isinstance(self.fixed_symbol_length, FixedSymbolLengthStatus),
-            isinstance(self.symbol_length, int),
-            self.symbol_length >= 1,
-            self.symbol_length <= 64,
-            isinstance(self.full_ascii_set, FullASCIISetStatus),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-            self.check_digit_status.value,
-            self.check_digit_output.value,
-            self.large_intercharacter_gap.value,
-            self.fixed_symbol_length.value,
-            self.symbol_length,
-            self.full_ascii_set.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create Code39 object from string returned by the device
-
-        The str_ argument should be the device response to0the <K473?>
-            command, for example '<K473,1,0,0,1,1,32,0>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            (
-                status, check_digit_status, check_digit_output,
-                large_intercharacter_gap, fixed_symbol_length, symbol_length,
-                full_ascii_set
-             ) = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            status=Code39Status(status),
-            check_digit_status=CheckDigitStatus(check_digit_status),
-            check_digit_output=CheckDigitOutputStatus(check_digit_output),
-            large_intercharacter_gap=LargeInterCharacterStatus(
-                large_intercharacter_gap),
-            fixed_symbol_length=FixedSymbolLengthStatus(fixed_symbol_length),
-            symbol_length=int(symbol_length),
-            full_ascii_set=FullASCIISetStatus(full_ascii_set),
-        )
+    FIELDS = [
+        EnumField('status', Code39Status.Enabled),
+        EnumField('check_digit_status', CheckDigitStatus.Disabled),
+        EnumField('check_digit_output', CheckDigitOutputStatus.Disabled),
+        EnumField(
+            'large_intercharacter_gap', LargeInterCharacterStatus.Disabled),
+        EnumField('fixed_symbol_length', FixedSymbolLengthStatus.Disabled),
+        IntField('symbol_length', 10, minimum=1, maximum=64, max_digits=2),
+        EnumField('full_ascii_set', FullASCIISetStatus.Disabled),
+    ]
 
 
 # === Code 128 setting and corresponding enums ===
@@ -1550,105 +1278,23 @@ class Code128(KSetting):
      - application_record_padding
     """
     K_CODE = b'K474'
-    K_PATTERN = (
-        b'^<%s,([0-1])?,([0-1])?,([\d]{1,2})?,([0-2])?,([0-1])?,([0-1])?,'
-        b'(%s)?,([0-1])?,([0-1])?>$' % (K_CODE, ASCII_CHAR))
-
-    def __init__(
-            self,
-            status=Code128Status.Disabled,
-            fixed_symbol_length_status=FixedSymbolLengthStatus.Disabled,
-            symbol_length=10,
-            ean128_status=EAN128Status.Disabled,
-            output_format=Code128OutputFormat.Standard,
-            application_record_separator_status=(
-                ApplicationRecordSeparatorStatus.Disabled),
-            application_record_separator_character=b',',
-            application_record_brackets=ApplicationRecordBrackets.Disabled,
-            application_record_padding=ApplicationRecordPadding.Disabled):
-        self.status = status
-        self.fixed_symbol_length_status = fixed_symbol_length_status
-        self.symbol_length = symbol_length
-        self.ean128_status = ean128_status
-        self.output_format = output_format
-        self.application_record_separator_status = (
-            application_record_separator_status)
-        self.application_record_separator_character = (
-            application_record_separator_character)
-        self.application_record_brackets = application_record_brackets
-        self.application_record_padding = application_record_padding
-
-    def is_valid(self):
-        return all([
-            isinstance(self.status, Code128Status),
-            isinstance(
-                self.fixed_symbol_length_status, FixedSymbolLengthStatus),
-            isinstance(self.symbol_length, int),
-            self.symbol_length >= 1,
-            self.symbol_length <= 64,
-            isinstance(self.ean128_status, EAN128Status),
-            isinstance(self.output_format, Code128OutputFormat),
-            isinstance(
-                self.application_record_brackets, ApplicationRecordBrackets),
-            isinstance(
-                self.application_record_padding, ApplicationRecordPadding),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-            self.fixed_symbol_length_status.value,
-            self.symbol_length,
-            self.ean128_status.value,
-            self.output_format.value,
-            self.application_record_separator_status.value,
-            self.application_record_separator_character,
-            self.application_record_brackets.value,
-            self.application_record_padding.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create Code128 object from string returned by the device
-
-        The str_ argument should be the device response to0the <K474?>
-            command, for example '<K474,1,0,10,1,0,0,,,0,0>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            (
-                status,
-                fixed_symbol_length_status,
-                symbol_length,
-                ean128_status,
-                output_format,
-                application_record_separator_status,
-                application_record_separator_character,
-                application_record_brackets,
-                application_record_padding
-            ) = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            status=Code128Status(status),
-            fixed_symbol_length_status=FixedSymbolLengthStatus(
-                fixed_symbol_length_status),
-            symbol_length=int(symbol_length),
-            ean128_status=EAN128Status(ean128_status),
-            output_format=Code128OutputFormat(output_format),
-            application_record_separator_status=(
-                ApplicationRecordSeparatorStatus(
-                    application_record_separator_status)),
-            application_record_separator_character=(
-                application_record_separator_character),
-            application_record_brackets=ApplicationRecordBrackets(
-                application_record_brackets),
-            application_record_padding=ApplicationRecordPadding(
-                application_record_padding)
-        )
+    FIELDS = [
+        EnumField('status', Code128Status.Disabled),
+        EnumField(
+            'fixed_symbol_length_status', FixedSymbolLengthStatus.Disabled),
+        IntField('symbol_length', 10, minimum=1, maximum=64, max_digits=2),
+        EnumField('ean128_status', EAN128Status.Disabled),
+        EnumField('output_format', Code128OutputFormat.Standard),
+        EnumField(
+            'application_record_separator_status',
+            ApplicationRecordSeparatorStatus.Disabled),
+        CharField('application_record_separator_character', b','),
+        EnumField(
+            'application_record_brackets',
+            ApplicationRecordBrackets.Disabled),
+        EnumField(
+            'application_record_padding', ApplicationRecordPadding.Disabled),
+    ]
 
 
 # === Interleaved 2 of 5 setting and corresponding enums ===
@@ -1720,76 +1366,17 @@ class UPC_EAN(KSetting):
     # characters before the closing ">" are likely to be commas:
     # - the second to last sub-setting is unused, i.e. empty
     # - the last and third to last sub-settings default to ","
-    K_PATTERN = (
-        b'^<%s,([0-1])?,([0-1])?,([0-2])?,([0-1])?,(.)?,,([0-1])?,([0-1])?>$'
-        % K_CODE)
-
-    def __init__(
-            self,
-            upc_status=UPCStatus.Disabled,
-            ean_status=EANStatus.Disabled,
-            supplementals_status=SupplementalsStatus.Disabled,
-            separator_status=SeparatorStatus.Disabled,
-            separator_character=',',
-            upc_e_output_to_upc_a=UPC_EoutputAsUPC_A.Disabled,  # docs wrong
-            undocumented_field=0):
-        self.upc_status = upc_status
-        self.ean_status = ean_status
-        self.supplementals_status = supplementals_status
-        self.separator_status = separator_status
-        self.separator_character = separator_character
-        self.upc_e_output_to_upc_a = upc_e_output_to_upc_a
-        self.undocumented_field = undocumented_field
-
-    def is_valid(self):
-        return all([
-            isinstance(self.upc_status, UPCStatus),
-            isinstance(self.ean_status, EANStatus),
-            isinstance(self.supplementals_status, SupplementalsStatus),
-            isinstance(self.separator_status, SeparatorStatus),
-            isinstance(self.separator_character, str),
-            isinstance(self.upc_e_output_to_upc_a, UPC_EoutputAsUPC_A),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.upc_status.value,
-            self.ean_status.value,
-            self.supplementals_status.value,
-            self.separator_status.value,
-            self.separator_character,
-            None,  # accomodates for the "unused" sub-setting
-            self.upc_e_output_to_upc_a.value,
-            self.undocumented_field,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create UPC_EAN object from string returned by the device
-
-        The str_ argument should be the device response to the <K473?>
-            command, for example '<K473,1,0,0,0,,,,>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            (
-                upc_status, ean_status, supplementals_status, separator_status,
-                separator_character, upc_e_output_to_upc_a, undocumented_field
-             ) = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            upc_status=UPCStatus(upc_status),
-            ean_status=EANStatus(ean_status),
-            supplementals_status=SupplementalsStatus(supplementals_status),
-            separator_status=SeparatorStatus(separator_status),
-            separator_character=separator_character,
-            upc_e_output_to_upc_a=UPC_EoutputAsUPC_A(upc_e_output_to_upc_a),
-            undocumented_field=int(undocumented_field),
-        )
+    FIELDS = [
+        EnumField('upc_status', UPCStatus.Disabled),
+        EnumField('ean_status', EANStatus.Disabled),
+        EnumField('supplementals_status', SupplementalsStatus.Disabled),
+        EnumField('separator_status', SeparatorStatus.Disabled),
+        CharField('separator_character', ','),
+        UnusedField(),
+        # docs wrong
+        EnumField('upc_e_output_to_upc_a', UPC_EoutputAsUPC_A.Disabled),
+        IntField('undocumented_field', 0, maximum=1, max_digits=1),
+    ]
 
 
 # === Code 93 setting and corresponding enums ===
@@ -1804,55 +1391,13 @@ class Code93(KSetting):
     """See page 5-19 of Microscan MS3 manual for reference
     """
     K_CODE = b'K475'
-    K_PATTERN = (
-        b'^<%s,([0-1])?,([0-1])?,([\d]{1,2})?>$' % K_CODE)
-
-    def __init__(
-            self,
-            status=Code93Status.Disabled,
-            fixed_symbol_length_status=FixedSymbolLengthStatus.Disabled,
-            fixed_symbol_length=10,):
-        self.status = status
-        self.fixed_symbol_length_status = fixed_symbol_length_status
-        self.fixed_symbol_length = fixed_symbol_length
-
-    def is_valid(self):
-        return all([
-            isinstance(self.status, Code93Status),
-            isinstance(
-                self.fixed_symbol_length_status, FixedSymbolLengthStatus),
-            isinstance(self.fixed_symbol_length, int),
-            self.fixed_symbol_length >= 1,
-            self.fixed_symbol_length <= 64,
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.status.value,
-            self.fixed_symbol_length_status.value,
-            self.fixed_symbol_length,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create Code93 object from string returned by the device
-
-        The str_ argument should be the device response to the <K475?>
-            command, for example '<K475,1,0,10>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            status, fsl_status, fsl = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            status=Code93Status(status),
-            fixed_symbol_length_status=FixedSymbolLengthStatus(fsl_status),
-            fixed_symbol_length=int(fsl),
-        )
+    FIELDS = [
+        EnumField('status', Code93Status.Disabled),
+        EnumField(
+            'fixed_symbol_length_status', FixedSymbolLengthStatus.Disabled),
+        IntField(
+            'fixed_symbol_length', 10, minimum=1, maximum=64, max_digits=2),
+    ]
 
 
 # === Pharmacode setting and corresponding enums ===
@@ -1888,46 +1433,10 @@ class NarrowMarginsAndSymbologyID(KSetting):
     """See page 5-22 of Microscan MS3 manual for reference
     """
     K_CODE = b'K450'
-    K_PATTERN = b'^<%s,([0-1])?,([0-1])?>$' % K_CODE
-
-    def __init__(
-            self,
-            narrow_margins_status=NarrowMarginsStatus.Disabled,
-            symbology_id_status=SymbologyIDStatus.Disabled):
-        self.narrow_margins_status = narrow_margins_status
-        self.symbology_id_status = symbology_id_status
-
-    def is_valid(self):
-        return all([
-            isinstance(self.narrow_margins_status, NarrowMarginsStatus),
-            isinstance(self.symbology_id_status, SymbologyIDStatus)
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.narrow_margins_status.value,
-            self.symbology_id_status.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create NarrowMargins object from string returned by the device
-
-        The str_ argument should be the device response to the <K450?>
-            command, for example '<K450,1,0>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            narrow_margins_status, symbology_id_status = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            narrow_margins_status=NarrowMarginsStatus(narrow_margins_status),
-            symbology_id_status=SymbologyIDStatus(symbology_id_status)
-        )
+    FIELDS = [
+        EnumField('narrow_margins_status', NarrowMarginsStatus.Disabled),
+        EnumField('symbology_id_status', SymbologyIDStatus.Disabled),
+    ]
 
 
 # === Background Color setting and corresponding enums ===
@@ -1942,39 +1451,9 @@ class BackgroundColor(KSetting):
     """See page 5-24 of Microscan MS3 manual for reference
     """
     K_CODE = b'K451'
-    K_PATTERN = b'^<%s,([0-1])?>$' % K_CODE
-
-    def __init__(self, color=Color.White):
-        self.color = color
-
-    def is_valid(self):
-        return all([
-            isinstance(self.color, Color),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.color.value,
-        ])
-
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create BackgroundColor object from string returned by the device
-
-        The str_ argument should be the device response to the <K451?>
-            command, for example '<K451,1>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            color, = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            color=Color(color),
-        )
+    FIELDS = [
+        EnumField('color', Color.White),
+    ]
 
 
 # === Symbol Ratio Mode setting and corresponding enums ===
@@ -1990,56 +1469,18 @@ class SymbolRatioMode(KSetting):
     """See page 5-25 of Microscan MS3 manual for reference
     """
     K_CODE = b'K452'
-    K_PATTERN = b'^<%s,([0-2])?,([0-2])?,([0-2])?,([0-2])?>$' % K_CODE
+    FIELDS = [
+        EnumField('code39', SymbolRatio.Standard),
+        EnumField('codabar', SymbolRatio.Standard),
+        EnumField('interleaved_2_of_5', SymbolRatio.Standard),
+        EnumField('code93', SymbolRatio.Standard),
+    ]
 
-    def __init__(
-            self,
-            code39=SymbolRatio.Standard,
-            codabar=SymbolRatio.Standard,
-            interleaved_2_of_5=SymbolRatio.Standard,
-            code93=SymbolRatio.Standard):
-        self.code39 = code39
-        self.codabar = codabar
-        self.interleaved_2_of_5 = interleaved_2_of_5
-        self.code93 = code93
-
-    def is_valid(self):
-        return all([
-            isinstance(self.code39, SymbolRatio),
-            isinstance(self.codabar, SymbolRatio),
-            isinstance(self.interleaved_2_of_5, SymbolRatio),
-            isinstance(self.code93, SymbolRatio),
-        ])
-
-    def to_config_string(self):
-        return super().to_config_string([
-            self.code39.value,
-            self.codabar.value,
-            self.interleaved_2_of_5.value,
-            self.code93.value,
-        ])
 
-    @classmethod
-    def from_config_string(cls, str_):
-        """Create SymbolRatioMode object from string returned by the device
-
-        The str_ argument should be the device response to the <K452?>
-            command, for example '<K452,1,1,1,2>'
-        """
-        match = re.match(cls.K_PATTERN, str_)
-        try:
-            code39, codabar, il2of5, code93 = match.groups()
-        except (ValueError, AttributeError):
-            raise InvalidConfigString(
-                'Cannot decode config string %s for K-code %s' %
-                (str_, cls.K_CODE))
-
-        return cls(
-            code39=SymbolRatio(code39),
-            codabar=SymbolRatio(codabar),
-            interleaved_2_of_5=SymbolRatio(il2of5),
-            code93=SymbolRatio(code93),
-        )
+# complete ENUM_TABLES with the enums that are not used in any setting yet
+for obj in list(globals().values()):
+    if isinstance(obj, type) and issubclass(obj, Enum) and obj is not Enum:
+        _enum_table(obj)
 
 
 """A mapping of K-code to property name and serializer class
@@ -2084,6 +1525,32 @@ REGISTRY = {cls.K_CODE: cls for cls in [
 ]}
 
 
+def setting_fields(serializer):
+    """List the fields of a setting class as (name, default value) tuples
+
+    Field names are the constructor arguments of the class, which are also
+    available as attributes on its instances. Unused fields are omitted.
+    """
+    return [
+        (field.name, field.default)
+        for field in serializer.FIELDS if field.name is not None]
+
+
+def setting_property_name(serializer):
+    """Name of the MicroscanConfiguration attribute holding a setting class
+
+    camelCase-to-under_score conversion of the class name, for example
+    `setting_property_name(HostPortConnection) == 'host_port_connection'`
+    """
+    return re.sub(r'([a-z])([A-Z])', r'\1_\2', serializer.__name__).lower()
+
+
+"""MicroscanConfiguration attribute name for every K-code in REGISTRY"""
+PROPERTY_NAMES = {
+    k_code: setting_property_name(serializer)
+    for k_code, serializer in REGISTRY.items()}
+
+
 class MicroscanConfiguration:
     """Container for configuration settings for a barcode reader device
 
@@ -2108,8 +1575,7 @@ class MicroscanConfiguration:
         overwritten with defaults by this method.
         """
         for k_code, serializer in REGISTRY.items():
-            prop_name = self._clsname_to_propname(serializer.__name__)
-            setattr(self, prop_name, serializer())
+            setattr(self, PROPERTY_NAMES[k_code], serializer())
 
     @classmethod
     def from_config_strings(cls, list_of_strings, defaults=False):
@@ -2140,9 +1606,9 @@ class MicroscanConfiguration:
 
             try:
                 serializer = REGISTRY[k_code]
-                prop_name = instance._clsname_to_propname(serializer.__name__)
                 setattr(
-                    instance, prop_name, serializer.from_config_string(line))
+                    instance, PROPERTY_NAMES[k_code],
+                    serializer.from_config_string(line))
             except KeyError:
                 logger.info(
                     'Cannot find serializer class for K-code %s$' % k_code)
@@ -2157,6 +1623,19 @@ class MicroscanConfiguration:
         """
         return re.sub(r'([a-z])([A-Z])', r'\1_\2', clsname).lower()
 
+    def get_setting(self, k_code):
+        """Return the setting object for a K-code, for example b'K200'
+
+        Raises KeyError if the K-code is not known.
+        """
+        return getattr(self, PROPERTY_NAMES[k_code])
+
+    def set_setting(self, setting):
+        """Replace the setting of the same type as the `setting` argument
+        """
+        setattr(
+            self, self._clsname_to_propname(type(setting).__name__), setting)
+
     def to_config_string(self, separator=b''):
         """Serialized the object into a single string for sending to device
 
@@ -2165,8 +1644,224 @@ class MicroscanConfiguration:
         line, for example, specify `separator=b'\\n'`
         """
         props = [
-            getattr(self, self._clsname_to_propname(prop.__name__), None)
-            for prop in REGISTRY.values()
+            getattr(self, prop_name, None)
+            for prop_name in PROPERTY_NAMES.values()
         ]
         return separator.join([
             prop.to_config_string() for prop in props if prop])
+
+
+"""K-code for every MicroscanConfiguration attribute name in PROPERTY_NAMES"""
+K_CODES = {prop_name: k_code for k_code, prop_name in PROPERTY_NAMES.items()}
+
+
+class LazyMicroscanConfiguration(MicroscanConfiguration):
+    """Configuration that decodes each setting on first access
+
+    Stores the raw `<K...>` string of every setting and only creates the
+    setting object when the corresponding attribute is first accessed, which
+    makes loading a configuration of which only a few settings are ever
+    looked at much cheaper:
+
+    ```
+    cfg = LazyMicroscanConfiguration.from_config_response(data)
+    cfg.trigger.trigger_mode  # only K200 is decoded
+    ```
+
+    Settings that were never accessed are serialized by passing through
+    their raw strings unchanged. Settings missing from the raw strings have
+    their default values. Since decoding is deferred, InvalidConfigString is
+    raised on first access of a setting rather than when loading.
+    """
+
+    def __init__(self):
+        self._raw = {}
+
+    def load_defaults(self):
+        """Discards all raw and decoded settings, leaving only defaults"""
+        self._raw = {}
+        for prop_name in PROPERTY_NAMES.values():
+            self.__dict__.pop(prop_name, None)
+
+    @classmethod
+    def from_config_strings(cls, list_of_strings, defaults=False):
+        """Create configuration object from a list of configuration strings
+
+        Expects a list of byte strings, each representing a configuration
+        setting as <K...> string. The strings are stored as they are, without
+        decoding. The `defaults` argument is accepted for compatibility with
+        MicroscanConfiguration.from_config_strings(), settings not in the list
+        always have their default values.
+        """
+        instance = cls()
+        raw = instance._raw
+        for line in list_of_strings:
+            if line[:2] != b'<K':
+                continue
+            end = line.find(b',')
+            k_code = line[1:end if end > 0 else -1]
+            if k_code in REGISTRY:
+                raw[k_code] = line
+            else:
+                logger.info(
+                    'Cannot find serializer class for K-code %s' % k_code)
+        return instance
+
+    @classmethod
+    def from_config_response(cls, data):
+        """Create configuration object from the device response to <K?>
+
+        Finds the <K...> strings in `data` by slicing, for example
+        b'<K100,4,0,0,0><K101,0,4,0,0,0,0,1/>...'.
+        """
+        lines = []
+        start = data.find(b'<K')
+        while start >= 0:
+            end = data.find(b'>', start)
+            if end < 0:
+                break
+            lines.append(data[start:end + 1])
+            start = data.find(b'<K', end)
+        return cls.from_config_strings(lines)
+
+    def __getattr__(self, name):
+        # only called for attributes not found otherwise, i.e. settings that
+        # have not been accessed yet
+        try:
+            k_code = K_CODES[name]
+        except KeyError:
+            raise AttributeError(
+                '%r object has no attribute %r' % (type(self).__name__, name))
+        raw = self._raw.get(k_code)
+        serializer = REGISTRY[k_code]
+        if raw is None:
+            setting = serializer()
+        else:
+            # the raw strings are left in place, shallow copies share them
+            setting = serializer.from_config_string(raw)
+        setattr(self, name, setting)
+        return setting
+
+    def is_decoded(self, k_code):
+        """Whether the setting for a K-code has been accessed and decoded"""
+        return PROPERTY_NAMES[k_code] in self.__dict__
+
+    def to_config_string(self, separator=b''):
+        """Serialized the object into a single string for sending to device
+
+        See MicroscanConfiguration.to_config_string(). Settings that have not
+        been accessed are output as the raw strings they were loaded from.
+        """
+        raw = self._raw
+        decoded = self.__dict__
+        lines = []
+        for k_code, prop_name in PROPERTY_NAMES.items():
+            if prop_name not in decoded and k_code in raw:
+                lines.append(raw[k_code])
+            else:
+                lines.append(getattr(self, prop_name).to_config_string())
+        return separator.join(lines)
+
+
+class ConfigStreamParser:
+    """Incremental parser for the device response to the <K?> command
+
+    Bytes are passed to feed() in chunks of any size, as they arrive from the
+    serial port. Each `<K...>` string is parsed as soon as its closing `>`
+    has been received:
+
+    ```
+    parser = ConfigStreamParser()
+    for chunk in chunks:
+        for setting in parser.feed(chunk):
+            print(setting.K_CODE)
+    cfg = parser.config()
+    ```
+
+    Escaped characters (see ASCII_CHAR) never contain `<` or `>`, so a
+    setting is complete at the first `>` after its `<K`, no matter where the
+    stream is split into chunks. Bytes outside of `<K...>` strings, such as
+    line breaks, are skipped. Strings with K-codes that are not in REGISTRY
+    are collected in `unknown`. With `strict=False`, strings that cannot be
+    decoded are collected in `invalid` instead of raising
+    InvalidConfigString.
+    """
+    def __init__(self, strict=True):
+        self._buffer = bytearray()
+        self.strict = strict
+        self.settings = {}
+        self.unknown = []
+        self.invalid = []
+        self._received = set()
+
+    @property
+    def pending(self):
+        """True while a `<K...>` string has started but not been completed
+        """
+        return self._buffer[:2] == b'<K'
+
+    def feed(self, data):
+        """Add received bytes, returns the list of settings they completed
+
+        In strict mode, raises InvalidConfigString if a completed string
+        cannot be decoded. The string is discarded and parsing continues with
+        the next feed().
+        """
+        buffer = self._buffer
+        buffer += data
+        parsed = []
+        position = 0
+        try:
+            while True:
+                start = buffer.find(b'<K', position)
+                if start < 0:
+                    # keep a trailing '<' that may be the start of a setting
+                    position = len(buffer) - buffer.endswith(b'<')
+                    break
+                end = buffer.find(b'>', start + 2)
+                if end < 0:
+                    position = start
+                    break
+                position = end + 1
+                setting = self._parse(bytes(buffer[start:position]))
+                if setting is not None:
+                    parsed.append(setting)
+        finally:
+            del buffer[:position]
+        return parsed
+
+    def _parse(self, line):
+        end = line.find(b',')
+        k_code = line[1:end if end > 0 else -1]
+        try:
+            serializer = REGISTRY[k_code]
+        except KeyError:
+            logger.info('Cannot find serializer class for K-code %s' % k_code)
+            self.unknown.append(line)
+            return None
+        self._received.add(k_code)
+        try:
+            setting = serializer.from_config_string(line)
+        except InvalidConfigString:
+            if self.strict:
+                raise
+            self.invalid.append(line)
+            return None
+        self.settings[k_code] = setting
+        return setting
+
+    @property
+    def complete(self):
+        """True once a setting was received for every K-code in REGISTRY,
+        including settings that could not be decoded"""
+        return len(self._received) == len(REGISTRY)
+
+    def config(self):
+        """MicroscanConfiguration with the settings parsed so far
+
+        Settings that have not been received have their default values.
+        """
+        cfg = MicroscanConfiguration()
+        for k_code, setting in self.settings.items():
+            setattr(cfg, PROPERTY_NAMES[k_code], setting)
+        return cfg
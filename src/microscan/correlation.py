@@ -0,0 +1,228 @@
+"""Correlate the symbols of several readers that look at the same item
+
+In a scan tunnel, several readers see each item from different sides. A
+`Correlator` joins the symbols they report within a time window into one
+`CorrelatedItem` and passes it to its listeners once the window closed:
+
+```
+correlator = Correlator(window=0.2)
+for name, driver in drivers.items():
+    correlator.add_reader(name, driver)
+    driver.start_symbol_stream()
+correlator.add_item_listener(print)
+correlator.start()
+```
+
+An item opens with the first symbol that does not belong to an open item and
+closes `window` seconds later. A symbol belongs to the item that already has
+the same code, otherwise to the most recent item, if that item opened less
+than `window` seconds before the symbol was read. Items with more than one
+distinct code are flagged as conflicts.
+
+Readers are anything with an `add_symbol_listener()` method, e.g. drivers,
+`DaisyChain` readers, or `MultidropBus` readers. Symbol timestamps must come
+from the same clock, `time.time()`.
+"""
+from collections import deque
+from functools import partial
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class CorrelatedItem:
+    """The symbols of several readers joined into one item
+
+    `reads` lists (reader, Symbol) tuples in order of arrival, `codes` maps
+    each distinct symbol data to the set of readers that reported it.
+    """
+    def __init__(self, sequence, first_seen):
+        self.sequence = sequence
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.reads = []
+        self.codes = {}
+
+    def __repr__(self):
+        return '<CorrelatedItem %d %s from %s%s>' % (
+            self.sequence, '/'.join(self.codes), ', '.join(self.readers),
+            ' (conflict)' if self.conflict else '')
+
+    def add(self, reader, symbol):
+        self.reads.append((reader, symbol))
+        self.codes.setdefault(symbol.data, set()).add(reader)
+        self.last_seen = max(self.last_seen, symbol.timestamp)
+
+    @property
+    def readers(self):
+        """Names of the readers that saw the item, in order of arrival"""
+        return list(dict.fromkeys(reader for reader, _ in self.reads))
+
+    @property
+    def conflict(self):
+        """True if the readers reported different codes"""
+        return len(self.codes) > 1
+
+    @property
+    def code(self):
+        """The item's code, or None if the readers did not agree"""
+        if self.conflict:
+            return None
+        return next(iter(self.codes))
+
+
+class Correlator:
+    """Joins the symbols of several readers within `window` seconds
+
+    At most `max_open` items are kept open, if more open the oldest is closed
+    early. Closed items are passed to the listeners registered with
+    add_item_listener(), from the thread started by start(). Without that
+    thread, call close_expired() periodically.
+
+    Counters: `items` and `conflicts` count closed items, `max_delay` is the
+    longest time an item was passed on after its window ended.
+    """
+    def __init__(self, window=0.2, max_open=1000):
+        self.window = window
+        self.max_open = max_open
+        self._open = deque()
+        # code -> open item with that code
+        self._by_code = {}
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._item_listeners = ()
+        self._readers = {}
+        self._thread = None
+        self._stop = False
+        self.items = 0
+        self.conflicts = 0
+        self.max_delay = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def add_reader(self, name, reader):
+        """Correlate the symbols of `reader` under the given name"""
+        listener = partial(self.add_symbol, name)
+        self._readers[name] = (reader, listener)
+        reader.add_symbol_listener(listener)
+
+    def remove_reader(self, name):
+        reader, listener = self._readers.pop(name)
+        reader.remove_symbol_listener(listener)
+
+    def add_item_listener(self, listener):
+        """Register a callable that receives each closed CorrelatedItem"""
+        self._item_listeners += (listener, )
+
+    def remove_item_listener(self, listener):
+        """Unregister a listener previously passed to add_item_listener()"""
+        self._item_listeners = tuple(
+            other for other in self._item_listeners if other != listener)
+
+    def add_symbol(self, reader, symbol):
+        """Add a Symbol reported by `reader`, empty symbols are ignored"""
+        if not symbol.data:
+            return
+        closed = []
+        with self._condition:
+            item = self._by_code.get(symbol.data)
+            # the window may have ended without the item being closed yet
+            if item is not None and \
+                    symbol.timestamp - item.first_seen >= self.window:
+                item = None
+            if item is None and self._open:
+                newest = self._open[-1]
+                if symbol.timestamp - newest.first_seen < self.window:
+                    item = newest
+            if item is None:
+                if len(self._open) >= self.max_open:
+                    closed.append(self._close_oldest())
+                self._sequence += 1
+                item = CorrelatedItem(self._sequence, symbol.timestamp)
+                self._open.append(item)
+                self._condition.notify()
+            item.add(reader, symbol)
+            self._by_code[symbol.data] = item
+        self._publish(closed)
+
+    def _close_oldest(self):
+        item = self._open.popleft()
+        for code in item.codes:
+            if self._by_code.get(code) is item:
+                del self._by_code[code]
+        self.items += 1
+        if item.conflict:
+            self.conflicts += 1
+        self.max_delay = max(
+            self.max_delay, time.time() - item.first_seen - self.window)
+        return item
+
+    def _expired(self, now):
+        closed = []
+        while self._open and self._open[0].first_seen + self.window <= now:
+            closed.append(self._close_oldest())
+        return closed
+
+    def close_expired(self, now=None):
+        """Close and pass on the items whose window has ended"""
+        with self._condition:
+            closed = self._expired(time.time() if now is None else now)
+        self._publish(closed)
+
+    def flush(self):
+        """Close and pass on all open items"""
+        with self._condition:
+            closed = [self._close_oldest() for _ in range(len(self._open))]
+        self._publish(closed)
+
+    def _publish(self, items):
+        for item in items:
+            for listener in self._item_listeners:
+                try:
+                    listener(item)
+                except Exception:
+                    logger.exception('Item listener %r failed' % listener)
+
+    def start(self):
+        """Close items in a background thread as their windows end"""
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = threading.Thread(
+            target=self._run, name='microscan-correlator', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and pass on all open items"""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._stop:
+                        return
+                    now = time.time()
+                    closed = self._expired(now)
+                    if closed:
+                        break
+                    timeout = None
+                    if self._open:
+                        timeout = self._open[0].first_seen + self.window - now
+                    self._condition.wait(timeout)
+            self._publish(closed)
@@ -0,0 +1,178 @@
+"""Trigger, good read, and no-read counters of the reader
+
+The reader counts triggers, good reads, and no-reads. Querying them with
+`MicroscanDriver.read_counters()` takes three short commands, far less than
+reading the configuration, which makes them a cheap health indicator:
+
+```
+poller = CounterPoller(driver, interval=1.0)
+poller.add_listener(lambda counters, delta: print(delta.good_read_rate))
+poller.start()
+```
+
+The counters are queried with `<N>` (no-reads), `<T>` (triggers), and `<V>`
+(good reads), and reset with `<O>`, `<U>`, and `<W>`. The reader answers
+each query with the count as a line of five digits, e.g. `00012`. Counts
+wrap around after 65535.
+"""
+from collections import namedtuple
+import logging
+import re
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+# queries of the no-read, trigger, and good read counters, in this order
+QUERY_COMMANDS = (b'<N>', b'<T>', b'<V>')
+RESET_COMMANDS = b'<O><U><W>'
+COUNTER_MODULO = 65536
+COUNT_PATTERN = re.compile(b'[0-9]{5}')
+
+
+class CounterError(Exception):
+    """Raised when the reader does not answer a counter query
+
+    Unlike serial.SerialException, this does not indicate a port failure, so
+    it does not make the driver reconnect.
+    """
+
+
+DeviceCounters = namedtuple(
+    'DeviceCounters', ['timestamp', 'triggers', 'good_reads', 'no_reads'])
+DeviceCounters.__doc__ = """Counter values read from the reader at
+`timestamp` (`time.time()`)"""
+
+
+class CounterDelta(namedtuple(
+        'CounterDelta', ['interval', 'triggers', 'good_reads', 'no_reads'])):
+    """Change of the counters over `interval` seconds"""
+    __slots__ = ()
+
+    @property
+    def good_read_rate(self):
+        """Good reads as a fraction of all reads, None without reads"""
+        reads = self.good_reads + self.no_reads
+        return self.good_reads / reads if reads else None
+
+
+def counter_delta(previous, current):
+    """CounterDelta between two DeviceCounters
+
+    A counter that decreased is assumed to have wrapped around.
+    """
+    return CounterDelta(
+        current.timestamp - previous.timestamp,
+        *((new - old) % COUNTER_MODULO for old, new in zip(
+            previous[1:], current[1:])))
+
+
+def parse_count(line):
+    """The count in a response line without its line ending, or None if the
+    line is not a count"""
+    if COUNT_PATTERN.fullmatch(line) is None:
+        return None
+    return int(line)
+
+
+class CounterPoller:
+    """Reads the counters of a driver every `interval` seconds
+
+    Listeners registered with add_listener() are called with the new
+    DeviceCounters and the CounterDelta since the previous poll. A poll is
+    postponed while the driver is busy with another operation or the reader
+    is sending data, so it does not delay symbols; `postponed` counts
+    these. With `reset=True`, the counters are reset after every poll. If
+    polling fails, the thread ends and the exception is stored in `error`.
+    """
+    RETRY_INTERVAL = 0.01
+
+    def __init__(self, driver, interval=1.0, reset=False):
+        self.driver = driver
+        self.interval = interval
+        self.reset = reset
+        self.latest = None
+        self.postponed = 0
+        self.error = None
+        self._listeners = ()
+        self._thread = None
+        self._stop = None
+
+    def add_listener(self, listener):
+        """Register a callable that is called with (DeviceCounters,
+        CounterDelta) after each poll but the first"""
+        self._listeners += (listener, )
+
+    def remove_listener(self, listener):
+        """Unregister a listener previously passed to add_listener()"""
+        self._listeners = tuple(
+            other for other in self._listeners if other != listener)
+
+    def start(self):
+        """Poll in a background thread until stop()"""
+        if self._thread is not None:
+            return
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop, ),
+            name='microscan-counters-%s' % self.driver.portname, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def poll(self):
+        """Read the counters if the driver is idle
+
+        Returns the DeviceCounters, or None if the poll was postponed.
+        """
+        driver = self.driver
+        if not driver._lock.acquire(blocking=False):
+            self.postponed += 1
+            return None
+        try:
+            if driver.port.in_waiting:
+                self.postponed += 1
+                return None
+            counters = driver.read_counters(reset=self.reset)
+        finally:
+            driver._lock.release()
+        previous, self.latest = self.latest, counters
+        if previous is not None:
+            if self.reset:
+                delta = CounterDelta(
+                    counters.timestamp - previous.timestamp, *counters[1:])
+            else:
+                delta = counter_delta(previous, counters)
+            for listener in self._listeners:
+                try:
+                    listener(counters, delta)
+                except Exception:
+                    logger.exception('Counter listener %r failed' % listener)
+        return counters
+
+    def _run(self, stop):
+        scheduled = next_poll = time.monotonic()
+        while not stop.wait(max(0.0, next_poll - time.monotonic())):
+            try:
+                counters = self.poll()
+            except Exception as e:
+                logger.warning('Counter polling on %s stopped: %s' % (
+                    self.driver.portname, e))
+                self.error = e
+                return
+            now = time.monotonic()
+            if counters is None:
+                next_poll = now + self.RETRY_INTERVAL
+                continue
+            # keep the polls on a fixed grid, skipping missed ones
+            while scheduled <= now:
+                scheduled += self.interval
+            next_poll = scheduled
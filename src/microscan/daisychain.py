@@ -0,0 +1,120 @@
+"""Readers chained through their auxiliary ports
+
+In daisy chain mode (`AuxiliaryPortMode.DaisyChain` in K101), each reader
+passes the output of the next reader in the chain on to its host port, so
+the symbols of the whole chain arrive on the host port of the first reader.
+With `DaisyChainIdStatus.Enabled`, every reader prefixes its symbols with
+its daisy chain ID, which `DaisyChain` uses to split the driver's symbol
+stream into one stream per reader:
+
+```
+chain = DaisyChain(driver, [b'1/', b'2/', b'3/'])
+chain[b'2/'].add_symbol_listener(print)
+driver.start_symbol_stream()
+```
+
+Commands sent to the first reader are passed down the chain, so
+configure() writes a configuration to all readers at once.
+"""
+import logging
+
+from .symbols import SymbolStream
+
+
+logger = logging.getLogger(__name__)
+
+# the setting that holds each reader's own daisy chain ID
+AUX_PORT_K_CODE = b'K101'
+
+
+class ChainStats:
+    """Counters of one reader in a daisy chain
+
+    Intervals are the times between consecutive symbols of the reader, as
+    received by the host.
+    """
+    def __init__(self):
+        self.symbols = 0
+        self.last_timestamp = None
+        self.max_interval = 0.0
+        self._interval_sum = 0.0
+
+    @property
+    def mean_interval(self):
+        if self.symbols < 2:
+            return None
+        return self._interval_sum / (self.symbols - 1)
+
+    def observe(self, timestamp):
+        if self.last_timestamp is not None:
+            interval = timestamp - self.last_timestamp
+            self.max_interval = max(self.max_interval, interval)
+            self._interval_sum += interval
+        self.last_timestamp = timestamp
+        self.symbols += 1
+
+
+class ChainedReader(SymbolStream):
+    """Symbol stream of one reader in a DaisyChain
+
+    Symbols are passed on without the daisy chain ID prefix, with the
+    timestamp at which the host received them.
+    """
+    def __init__(self, chain, chain_id, max_symbols=1000):
+        super().__init__(
+            '%s#%s' % (chain.driver.portname, chain_id.decode('ascii')),
+            max_symbols)
+        self.chain_id = chain_id
+        self.stats = ChainStats()
+
+
+class DaisyChain:
+    """Demultiplexes the symbols of a daisy chain by daisy chain ID
+
+    `chain_ids` lists the IDs (K101 `daisy_chain_id`, e.g. b'1/') of the
+    readers in the chain. Symbols without a known ID prefix are counted in
+    `unattributed` and dropped.
+    """
+    def __init__(self, driver, chain_ids):
+        self.driver = driver
+        self.readers = {}
+        for chain_id in chain_ids:
+            if isinstance(chain_id, str):
+                chain_id = chain_id.encode('ascii')
+            self.readers[chain_id] = ChainedReader(self, chain_id)
+        # longest IDs first, in case one ID is a prefix of another
+        self._ids = sorted(self.readers, key=len, reverse=True)
+        self.unattributed = 0
+        driver.add_symbol_listener(self._demultiplex)
+
+    def __getitem__(self, chain_id):
+        if isinstance(chain_id, str):
+            chain_id = chain_id.encode('ascii')
+        return self.readers[chain_id]
+
+    def close(self):
+        """Stop demultiplexing the driver's symbols"""
+        self.driver.remove_symbol_listener(self._demultiplex)
+
+    def _demultiplex(self, symbol):
+        data = symbol.data.encode('ascii', errors='ignore')
+        for chain_id in self._ids:
+            if data.startswith(chain_id):
+                reader = self.readers[chain_id]
+                reader.stats.observe(symbol.timestamp)
+                reader._publish_symbol(
+                    symbol.data[len(chain_id):], symbol.timestamp)
+                return
+        self.unattributed += 1
+        logger.info('Symbol without known daisy chain ID: %s' % symbol.data)
+
+    def configure(self, config):
+        """Write `config` to every reader in the chain in one pass
+
+        The configuration is written once to the first reader, which passes
+        the commands down the chain. The auxiliary port setting (K101) is
+        left out, since it holds each reader's own daisy chain ID and the
+        first reader's link to the chain. Change it on each reader
+        individually.
+        """
+        self.driver.write_config(config, exclude=(AUX_PORT_K_CODE, ))
@@ -1,11 +1,84 @@
+from collections import deque
+from copy import copy
 from copy import deepcopy
+from functools import wraps
+import logging
 import re
 import serial
+import threading
 import time
 import warnings
 
+from .cache import DEFAULT_SPOT_CHECK
+from .config import ConfigStreamParser
+from .config import InvalidConfigString
+from .counters import CounterError
+from .counters import DeviceCounters
+from .counters import QUERY_COMMANDS
+from .counters import RESET_COMMANDS
+from .counters import parse_count
+from .config import MicroscanConfigException
 from .config import MicroscanConfiguration
+from .config import PROPERTY_NAMES
+from .config import PostambleStatus
+from .config import REGISTRY
 from .config import TriggerMode
+from .config import unescape_chars
+from .readrate import DECODES_PER_SECOND_COMMAND
+from .readrate import PERCENT_COMMAND
+from .readrate import ReadRateTest
+from .readrate import STOP_COMMAND
+from .symbols import DuplicateFilter
+from .symbols import LineSplitter
+from .symbols import Symbol
+from .trace import INBOUND
+from .trace import OUTBOUND
+from .trace import TraceEvent
+
+
+logger = logging.getLogger(__name__)
+
+
+def _operation(method):
+    """Decorator naming the operation that trace events are attributed to
+
+    Operations may be nested, e.g. connect() calls read_config(). Traffic is
+    attributed to the innermost operation. Operations hold the driver's lock,
+    so they do not interleave with the symbol stream thread.
+
+    With `auto_reconnect`, an outermost operation that fails with a serial
+    port error is retried once after reconnect().
+    """
+    # private helpers of public methods are traced under the public name
+    name = method.__name__.lstrip('_')
+
+    def run(self, args, kwargs):
+        previous = self._operation, self._operation_sequence
+        self._operation_count += 1
+        self._operation = name
+        self._operation_sequence = self._operation_count
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            # traffic after a nested operation belongs to the outer one again
+            self._operation, self._operation_sequence = previous
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            try:
+                return run(self, args, kwargs)
+            except OSError:  # includes serial.SerialException
+                if not self.auto_reconnect or self._operation is not None \
+                        or name in _NO_RECONNECT:
+                    raise
+            self.reconnect()
+            return run(self, args, kwargs)
+    return wrapper
+
+
+# operations that are not retried after reconnecting
+_NO_RECONNECT = ('connect', 'attach', 'reconnect')
 
 
 class MicroscanDriver:
@@ -25,17 +98,69 @@ class MicroscanDriver:
         driver.connect()
         driver.
     ```
+
+    Pass a `microscan.cache.ConfigCache` as `config_cache` to avoid reading
+    the full device configuration on every connect. The optional `device_id`
+    identifies the reader in the cache, in addition to the port name.
+
+    With `auto_reconnect=True`, the driver reopens the serial port when it
+    fails, for example after a USB-serial adapter was briefly disconnected,
+    see reconnect().
+
+    With `suppress_duplicates=N`, symbols equal to one read within the last
+    N seconds are dropped, see `duplicate_filter`.
     """
+    # silence on the line, in characters, after which a <K?> response is
+    # considered complete
+    CONFIG_IDLE_CHARACTERS = 50
+
+    # delays between attempts to reopen the port in reconnect(), in seconds
+    RECONNECT_DELAY = 0.05
+    MAX_RECONNECT_DELAY = 1.0
+    RECONNECT_TIMEOUT = 30.0
+
     def __init__(
             self, portname, baudrate=None, parity=None, stopbits=None,
-            databits=None):
+            databits=None, config_cache=None, device_id=None,
+            auto_reconnect=False, suppress_duplicates=None):
         self.portname = portname
         self.baudrate = baudrate
         self.parity = parity
         self.stopbits = stopbits
         self.databits = databits
+        self.config_cache = config_cache
+        self.device_id = device_id
+        self.auto_reconnect = auto_reconnect
+        self.reconnects = 0
+        self._reconnect_hooks = ()
+        # serial settings of the last connect(), used by reconnect()
+        self._port_settings = None
 
         self._config = None
+        # with lazy connect, individually queried settings until the full
+        # configuration is loaded
+        self._config_pending = False
+        self._settings = {}
+
+        self._trace_hooks = ()
+        self._operation = None
+        # sequence number of the current operation and operations so far
+        self._operation_sequence = 0
+        self._operation_count = 0
+        self._lock = threading.RLock()
+
+        self._symbol_listeners = ()
+        self._symbol_sequence = 0
+        # optional symbols.DuplicateFilter applied to read_barcode() results
+        # and the symbol stream
+        self.duplicate_filter = None
+        if suppress_duplicates:
+            self.duplicate_filter = DuplicateFilter(suppress_duplicates)
+        self._stream_thread = None
+        self._stream_stop = None
+        self.stream_error = None
+        # data received by operations that belongs to the symbol stream
+        self._unread = b''
 
     def __enter__(self):
         self.connect()
@@ -44,8 +169,10 @@ class MicroscanDriver:
     def __exit__(self, *args):
         self.close()
 
+    @_operation
     def connect(
-            self, baudrate=None, parity=None, databits=None, stopbits=None):
+            self, baudrate=None, parity=None, databits=None, stopbits=None,
+            lazy=False):
         """Open a serial port for communication with barcode reader device
 
         Connection settings are taken from three possible locations in the
@@ -66,32 +193,131 @@ class MicroscanDriver:
             - data bits: 7
             - stop bits: 1
             - flow control: none
+
+        With `lazy=True`, the device configuration is not read on connect but
+        on first access to the `config` property. read_barcode() then only
+        queries the few settings it needs.
         """
-        baudrate = baudrate or self.baudrate or 9600
-        parity = parity or self.parity or serial.PARITY_EVEN
-        bytesize = databits or self.databits or serial.SEVENBITS
-        stopbits = stopbits or self.stopbits or serial.STOPBITS_ONE
+        self._port_settings = dict(
+            baudrate=baudrate or self.baudrate or 9600,
+            parity=parity or self.parity or serial.PARITY_EVEN,
+            bytesize=databits or self.databits or serial.SEVENBITS,
+            stopbits=stopbits or self.stopbits or serial.STOPBITS_ONE,
+        )
+        self._open_port()
+        self._load_config(lazy)
 
+    def _open_port(self):
         self.port = serial.Serial(
             self.portname,
-            baudrate=baudrate,
-            parity=parity,
-            bytesize=bytesize,
-            stopbits=stopbits,
             timeout=1,
             xonxoff=False,
             rtscts=False,
             dsrdtr=False,
+            **self._port_settings
         )
 
+    @_operation
+    def reconnect(self, timeout=None):
+        """Reopen the serial port with the settings of the last connect()
+
+        Attempts to open the port are repeated with exponentially increasing
+        delays, from RECONNECT_DELAY up to MAX_RECONNECT_DELAY, for at most
+        `timeout` seconds (default: RECONNECT_TIMEOUT). Raises
+        serial.SerialException if the port could not be reopened.
+
+        Instead of reading the full configuration again, the known
+        configuration is confirmed by querying the spot-check K-codes of the
+        config cache (or cache.DEFAULT_SPOT_CHECK). Only if they differ, for
+        example because a different reader was connected, the configuration
+        is read with read_config(). A running symbol stream continues with
+        the new port.
+        """
+        if self._port_settings is None:
+            raise serial.SerialException(
+                'Cannot reconnect %s, connect() was not called' %
+                self.portname)
+        if timeout is None:
+            timeout = self.RECONNECT_TIMEOUT
+        try:
+            self.port.close()
+        except Exception:
+            pass
+
+        deadline = time.monotonic() + timeout
+        delay = self.RECONNECT_DELAY
+        while True:
+            try:
+                self._open_port()
+                break
+            except OSError as e:  # includes serial.SerialException
+                if time.monotonic() + delay > deadline:
+                    raise serial.SerialException(
+                        'Cannot reconnect %s: %s' % (self.portname, e))
+                time.sleep(delay)
+                delay = min(2 * delay, self.MAX_RECONNECT_DELAY)
+
+        if self._config is not None and not self._config_pending:
+            spot_check = (
+                DEFAULT_SPOT_CHECK if self.config_cache is None
+                else self.config_cache.spot_check)
+            if not self.verify_config(self._config, spot_check):
+                logger.warning(
+                    'Configuration of %s changed, reading it again' %
+                    self.portname)
+                self.read_config()
+        else:
+            self._settings = {}
+
+        self.reconnects += 1
+        for hook in self._reconnect_hooks:
+            hook(self)
+
+    def add_reconnect_hook(self, hook):
+        """Register a callable that is called with the driver after each
+        successful reconnect()"""
+        self._reconnect_hooks += (hook, )
+
+    @_operation
+    def attach(self, port, lazy=False):
+        """Use an already open port instead of opening a serial port
+
+        `port` may be a `serial.Serial` object or any object implementing the
+        same methods, for example `microscan.capture.ReplayPort`. Like
+        connect(), this reads the device configuration unless `lazy` is True.
+        """
+        self.port = port
+        self._load_config(lazy)
+
+    def _load_config(self, lazy=False):
+        """Load the device configuration after opening the port
+
+        Uses the cached configuration if a cache is configured and a spot
+        check of a few settings matches the device, otherwise reads the full
+        configuration. With `lazy=True`, loading is deferred until the
+        configuration is first needed.
+        """
+        self._config = None
+        self._settings = {}
+        self._config_pending = lazy
+        if lazy:
+            return
+        if self.config_cache is not None:
+            cached = self.config_cache.load(self.portname, self.device_id)
+            if cached is not None and self.verify_config(
+                    cached, self.config_cache.spot_check):
+                self._config = cached
+                return
         self._config = self.read_config()
 
     def close(self):
         """Close the serial port
 
         Any subsequent method call that attempts to write to or read from the
-        device will result in a serial.SerialException.
+        device will result in a serial.SerialException. A running symbol
+        stream is stopped first.
         """
+        self.stop_symbol_stream()
         self.port.close()
 
     def write(self, bytes_):
@@ -109,68 +335,433 @@ class MicroscanDriver:
                 'bytes' % bytes_, UnicodeWarning)
             bytes_ = bytes_.encode('ascii')
 
-        self.port.write(bytes_)
+        self._port_write(bytes_)
+
+    def add_trace_hook(self, hook, sample_every=1):
+        """Register a callable that receives a TraceEvent for each transfer
+
+        The hook is called for every chunk of bytes written to or read from
+        the serial port. With `sample_every=N`, only every N-th driver
+        operation is traced, in full. See the `microscan.trace` module for
+        details.
+        """
+        if sample_every < 1:
+            raise ValueError('sample_every must be a positive integer')
+        self._trace_hooks += ((hook, sample_every), )
+
+    def remove_trace_hook(self, hook):
+        """Unregister a hook previously passed to add_trace_hook()"""
+        self._trace_hooks = tuple(
+            (h, n) for h, n in self._trace_hooks if h is not hook)
+
+    def add_symbol_listener(self, listener):
+        """Register a callable that receives a Symbol for each symbol read by
+        the symbol stream, see start_symbol_stream()"""
+        self._symbol_listeners += (listener, )
+
+    def remove_symbol_listener(self, listener):
+        """Unregister a listener previously passed to add_symbol_listener()"""
+        self._symbol_listeners = tuple(
+            other for other in self._symbol_listeners
+            if other != listener)
+
+    @property
+    def symbol_stream_alive(self):
+        """True while the symbol stream thread is running"""
+        return self._stream_thread is not None and \
+            self._stream_thread.is_alive()
+
+    def start_symbol_stream(self, poll_interval=0.01):
+        """Read symbols in a background thread and pass them to listeners
+
+        Meant for continuous read and externally triggered modes, in which the
+        device sends symbols without being asked. The thread checks the port
+        for new data every `poll_interval` seconds and holds the driver's lock
+        only while reading, so other driver methods can be called in between.
+        Note that read_barcode() competes with the stream for symbols.
 
-    def read_config(self, timeout=2.0):
+        If reading from the port fails, the thread reconnects if
+        `auto_reconnect` is enabled. Otherwise, or if reconnecting fails, the
+        thread ends and the exception is stored in `stream_error`.
+
+        Symbols that `duplicate_filter` reports as repeats are not passed on.
+        """
+        if self.symbol_stream_alive:
+            return
+        self.stream_error = None
+        self._stream_stop = threading.Event()
+        self._stream_thread = threading.Thread(
+            target=self._stream_symbols,
+            args=(self._stream_stop, poll_interval),
+            name='microscan-symbols-%s' % self.portname, daemon=True)
+        self._stream_thread.start()
+
+    def stop_symbol_stream(self, timeout=None):
+        """Stop the thread started by start_symbol_stream()"""
+        if self._stream_thread is None:
+            return
+        self._stream_stop.set()
+        if self._stream_thread is not threading.current_thread():
+            self._stream_thread.join(timeout)
+        self._stream_thread = None
+
+    def _stream_symbols(self, stop, poll_interval):
+        splitter = self._line_splitter()
+        while not stop.is_set():
+            try:
+                with self._lock:
+                    try:
+                        waiting = self.port.in_waiting
+                        data = self._port_read(waiting) if waiting else b''
+                    except OSError:  # includes serial.SerialException
+                        if not self.auto_reconnect:
+                            raise
+                        splitter.reset()
+                        self.reconnect()
+                        continue
+                    if self._unread:
+                        data, self._unread = self._unread + data, b''
+            except Exception as e:
+                logger.warning(
+                    'Symbol stream on %s stopped: %s' % (self.portname, e))
+                self.stream_error = e
+                return
+            if not data:
+                stop.wait(poll_interval)
+                continue
+            for line in splitter.feed(data):
+                if line.strip():
+                    self._publish_symbol(line)
+
+    def _line_splitter(self):
+        """LineSplitter for symbols and responses, using the postamble (K142)
+        of the known configuration
+
+        Does not query the device, so it is safe to call from background
+        threads. Lines end with DEFAULT_POSTAMBLE while the postamble is
+        disabled or not known yet.
+        """
+        if not self._config_pending and self._config is not None:
+            postamble = self._config.postamble
+        else:
+            postamble = self._settings.get(b'K142')
+        if postamble is not None and \
+                postamble.status == PostambleStatus.Enabled and \
+                postamble.characters:
+            return LineSplitter(unescape_chars(postamble.characters))
+        return LineSplitter()
+
+    def _unread_symbols(self, data):
+        """Hand data that an operation received but did not consume to the
+        symbol stream thread, which publishes the symbols in it"""
+        if not data.strip():
+            return
+        if self.symbol_stream_alive:
+            self._unread += data
+        else:
+            logger.debug('Discarding %r received on %s' % (
+                data, self.portname))
+
+    def _publish_symbol(self, line):
+        data = line.strip().decode('ascii', errors='ignore')
+        timestamp = time.time()
+        if self._is_duplicate(data, timestamp):
+            return
+        self._symbol_sequence += 1
+        symbol = Symbol(self._symbol_sequence, timestamp, data)
+        for listener in self._symbol_listeners:
+            try:
+                listener(symbol)
+            except Exception:
+                logger.exception('Symbol listener %r failed' % listener)
+
+    def _trace(self, direction, data, timestamp):
+        sequence = self._operation_sequence
+        event = TraceEvent(
+            direction, self._operation or 'write', sequence, timestamp, data)
+        for hook, sample_every in self._trace_hooks:
+            if sequence % sample_every == 0:
+                hook(event)
+
+    # All serial port I/O goes through the following methods, making them the
+    # single interception point for tracing.
+
+    def _port_write(self, data):
+        if self._trace_hooks:
+            self._trace(OUTBOUND, data, time.monotonic())
+        self.port.write(data)
+
+    def _idle_time(self, characters):
+        """Transfer time of `characters` at the port's baud rate, in seconds
+
+        Assumes 10 bits per character (start, 7 data, parity, stop bit) and
+        returns at least 20ms to allow for the device's processing time.
+        """
+        baudrate = getattr(self.port, 'baudrate', None) or self.baudrate
+        return max(0.02, characters * 10 / (baudrate or 9600))
+
+    def _port_read(self, size=1):
+        data = self.port.read(size)
+        if self._trace_hooks and data:
+            self._trace(INBOUND, data, time.monotonic())
+        return data
+
+    def _port_readline(self):
+        data = self.port.readline()
+        if self._trace_hooks and data:
+            self._trace(INBOUND, data, time.monotonic())
+        return data
+
+    def _port_read_all(self):
+        data = self.port.read_all()
+        if self._trace_hooks and data:
+            self._trace(INBOUND, data, time.monotonic())
+        return data
+
+    @_operation
+    def read_config(self, timeout=2.0, idle_time=None):
         """Read device configuration from device by sending the <K?> command
 
+        The response is parsed while it is being received. The device does not
+        indicate the end of the response, so reading stops once every setting
+        in REGISTRY has been received and no data has been received for
+        `idle_time` seconds since. By default, this is the transfer time of
+        CONFIG_IDLE_CHARACTERS characters at the port's baud rate, but at
+        least 20ms.
+
         The `timeout` argument can be used to specify how long the function
         will wait for a complete response from the device. The default value
         (2 seconds) exceeds the typical response time of the device by
-        approximately a factor of two.
+        approximately a factor of two. Settings not received by then have
+        their default values, and the configuration is not stored in the
+        `config_cache`.
+
+        Raises InvalidConfigString after the response has been read if any
+        of the settings could not be decoded.
         """
+        if idle_time is None:
+            idle_time = self._idle_time(self.CONFIG_IDLE_CHARACTERS)
+
         # stop scanning to avoid having symbols mixed with configuration data,
         # see page A-10 of documentation
         self.write(b'<I>')
-        self.port.flush()
-
-        # Send query for all <K...> codes
-        self.write(b'<K?>')
-        # Each line contains multiple <K...> settings, no need to read line by
-        # line. Instead wait until the buffer stops growing, then read entire
-        # response at once.
-        buffer_size = 0
-        start_of_wait = time.time()
-        while True:
-            time.sleep(0.1)
-            prev_buffer_size = buffer_size
-            buffer_size = self.port.in_waiting
-            if buffer_size > 0 and prev_buffer_size == buffer_size:
-                break
-            if time.time() - start_of_wait > timeout:
-                break
-        read_content = self.port.read_all()
-
-        # resume scanning, see page A-10 of documentation
-        self.write(b'<H>')
+        try:
+            self.port.flush()
 
-        # find each setting string and create config from list of lines
-        config_lines = re.findall(b'<K[^>]*>', read_content)
-        cfg = MicroscanConfiguration.from_config_strings(config_lines)
+            # Send query for all <K...> codes
+            self.write(b'<K?>')
+            # Each line contains multiple <K...> settings, parse them as the
+            # bytes arrive instead of waiting for the entire response. Invalid
+            # settings are collected, so the rest of the response is still
+            # read and does not end up in the next operation's data.
+            parser = ConfigStreamParser(strict=False)
+            deadline = time.monotonic() + timeout
+            last_data = time.monotonic()
+            while True:
+                waiting = self.port.in_waiting
+                now = time.monotonic()
+                if waiting:
+                    parser.feed(self._port_read(waiting))
+                    last_data = now
+                elif (parser.complete and not parser.pending and
+                        now - last_data >= idle_time):
+                    break
+                elif now > deadline:
+                    break
+                else:
+                    time.sleep(min(idle_time / 4, 0.01))
+        finally:
+            # resume scanning, see page A-10 of documentation
+            self.write(b'<H>')
+
+        if parser.invalid:
+            raise InvalidConfigString(
+                'Cannot decode config strings %s' % b', '.join(parser.invalid))
+        cfg = parser.config()
         # keep internal copy of device configuration up to date and give
         # requester a copy
         self._config = cfg
+        self._config_pending = False
+        self._settings = {}
+        if not parser.complete:
+            logger.warning(
+                'Configuration response of %s is incomplete, missing '
+                'settings have default values' % self.portname)
+        elif self.config_cache is not None:
+            self.config_cache.store(self.portname, cfg, self.device_id)
         return deepcopy(cfg)
 
-    def write_config(self):
+    @_operation
+    def read_settings(self, k_codes, timeout=1.0):
+        """Query individual settings by sending <Kxxx?> commands
+
+        Much faster than read_config() when only a few settings are needed.
+        Returns a dict mapping each K-code (e.g. b'K200') to a setting object.
+        K-codes for which the device did not respond within `timeout` seconds
+        are missing from the result.
+        """
+        # stop scanning to avoid having symbols mixed with configuration data,
+        # see page A-10 of documentation
+        self.write(b'<I>')
+        try:
+            self.write(b''.join(b'<%s?>' % k_code for k_code in k_codes))
+
+            pending = set(k_codes)
+            settings = {}
+            buffer = b''
+            deadline = time.monotonic() + timeout
+            while pending and time.monotonic() < deadline:
+                buffer += self._port_read(max(1, self.port.in_waiting))
+                end = buffer.rfind(b'>') + 1
+                for match in re.finditer(b'<(K\\d+)[^>]*>', buffer[:end]):
+                    k_code = match.group(1)
+                    if k_code in pending:
+                        settings[k_code] = \
+                            REGISTRY[k_code].from_config_string(
+                                match.group(0))
+                        pending.discard(k_code)
+                buffer = buffer[end:]
+        finally:
+            # resume scanning even if a response could not be parsed, see
+            # page A-10 of documentation
+            self.write(b'<H>')
+        return settings
+
+    @_operation
+    def read_counters(self, reset=False, timeout=1.0):
+        """Query the trigger, good read, and no-read counters
+
+        Returns a `microscan.counters.DeviceCounters`. With `reset=True`, the
+        counters are reset after reading them. The queries are sent one at a
+        time, each answered by the next count received. Other data that
+        arrives with the responses is left to a running symbol stream, and
+        discarded otherwise. Raises microscan.counters.CounterError if the
+        device does not respond within `timeout` seconds.
+        """
+        timestamp = time.time()
+        deadline = time.monotonic() + timeout
+        splitter = self._line_splitter()
+        counts = []
+        stray = []
+        lines = deque()
+        try:
+            for command in QUERY_COMMANDS:
+                self._port_write(command)
+                while True:
+                    if not lines:
+                        if time.monotonic() > deadline:
+                            raise CounterError(
+                                'No response to counter query on %s' %
+                                self.portname)
+                        lines.extend(splitter.feed(
+                            self._port_read(max(1, self.port.in_waiting))))
+                        continue
+                    line = lines.popleft()
+                    count = parse_count(line)
+                    if count is not None:
+                        counts.append(count)
+                        break
+                    stray.append(line)
+        finally:
+            stray.extend(lines)
+            stray.append(splitter.pending)
+            self._unread_symbols(splitter.postamble.join(stray))
+        if reset:
+            self._port_write(RESET_COMMANDS)
+        no_reads, triggers, good_reads = counts
+        return DeviceCounters(timestamp, triggers, good_reads, no_reads)
+
+    @_operation
+    def reset_counters(self):
+        """Reset the trigger, good read, and no-read counters to zero"""
+        self._port_write(RESET_COMMANDS)
+
+    def verify_config(self, config, k_codes):
+        """Check that the device settings for `k_codes` match `config`
+
+        Returns False if any of the settings differs or could not be read.
+        """
+        try:
+            settings = self.read_settings(k_codes)
+        except MicroscanConfigException:
+            return False
+        return all(
+            k_code in settings and
+            settings[k_code].to_config_string() ==
+            config.get_setting(k_code).to_config_string()
+            for k_code in k_codes)
+
+    @_operation
+    def write_config(self, config=None, exclude=()):
         """Write device config to device by sending a series of <K...> commands
+
+        If a `config` argument is given, it replaces the driver's copy of the
+        device configuration before being written.
+
+        Settings whose K-codes are listed in `exclude` are not written, and
+        the driver's copy keeps its previous values for them, if known.
         """
-        if not isinstance(self._config, MicroscanConfiguration):
+        if config is None:
+            config = self.config
+        if not isinstance(config, MicroscanConfiguration):
             raise TypeError(
                 'Expected MicroscanConfiguration but found %s' %
-                type(self._config).__name__)
+                type(config).__name__)
+        if exclude:
+            previous = self.config
+            if previous is not None:
+                config = copy(config)
+                for k_code in exclude:
+                    setattr(
+                        config, PROPERTY_NAMES[k_code],
+                        previous.get_setting(k_code))
+            config_string = b''.join(
+                config.get_setting(k_code).to_config_string()
+                for k_code in REGISTRY if k_code not in exclude)
+        else:
+            config_string = config.to_config_string()
+        self._config = config
+        self._config_pending = False
+        self._settings = {}
 
         # stop scanning, see page A-10 of documentation
         self.write(b'<I>')
         # write concatenated config string
-        self.write(self._config.to_config_string())
+        self.write(config_string)
         # resume scanning, see page A-10 of documentation
         self.write(b'<H>')
+        if self.config_cache is not None:
+            self.config_cache.store(
+                self.portname, self._config, self.device_id)
 
     @property
     def config(self):
+        """The device configuration, read from the device on first access
+        after a lazy connect"""
+        if self._config_pending:
+            self.read_config()
         return self._config
 
+    def _get_settings(self, *k_codes):
+        """Return setting objects for K-codes, querying only what's missing
+
+        Uses the full configuration if it has been loaded. Otherwise, after a
+        lazy connect, queries the settings that have not been queried before
+        with a single read_settings() call.
+        """
+        if not self._config_pending:
+            return [self._config.get_setting(k_code) for k_code in k_codes]
+        missing = [k for k in k_codes if k not in self._settings]
+        if missing:
+            self._settings.update(self.read_settings(missing))
+            if any(k_code not in self._settings for k_code in missing):
+                # the device did not respond to the targeted query, fall back
+                # to the full configuration
+                return [
+                    self.config.get_setting(k_code) for k_code in k_codes]
+        return [self._settings[k_code] for k_code in k_codes]
+
+    @_operation
     def read_barcode(self):
         """Reads a single barcode symbol from the device
 
@@ -183,21 +774,26 @@ class MicroscanDriver:
         If serial trigger is disabled, the most recently read barcode is
         returned if any data is in the serial in buffer, otherwise the method
         will block and wait for the next barcode until the serial read timeout.
+
+        If a `duplicate_filter` is set, symbols it reports as repeats are
+        returned as an empty string, like a timeout.
         """
-        if self._config.trigger.trigger_mode == TriggerMode.SerialData:
-            if self._config.start_trigger_character.start_trigger_character:
-                as_hex = self._config.start_trigger_character.start_trigger_character  # nopep8
+        trigger_setting, serial_trigger, start_trigger = self._get_settings(
+            b'K200', b'K201', b'K229')
+        if trigger_setting.trigger_mode == TriggerMode.SerialData:
+            if start_trigger.start_trigger_character:
+                as_hex = start_trigger.start_trigger_character
                 trigger = bytes([int(as_hex, 16)])
             else:
-                trigger = b'<%s>' % self._config.serial_trigger.serial_trigger_character  # nopep8
+                trigger = b'<%s>' % serial_trigger.serial_trigger_character
             # discard any symbols read before trigger is sent
             self.port.flush()
-            self.port.write(trigger)
-            line = self.port.readline()
+            self._port_write(trigger)
+            line = self._port_readline()
         else:
             # when not triggering with a serial command, assume that one or
             # more barcodes are already in the buffer
-            buffer_contents = self.port.read_all()
+            buffer_contents = self._port_read_all()
             # TODO: Use postamble setting instead of default '\r\n'
             lines = buffer_contents.split(b'\r\n')
             # the buffer was [bc1][postamble][bc2][postample]..., therefore the
@@ -207,9 +803,18 @@ class MicroscanDriver:
                 line = lines[-2]
             # if there wasn't a line, wait until timeout
             else:
-                line = self.port.readline()
+                line = self._port_readline()
 
-        return line.strip().decode('ascii', errors='ignore')
+        data = line.strip().decode('ascii', errors='ignore')
+        if self._is_duplicate(data):
+            return ''
+        return data
+
+    def _is_duplicate(self, data, timestamp=None):
+        duplicate_filter = self.duplicate_filter
+        if duplicate_filter is None or not data:
+            return False
+        return duplicate_filter.is_duplicate(data, timestamp)
 
 
 class MS2Driver(MicroscanDriver):
@@ -222,3 +827,55 @@ class MS3Driver(MicroscanDriver):
     """
     Extends MicroscanDriver with features specific to the MS3 barcode reader
     """
+    _read_rate_test = None
+    _resume_symbol_stream = False
+
+    def close(self):
+        """Close the serial port, after ending a running read rate test"""
+        if self._read_rate_test is not None:
+            self.stop_read_rate_test()
+        super().close()
+
+    def start_read_rate_test(self, percent=False, poll_interval=0.01):
+        """Start a read rate test, returns a `microscan.readrate.ReadRateTest`
+
+        The reader reports decodes per second or, with `percent=True`, the
+        percentage of scans that decoded. Iterate over the returned test to
+        receive the reports as they arrive. Like the symbol stream, the test
+        checks the port for reports every `poll_interval` seconds, holding
+        the driver's lock only while reading. A running symbol stream is
+        paused until stop_read_rate_test().
+        """
+        self.stop_read_rate_test()
+        resume = self.symbol_stream_alive
+        # the stream thread takes the driver's lock to read, so it must be
+        # stopped and joined without holding the lock
+        self.stop_symbol_stream()
+        self._resume_symbol_stream = resume
+        return self._start_read_rate_test(percent, poll_interval)
+
+    @_operation
+    def _start_read_rate_test(self, percent, poll_interval):
+        self._port_write(PERCENT_COMMAND if percent else
+                         DECODES_PER_SECOND_COMMAND)
+        self._read_rate_test = ReadRateTest(self, percent, poll_interval)
+        self._read_rate_test.start()
+        return self._read_rate_test
+
+    def stop_read_rate_test(self, timeout=2.0):
+        """End the read rate test started by start_read_rate_test()"""
+        test = self._read_rate_test
+        if test is None:
+            return
+        self._read_rate_test = None
+        self._stop_read_rate_test()
+        # the test thread takes the driver's lock to read, so it is joined
+        # without holding the lock
+        test.stop(timeout)
+        if self._resume_symbol_stream:
+            self._resume_symbol_stream = False
+            self.start_symbol_stream()
+
+    @_operation
+    def _stop_read_rate_test(self):
+        self._port_write(STOP_COMMAND)
@@ -0,0 +1,179 @@
+"""Operations on many barcode readers at once
+
+`rollout()` writes the same configuration ("recipe") to a list of connected
+drivers concurrently, verifies each reader by reading back the settings that
+changed, and rolls every reader back to its previous configuration if any of
+them fails:
+
+```
+report = rollout(drivers, recipe)
+if not report.succeeded:
+    for outcome in report.outcomes:
+        print(outcome.driver.portname, outcome.status, outcome.error)
+```
+
+Each driver talks to its own serial port, so the readers are configured in
+parallel threads and the duration of a rollout is bounded by the slowest
+reader.
+
+The host and auxiliary port settings, the host protocol, and the daisy chain
+ID (`DEVICE_SPECIFIC`) are left alone by default, since writing a recipe's
+values for them could cut off or readdress every reader at once.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+from .config import REGISTRY
+
+
+OK = 'ok'
+FAILED = 'failed'
+ROLLED_BACK = 'rolled_back'
+ROLLBACK_FAILED = 'rollback_failed'
+
+
+"""K-codes of the communication and identity settings of a reader
+
+K100 (host port), K101 (auxiliary port and daisy chain ID), K102 (RS-422) and
+K140 (host protocol) are not written by `rollout()` unless requested.
+"""
+DEVICE_SPECIFIC = (b'K100', b'K101', b'K102', b'K140')
+
+
+DeviceOutcome = namedtuple(
+    'DeviceOutcome', ['driver', 'status', 'changed', 'mismatches', 'error'])
+DeviceOutcome.__doc__ = """Result of a rollout for a single reader
+
+- driver: the MicroscanDriver
+- status: one of OK, FAILED, ROLLED_BACK, ROLLBACK_FAILED
+- changed: K-codes that differed between previous and target configuration
+- mismatches: K-codes whose read back value did not match after writing
+- error: exception raised while writing or verifying, or None
+"""
+
+
+def changed_settings(old, new, exclude=()):
+    """List the K-codes whose settings differ between two configurations
+
+    K-codes listed in `exclude` are never reported.
+    """
+    return [
+        k_code for k_code in REGISTRY
+        if k_code not in exclude and
+        old.get_setting(k_code).to_config_string() !=
+        new.get_setting(k_code).to_config_string()]
+
+
+def _write_and_verify(driver, config, k_codes, timeout, exclude):
+    """Write `config` except for `exclude` to the device and read back
+    `k_codes`
+
+    Returns a tuple (mismatches, error).
+    """
+    try:
+        driver.write_config(deepcopy(config), exclude=exclude)
+        settings = driver.read_settings(k_codes, timeout=timeout)
+    except Exception as e:
+        return list(k_codes), e
+    mismatches = [
+        k_code for k_code in k_codes
+        if k_code not in settings or
+        settings[k_code].to_config_string() !=
+        config.get_setting(k_code).to_config_string()]
+    return mismatches, None
+
+
+class RolloutReport:
+    """Per-device outcomes of a rollout()"""
+    def __init__(self, outcomes, rolled_back):
+        self.outcomes = outcomes
+        self.rolled_back = rolled_back
+
+    @property
+    def succeeded(self):
+        return all(outcome.status == OK for outcome in self.outcomes)
+
+    @property
+    def failed(self):
+        return [o for o in self.outcomes if o.status != OK]
+
+
+def rollout(drivers, config, rollback=True, verify_timeout=1.0,
+            max_workers=None, exclude=DEVICE_SPECIFIC):
+    """Write a configuration to many readers in parallel
+
+    For each driver, the settings that differ from the driver's current
+    configuration are determined, the configuration is written, and the
+    changed settings are read back for verification. Readers without changes
+    are left alone. Settings whose K-codes are listed in `exclude` are
+    neither compared nor written, so each reader keeps its own values for
+    them; pass `exclude=()` to write the full configuration.
+
+    If writing or verification fails on any reader and `rollback` is True,
+    the previous configuration is written back to every reader that was
+    written to, and verified in the same way. Readers that were not
+    written to keep their status. A reader whose current configuration
+    cannot be read is not written to and fails the rollout.
+
+    Returns a RolloutReport.
+    """
+    drivers = list(drivers)
+    if not drivers:
+        return RolloutReport([], False)
+
+    def snapshot(driver):
+        try:
+            return deepcopy(driver.config), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(drivers)) as pool:
+        # driver.config may read the configuration from the device after a
+        # lazy connect, so take the snapshots in parallel as well
+        snapshots = list(pool.map(snapshot, drivers))
+        previous = [prev for prev, _ in snapshots]
+        changed = [
+            [] if prev is None else changed_settings(prev, config, exclude)
+            for prev in previous]
+
+        def apply(index):
+            prev, error = snapshots[index]
+            if prev is None:
+                # the previous configuration is unknown, so do not write
+                # anything that could not be rolled back
+                return [], error
+            if not changed[index]:
+                return [], None
+            return _write_and_verify(
+                drivers[index], config, changed[index], verify_timeout,
+                exclude)
+
+        results = list(pool.map(apply, range(len(drivers))))
+        outcomes = [
+            DeviceOutcome(
+                driver, OK if not mismatches and error is None else FAILED,
+                k_codes, mismatches, error)
+            for driver, k_codes, (mismatches, error)
+            in zip(drivers, changed, results)]
+
+        if not rollback or all(o.status == OK for o in outcomes):
+            return RolloutReport(outcomes, False)
+
+        def revert(index):
+            if not changed[index]:
+                return None
+            return _write_and_verify(
+                drivers[index], previous[index], changed[index],
+                verify_timeout, exclude)
+
+        rollback_results = list(pool.map(revert, range(len(drivers))))
+
+    # readers that were not written to keep their status
+    outcomes = [
+        outcome if result is None else outcome._replace(
+            status=ROLLED_BACK if not result[0] and result[1] is None
+            else ROLLBACK_FAILED,
+            error=outcome.error or result[1])
+        for outcome, result in zip(outcomes, rollback_results)]
+    return RolloutReport(outcomes, True)
@@ -0,0 +1,206 @@
+"""Split GS1-128 (EAN-128) symbols into application identifier fields
+
+With EAN-128 enabled in the Code 128 setting (K474), a symbol consists of
+fields that each start with an application identifier (AI) of 2 to 4 digits
+followed by the field's data. `GS1Parser` splits the symbol data returned by
+the driver into a dict mapping AIs to values, for the output format the
+reader is configured for:
+
+```
+parser = GS1Parser.from_config(driver.config)
+parser.parse(driver.read_barcode())
+# {'01': '09501101530003', '17': '250101', '10': 'AB-123'}
+```
+
+In the standard output format, fields are concatenated as they are encoded
+in the symbol, with a GS character (FNC1) after variable length fields. In
+the application record format, the reader can put brackets around the AIs,
+a separator character between the fields, and pad variable length fields to
+their maximum length (with spaces, which are stripped).
+
+Field lengths come from the tables below rather than regular expressions: the
+first two digits of an AI determine its length, and the AI determines
+whether its data has a fixed length and its maximum length.
+"""
+from .config import ApplicationRecordBrackets
+from .config import ApplicationRecordPadding
+from .config import ApplicationRecordSeparatorStatus
+from .config import Code128OutputFormat
+from .config import unescape_chars
+
+
+# FNC1 as transmitted by the reader
+GS = '\x1d'
+# symbology identifier of GS1-128, see the Symbology ID setting (K450)
+SYMBOLOGY_ID = ']C1'
+
+# number of digits of the AIs starting with the given two digits
+AI_DIGITS = {}
+for _prefix in (
+        '00', '01', '02', '03', '10', '11', '12', '13', '15', '16', '17',
+        '20', '21', '22', '30', '37', '90', '91', '92', '93', '94', '95',
+        '96', '97', '98', '99'):
+    AI_DIGITS[_prefix] = 2
+for _prefix in ('23', '24', '25', '40', '41', '42', '71'):
+    AI_DIGITS[_prefix] = 3
+for _prefix in (
+        '31', '32', '33', '34', '35', '36', '39', '43', '70', '72', '80',
+        '81', '82'):
+    AI_DIGITS[_prefix] = 4
+
+# AI -> (fixed data length or None, maximum data length)
+AI_LENGTHS = {
+    '00': (18, 18), '01': (14, 14), '02': (14, 14), '03': (14, 14),
+    '10': (None, 20), '11': (6, 6), '12': (6, 6), '13': (6, 6),
+    '15': (6, 6), '16': (6, 6), '17': (6, 6), '20': (2, 2),
+    '21': (None, 20), '22': (None, 20), '30': (None, 8), '37': (None, 8),
+    '90': (None, 30),
+    '235': (None, 28), '240': (None, 30), '241': (None, 30),
+    '242': (None, 6), '243': (None, 20), '250': (None, 30),
+    '251': (None, 30), '253': (None, 30), '254': (None, 20),
+    '255': (None, 25),
+    '400': (None, 30), '401': (None, 30), '402': (17, 17),
+    '403': (None, 30), '420': (None, 20), '421': (None, 12),
+    '422': (3, 3), '423': (None, 15), '424': (3, 3), '425': (None, 15),
+    '426': (3, 3), '427': (None, 3),
+    '7001': (13, 13), '7002': (None, 30), '7003': (10, 10),
+    '7004': (None, 4), '7005': (None, 12), '7006': (6, 6),
+    '7007': (None, 12), '7008': (None, 3), '7009': (None, 10),
+    '7010': (None, 2),
+    '8001': (14, 14), '8002': (None, 20), '8003': (None, 30),
+    '8004': (None, 30), '8005': (6, 6), '8006': (18, 18),
+    '8007': (None, 34), '8008': (None, 12), '8009': (None, 50),
+    '8010': (None, 30), '8011': (None, 12), '8012': (None, 20),
+    '8013': (None, 25), '8017': (18, 18), '8018': (18, 18),
+    '8019': (None, 10), '8020': (None, 25), '8026': (18, 18),
+    '8110': (None, 70), '8111': (4, 4), '8112': (None, 70),
+    '8200': (None, 70),
+}
+for _n in range(91, 100):
+    AI_LENGTHS[str(_n)] = (None, 90)
+for _n in range(10):
+    # trade measures, the last digit is the decimal point position
+    for _prefix in range(310, 370):
+        AI_LENGTHS['%d%d' % (_prefix, _n)] = (6, 6)
+    AI_LENGTHS['390%d' % _n] = (None, 15)
+    AI_LENGTHS['391%d' % _n] = (None, 18)
+    AI_LENGTHS['392%d' % _n] = (None, 15)
+    AI_LENGTHS['393%d' % _n] = (None, 18)
+    AI_LENGTHS['394%d' % _n] = (4, 4)
+    AI_LENGTHS['395%d' % _n] = (6, 6)
+for _n in range(410, 418):
+    AI_LENGTHS[str(_n)] = (13, 13)
+for _n in range(710, 716):
+    AI_LENGTHS[str(_n)] = (None, 20)
+# AIs with a known prefix but not in the table
+DEFAULT_LENGTH = (None, 90)
+
+
+class GS1Error(ValueError):
+    """Raised for symbol data that is not valid GS1-128"""
+
+
+class GS1Parser:
+    """Splits GS1-128 symbol data into a dict mapping AIs to values
+
+    `separator` is the application record separator character, if enabled.
+    With `brackets`, AIs are enclosed in parentheses. With `padding`,
+    variable length fields are padded to their maximum length.
+    """
+    def __init__(self, separator=None, brackets=False, padding=False):
+        if isinstance(separator, bytes):
+            separator = separator.decode('ascii')
+        self.separator = separator or None
+        self.brackets = brackets
+        self.padding = padding
+        # characters that end a variable length field
+        self._terminators = tuple(
+            c for c in (GS, self.separator, '(' if brackets else None) if c)
+
+    @classmethod
+    def from_config(cls, config):
+        """Parser for the output format configured in `config`, a
+        MicroscanConfiguration or its Code 128 setting"""
+        code128 = getattr(config, 'code128', config)
+        if code128.output_format != Code128OutputFormat.ApplicationRecord:
+            return cls()
+        separator = None
+        if code128.application_record_separator_status == \
+                ApplicationRecordSeparatorStatus.Enabled:
+            # control characters are escaped in the configuration, e.g. ^^
+            separator = unescape_chars(
+                code128.application_record_separator_character or b'')
+        return cls(
+            separator=separator,
+            brackets=code128.application_record_brackets ==
+            ApplicationRecordBrackets.Enabled,
+            padding=code128.application_record_padding ==
+            ApplicationRecordPadding.Enabled)
+
+    def parse(self, data):
+        """Split `data` into fields, returns a dict mapping AI to value
+
+        A leading symbology identifier and FNC1 are skipped.
+        """
+        if data.startswith(SYMBOLOGY_ID):
+            data = data[len(SYMBOLOGY_ID):]
+        position = 1 if data.startswith(GS) else 0
+        end = len(data)
+        fields = {}
+        while position < end:
+            if self.brackets:
+                if data[position] != '(':
+                    raise GS1Error(
+                        'Expected ( at position %d of %r' % (position, data))
+                close = data.find(')', position + 1)
+                if close < 0:
+                    raise GS1Error('Unterminated AI in %r' % data)
+                ai = data[position + 1:close]
+                position = close + 1
+            else:
+                try:
+                    digits = AI_DIGITS[data[position:position + 2]]
+                except KeyError:
+                    raise GS1Error(
+                        'Unknown AI at position %d of %r' % (position, data))
+                ai = data[position:position + digits]
+                position += digits
+            fixed, maximum = AI_LENGTHS.get(ai, DEFAULT_LENGTH)
+            if fixed is not None:
+                field_end = position + fixed
+                value = data[position:field_end]
+                if len(value) < fixed:
+                    raise GS1Error(
+                        'AI %s needs %d characters in %r' % (ai, fixed, data))
+            elif self.padding:
+                field_end = position + maximum
+                value = data[position:field_end].strip(' ')
+            else:
+                field_end = end
+                for terminator in self._terminators:
+                    found = data.find(terminator, position, field_end)
+                    if found >= 0:
+                        field_end = found
+                value = data[position:field_end]
+                if len(value) > maximum:
+                    raise GS1Error(
+                        'AI %s allows at most %d characters in %r' %
+                        (ai, maximum, data))
+            fields[ai] = value
+            position = field_end
+            # skip the separator or FNC1 after the field
+            if position < end and data[position] in (GS, self.separator):
+                position += 1
+        return fields
+
+    def parse_symbols(self, symbols):
+        """Parse an iterable of Symbols, yields (symbol, fields) tuples
+
+        Symbols that are not valid GS1-128 are yielded with fields None.
+        """
+        for symbol in symbols:
+            try:
+                fields = self.parse(symbol.data)
+            except GS1Error:
+                fields = None
+            yield symbol, fields
@@ -0,0 +1,269 @@
+"""Columnar storage of configuration snapshots from many readers
+
+`ConfigHistory` stores configuration snapshots column-wise: one typed array
+per field of every setting in `REGISTRY`, plus arrays for the snapshot
+timestamps and reader names. Enum fields are stored as one byte per snapshot,
+integer fields as 32-bit integers, and text fields as dictionary-encoded
+indices. Compared to keeping MicroscanConfiguration objects, this uses a
+small fraction of the memory, and queries over a field run in C loops over a
+single array:
+
+```
+history = ConfigHistory()
+history.append('line1-reader3', driver.config, time.time())
+...
+history.differs(recipe, 'code128', 'status', start=time.time() - 3600)
+```
+
+Snapshots must be appended in chronological order, which allows time ranges
+to be found by binary search.
+"""
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from copy import copy
+from enum import Enum
+from itertools import compress
+from itertools import repeat
+from operator import ne
+import time
+
+from .config import MicroscanConfiguration
+from .config import REGISTRY
+from .config import setting_fields
+from .config import setting_property_name
+
+
+class _EnumColumn:
+    """Enum values stored as one byte per snapshot, the member's position"""
+    TYPECODE = 'B'
+    NONE = 0xff
+
+    def __init__(self, enum_cls):
+        self.members = list(enum_cls)
+        self.codes = {member: i for i, member in enumerate(self.members)}
+        self.codes[None] = self.NONE
+        self.data = array(self.TYPECODE)
+
+    def encode(self, value):
+        return self.codes[value]
+
+    def lookup(self, value):
+        return self.codes.get(value)
+
+    def decode(self, code):
+        return None if code == self.NONE else self.members[code]
+
+
+class _IntColumn:
+    """Integer values stored as signed 32-bit integers"""
+    TYPECODE = 'i'
+    NONE = -2 ** 31
+
+    def __init__(self):
+        self.data = array(self.TYPECODE)
+
+    def encode(self, value):
+        return self.NONE if value is None else value
+
+    def lookup(self, value):
+        return self.encode(value)
+
+    def decode(self, code):
+        return None if code == self.NONE else code
+
+
+class _TextColumn:
+    """Any other values, dictionary-encoded as indices into a value table
+
+    Strings are stored as bytes, as parsed from the device, so that default
+    values such as ',' equal parsed values such as b','.
+    """
+    TYPECODE = 'I'
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+        self.data = array(self.TYPECODE)
+
+    def encode(self, value):
+        if isinstance(value, str):
+            value = value.encode('ascii')
+        try:
+            return self.codes[value]
+        except KeyError:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            return code
+
+    def lookup(self, value):
+        """Code of a value without adding it, None if it was never stored"""
+        if isinstance(value, str):
+            value = value.encode('ascii')
+        return self.codes.get(value)
+
+    def decode(self, code):
+        return self.values[code]
+
+
+def _column_for(default):
+    if isinstance(default, Enum):
+        return _EnumColumn(type(default))
+    if isinstance(default, int):
+        return _IntColumn()
+    return _TextColumn()
+
+
+class ConfigHistory:
+    """Append-only columnar store of configuration snapshots
+
+    Columns are keyed by (setting, field) tuples, where setting is the
+    MicroscanConfiguration attribute name and field is the setting's
+    attribute, for example ('trigger', 'trigger_mode').
+    """
+    def __init__(self):
+        self.timestamps = array('d')
+        self.readers = array('I')
+        self._reader_names = []
+        self._reader_codes = {}
+        self._last_index = {}
+        self.columns = OrderedDict()
+        self._layout = []
+        for serializer in REGISTRY.values():
+            prop = setting_property_name(serializer)
+            fields = []
+            for name, default in setting_fields(serializer):
+                column = _column_for(default)
+                self.columns[(prop, name)] = column
+                fields.append((name, column))
+            self._layout.append((prop, serializer, fields))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def reader_names(self):
+        return list(self._reader_names)
+
+    def append(self, reader, config, timestamp=None):
+        """Add a snapshot of `config` taken from `reader` at `timestamp`
+
+        `reader` is any hashable identifier, for example a port name.
+        `timestamp` defaults to the current time and must not be earlier than
+        the timestamp of the previously appended snapshot.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            raise ValueError(
+                'Snapshots must be appended in chronological order')
+
+        # encode all values before appending anything so that a failure does
+        # not leave columns of different lengths behind
+        encoded = []
+        for prop, _, fields in self._layout:
+            setting = getattr(config, prop)
+            for name, column in fields:
+                encoded.append((column, column.encode(getattr(setting, name))))
+
+        try:
+            reader_code = self._reader_codes[reader]
+        except KeyError:
+            reader_code = self._reader_codes[reader] = len(self._reader_names)
+            self._reader_names.append(reader)
+
+        for column, code in encoded:
+            column.data.append(code)
+        self._last_index[reader_code] = len(self.timestamps)
+        self.readers.append(reader_code)
+        self.timestamps.append(timestamp)
+
+    def index_range(self, start=None, stop=None):
+        """Indices (lo, hi) of the snapshots with start <= timestamp < stop
+        """
+        lo = 0 if start is None else bisect_left(self.timestamps, start)
+        hi = len(self) if stop is None else bisect_left(self.timestamps, stop)
+        return lo, max(lo, hi)
+
+    def slice(self, start=None, stop=None):
+        """New ConfigHistory with the snapshots in a time range"""
+        lo, hi = self.index_range(start, stop)
+        other = ConfigHistory.__new__(ConfigHistory)
+        other.timestamps = self.timestamps[lo:hi]
+        other.readers = self.readers[lo:hi]
+        # the slice may be appended to, so it gets its own lookup tables
+        other._reader_names = list(self._reader_names)
+        other._reader_codes = dict(self._reader_codes)
+        other._last_index = dict(zip(other.readers, range(hi - lo)))
+        other.columns = OrderedDict()
+        other._layout = []
+        for prop, serializer, fields in self._layout:
+            other_fields = []
+            for name, column in fields:
+                sliced = copy(column)
+                sliced.data = column.data[lo:hi]
+                if isinstance(column, _TextColumn):
+                    sliced.values = list(column.values)
+                    sliced.codes = dict(column.codes)
+                other.columns[(prop, name)] = sliced
+                other_fields.append((name, sliced))
+            other._layout.append((prop, serializer, other_fields))
+        return other
+
+    def values(self, setting, field, start=None, stop=None):
+        """Decoded values of one field for the snapshots in a time range"""
+        column = self.columns[(setting, field)]
+        lo, hi = self.index_range(start, stop)
+        return [column.decode(code) for code in column.data[lo:hi]]
+
+    def differs(self, recipe, setting, field, start=None, stop=None):
+        """Readers with at least one snapshot in a time range where a field
+        differs from its value in the `recipe` configuration
+
+        Returns a list of reader identifiers in order of first appearance.
+        """
+        column = self.columns[(setting, field)]
+        # a query does not add the recipe's value to the value tables
+        target = column.lookup(getattr(getattr(recipe, setting), field))
+        lo, hi = self.index_range(start, stop)
+        data = column.data[lo:hi]
+
+        if target is None:
+            # no snapshot has the recipe's value
+            codes = OrderedDict.fromkeys(self.readers[lo:hi])
+            return [self._reader_names[code] for code in codes]
+        if column.TYPECODE == 'B':
+            # fast path for the common case of no drift: a single C-level
+            # byte count over the whole column
+            raw = data.tobytes()
+            if raw.count(bytes([target])) == len(raw):
+                return []
+
+        differing = compress(
+            self.readers[lo:hi], map(ne, data, repeat(target)))
+        codes = OrderedDict.fromkeys(differing)
+        return [self._reader_names[code] for code in codes]
+
+    def snapshot(self, index):
+        """Reconstruct the configuration and metadata of a single snapshot
+
+        Returns a tuple (reader, timestamp, MicroscanConfiguration).
+        """
+        config = MicroscanConfiguration.__new__(MicroscanConfiguration)
+        for prop, serializer, fields in self._layout:
+            setattr(config, prop, serializer(**{
+                name: column.decode(column.data[index])
+                for name, column in fields}))
+        return (
+            self._reader_names[self.readers[index]], self.timestamps[index],
+            config)
+
+    def latest(self, reader):
+        """Most recent snapshot of a reader, as returned by snapshot()
+
+        Returns None if there is no snapshot of the reader.
+        """
+        index = self._last_index.get(self._reader_codes.get(reader))
+        if index is None:
+            return None
+        return self.snapshot(index)
@@ -0,0 +1,289 @@
+"""Multidrop (RS-485) bus master for up to 50 readers on one serial line
+
+In the `Protocol.Multidrop` host protocol (K140 value 5), every reader on the
+bus has an address from 1 to 50 and only talks when the host addresses it.
+The host polls a reader with RES, its poll address, and REQ, and the reader
+answers like in Polling Mode D: with a frame STX, data, ETX, LRC or with
+RES. Frames are confirmed with the reader's poll address followed by ACK or
+NAK. To send a command, the host selects a reader with RES, its select
+address, and REQ, waits for ACK, and sends the command as a frame.
+
+`MultidropBus` schedules the polls and hands out a `ReaderHandle` per
+address, which offers the symbol related part of the `MicroscanDriver`
+interface:
+
+```
+bus = MultidropBus(serial.Serial('/dev/ttyUSB0', 9600, ...), range(1, 51))
+bus[7].add_symbol_listener(print)
+bus[12].write(b'<K200,4>')
+bus.start()
+```
+
+Scheduling: a reader that just sent a symbol is polled again in the next
+round, since it may have more. Each poll without data doubles the reader's
+poll interval, up to `max_poll_interval`. Among the readers that are due,
+the one that has been waiting longest is polled first, so active readers are
+served round-robin. A reader is therefore polled at least every
+`max_poll_interval` seconds plus the time of one poll of every other reader,
+which bounds its symbol latency, while idle readers use little bus time.
+The ACK for a symbol is sent in the same write as the next poll.
+"""
+import logging
+import threading
+import time
+
+from .polling import ACK
+from .polling import BITS_PER_CHARACTER
+from .polling import CORRUPT
+from .polling import EMPTY
+from .polling import FrameParser
+from .polling import NAK
+from .polling import PollingError
+from .polling import REQ
+from .polling import RES
+from .polling import frame_message
+from .symbols import SymbolStream
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ADDRESS = 50
+
+
+def poll_address(address):
+    """Byte that addresses reader `address` (1 to 50) in polls"""
+    if not 1 <= address <= MAX_ADDRESS:
+        raise ValueError(
+            'Multidrop addresses range from 1 to %d, not %d' %
+            (MAX_ADDRESS, address))
+    return bytes([0x1c + 2 * (address - 1)])
+
+
+def select_address(address):
+    """Byte that addresses reader `address` (1 to 50) in selects"""
+    return bytes([poll_address(address)[0] + 1])
+
+
+class ReaderStats:
+    """Counters of one reader on a multidrop bus
+
+    `max_poll_gap` is the longest time between two polls of the reader, an
+    upper bound of the time a symbol waited in the reader.
+    """
+    def __init__(self):
+        self.polls = 0
+        self.symbols = 0
+        self.retransmits = 0
+        self.timeouts = 0
+        self.max_poll_gap = 0.0
+        self.last_poll = None
+
+
+class ReaderHandle(SymbolStream):
+    """One reader on a MultidropBus
+
+    read_barcode() requires the bus to be polling, see MultidropBus.start().
+    """
+    def __init__(self, bus, address, max_symbols=1000):
+        super().__init__('%s#%d' % (bus.portname, address), max_symbols)
+        self.bus = bus
+        self.address = address
+        self.stats = ReaderStats()
+        # scheduler state
+        self.poll_interval = 0.0
+        self.next_poll = 0.0
+
+    def write(self, bytes_):
+        """Send a command, for example a configuration string, to the reader
+        """
+        self.bus.send_command(self.address, bytes_)
+
+
+class MultidropBus:
+    """Bus master polling the readers at `addresses` over one serial port
+
+    `port` is an open `serial.Serial` or compatible object. A reader that
+    does not answer within `response_timeout` (default: the transfer time of
+    64 characters, at least 20ms) counts as a poll without data.
+    """
+    def __init__(
+            self, port, addresses, max_poll_interval=0.5,
+            min_poll_interval=0.01, response_timeout=None, retries=3):
+        self.port = port
+        self.portname = getattr(port, 'port', None) or 'multidrop'
+        self.baudrate = getattr(port, 'baudrate', None) or 9600
+        self.max_poll_interval = max_poll_interval
+        self.min_poll_interval = min_poll_interval
+        self.response_timeout = response_timeout or max(
+            0.02, 64 * BITS_PER_CHARACTER / self.baudrate)
+        self.retries = retries
+        self.readers = {}
+        for address in addresses:
+            poll_address(address)
+            self.readers[address] = ReaderHandle(self, address)
+        if not self.readers:
+            raise ValueError('A multidrop bus needs at least one address')
+        self.bytes_transferred = 0
+        self.started = time.monotonic()
+        self._parser = FrameParser()
+        self._pending_ack = None
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop = None
+        self.error = None
+
+    def __getitem__(self, address):
+        return self.readers[address]
+
+    @property
+    def utilization(self):
+        """Fraction of the time since start() that the line carried data"""
+        elapsed = time.monotonic() - self.started
+        if elapsed <= 0:
+            return 0.0
+        seconds = self.bytes_transferred * BITS_PER_CHARACTER / self.baudrate
+        return seconds / elapsed
+
+    def _write(self, data):
+        self.bytes_transferred += len(data)
+        self.port.write(data)
+
+    def _read_answer(self):
+        """Wait for a frame or RES, returns an (event, payload) tuple"""
+        deadline = time.monotonic() + self.response_timeout
+        while True:
+            waiting = self.port.in_waiting
+            if waiting:
+                data = self.port.read(waiting)
+                self.bytes_transferred += len(data)
+                events = self._parser.feed(data)
+                if events:
+                    return events[0]
+            if time.monotonic() > deadline:
+                self._parser.reset()
+                raise PollingError('No answer')
+            if not waiting:
+                time.sleep(BITS_PER_CHARACTER / self.baudrate)
+
+    def _take_ack(self):
+        if self._pending_ack is None:
+            return b''
+        ack = poll_address(self._pending_ack) + ACK
+        self._pending_ack = None
+        return ack
+
+    def poll(self, address):
+        """Poll one reader, returns the symbol data as bytes or None
+
+        The symbol is also passed to the reader handle's listeners.
+        """
+        reader = self.readers[address]
+        with self._lock:
+            now = time.monotonic()
+            stats = reader.stats
+            if stats.last_poll is not None:
+                stats.max_poll_gap = max(
+                    stats.max_poll_gap, now - stats.last_poll)
+            stats.last_poll = now
+            stats.polls += 1
+            self._write(self._take_ack() + RES + poll_address(address) + REQ)
+            try:
+                event, payload = self._read_answer()
+                for _ in range(self.retries):
+                    if event != CORRUPT:
+                        break
+                    stats.retransmits += 1
+                    self._write(poll_address(address) + NAK)
+                    event, payload = self._read_answer()
+            except PollingError:
+                stats.timeouts += 1
+                return None
+            if event == EMPTY or event == CORRUPT:
+                return None
+            self._pending_ack = address
+        reader.stats.symbols += 1
+        reader._publish_symbol(payload.decode('ascii', errors='ignore'))
+        return payload
+
+    def send_command(self, address, data):
+        """Select a reader and send it `data` as a frame
+
+        Raises PollingError if the reader does not acknowledge.
+        """
+        with self._lock:
+            self._write(
+                self._take_ack() + RES + select_address(address) + REQ)
+            self._expect_ack(address, 'select')
+            self._write(frame_message(data))
+            self._expect_ack(address, 'command')
+
+    def _expect_ack(self, address, step):
+        deadline = time.monotonic() + self.response_timeout
+        while time.monotonic() <= deadline:
+            waiting = self.port.in_waiting
+            if not waiting:
+                time.sleep(BITS_PER_CHARACTER / self.baudrate)
+                continue
+            data = self.port.read(waiting)
+            self.bytes_transferred += len(data)
+            if ACK in data:
+                return
+            if NAK in data:
+                break
+        raise PollingError(
+            'Reader %d did not acknowledge %s' % (address, step))
+
+    def step(self):
+        """Poll the reader that is due next, or wait until one is due
+
+        Returns the address of the polled reader or None.
+        """
+        now = time.monotonic()
+        # the reader that has been due for the longest time
+        reader = min(self.readers.values(), key=lambda r: r.next_poll)
+        if reader.next_poll > now:
+            time.sleep(min(reader.next_poll - now, self.min_poll_interval))
+            return None
+        if self.poll(reader.address) is None:
+            reader.poll_interval = min(
+                max(2 * reader.poll_interval, self.min_poll_interval),
+                self.max_poll_interval)
+        else:
+            reader.poll_interval = 0.0
+        reader.next_poll = time.monotonic() + reader.poll_interval
+        return reader.address
+
+    def start(self):
+        """Poll the readers in a background thread until stop()"""
+        if self._thread is not None:
+            return
+        self.started = time.monotonic()
+        self.bytes_transferred = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop, ),
+            name='microscan-multidrop-%s' % self.portname, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and acknowledge the last symbol"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            ack = self._take_ack()
+            if ack:
+                self._write(ack)
+
+    def _run(self, stop):
+        while not stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                logger.warning('Multidrop bus %s stopped: %s' % (
+                    self.portname, e))
+                self.error = e
+                return
@@ -0,0 +1,284 @@
+"""Polled host protocols: Polling Mode D framing and transport
+
+In the `Protocol.PollingModeD` host protocol (K140 value 4), the reader
+only sends a symbol when the host asks for it. The host polls with REQ, and
+the reader answers with the symbol framed as STX, data, ETX, LRC, or with
+RES (EOT) if it has nothing to send. The host confirms each symbol with ACK
+or asks for a retransmission with NAK:
+
+```
+host:    REQ                    ACK REQ          ...
+reader:      STX data ETX LRC           RES
+```
+
+`PollingModeD` runs this exchange over a connected driver. To keep the line
+busy, the ACK for a symbol is sent in the same write as the next poll
+instead of in a separate round trip. Received symbols are passed to the
+driver's symbol listeners, see `MicroscanDriver.add_symbol_listener()`:
+
+```
+transport = PollingModeD(driver)
+driver.add_symbol_listener(print)
+transport.start()
+...
+transport.stop()
+print(transport.stats.summary())
+```
+
+The framing helpers in this module are shared with the multidrop bus.
+"""
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+RES = b'\x04'  # EOT
+REQ = b'\x05'  # ENQ
+STX = b'\x02'
+ETX = b'\x03'
+ACK = b'\x06'
+NAK = b'\x15'
+
+# bits per character on the line: start, 7 data, parity, and stop bit
+BITS_PER_CHARACTER = 10
+
+
+class PollingError(Exception):
+    """Raised when the reader does not answer a poll correctly"""
+
+
+def lrc(data):
+    """Longitudinal redundancy check: XOR of all bytes of `data`"""
+    check = 0
+    for byte in data:
+        check ^= byte
+    return bytes([check])
+
+
+def frame_message(data):
+    """Frame data as STX, data, ETX, LRC
+
+    The LRC covers the data and the ETX, but not the STX.
+    """
+    return STX + data + ETX + lrc(data + ETX)
+
+
+# events returned by FrameParser.feed()
+DATA = 'data'
+EMPTY = 'empty'
+CORRUPT = 'corrupt'
+
+
+class FrameParser:
+    """Incremental parser for the reader's answers to polls
+
+    feed() returns a list of (event, payload) tuples for the answers
+    completed by the bytes passed in: (DATA, data) for a frame with a valid
+    LRC, (CORRUPT, data) for a frame with an invalid LRC, and (EMPTY, None)
+    for RES. Bytes outside of frames are ignored.
+    """
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def reset(self):
+        self._buffer.clear()
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        events = []
+        position = 0
+        while position < len(buffer):
+            byte = buffer[position:position + 1]
+            if byte == RES:
+                events.append((EMPTY, None))
+                position += 1
+            elif byte == STX:
+                end = buffer.find(ETX, position + 1)
+                if end < 0 or end + 1 >= len(buffer):
+                    break
+                payload = bytes(buffer[position + 1:end])
+                valid = buffer[end + 1:end + 2] == lrc(payload + ETX)
+                events.append((DATA if valid else CORRUPT, payload))
+                position = end + 2
+            else:
+                position += 1
+        del buffer[:position]
+        return events
+
+
+class PollStats:
+    """Counters of a polled transport
+
+    `theoretical_symbols_per_second` is the rate a saturated link could
+    carry with the average symbol length seen so far: each symbol takes a
+    REQ, its frame (data plus 3 bytes), and an ACK on the line.
+    """
+    def __init__(self, baudrate):
+        self.baudrate = baudrate
+        self.polls = 0
+        self.symbols = 0
+        self.symbol_bytes = 0
+        self.retransmits = 0
+        self.timeouts = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def symbols_per_second(self):
+        elapsed = self.elapsed
+        return self.symbols / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def theoretical_symbols_per_second(self):
+        length = self.symbol_bytes / self.symbols if self.symbols else 0
+        characters_per_second = self.baudrate / BITS_PER_CHARACTER
+        return characters_per_second / (length + 5)
+
+    @property
+    def link_utilization(self):
+        """Achieved rate as a fraction of the theoretical rate"""
+        return self.symbols_per_second / self.theoretical_symbols_per_second
+
+    def summary(self):
+        return (
+            '%d symbols in %.1fs: %.1f/s of %.1f/s theoretical at %d baud '
+            '(%.0f%%), %d retransmits, %d timeouts' % (
+                self.symbols, self.elapsed, self.symbols_per_second,
+                self.theoretical_symbols_per_second, self.baudrate,
+                100 * self.link_utilization, self.retransmits, self.timeouts))
+
+
+class PollingModeD:
+    """Polling Mode D transport over a connected MicroscanDriver
+
+    The reader must be configured for `Protocol.PollingModeD`. A corrupt
+    frame is NAKed and its retransmission awaited, up to `retries` times.
+    `response_timeout` defaults to the transfer time of 64 characters at the
+    port's baud rate, at least 20ms.
+    """
+    def __init__(self, driver, retries=3, response_timeout=None):
+        self.driver = driver
+        self.retries = retries
+        self.response_timeout = (
+            response_timeout or driver._idle_time(64))
+        baudrate = getattr(driver.port, 'baudrate', None) or \
+            driver.baudrate or 9600
+        self.stats = PollStats(baudrate)
+        self._parser = FrameParser()
+        self._pending_ack = False
+        self._thread = None
+        self._stop = None
+        self.error = None
+
+    def _exchange(self, message):
+        """Write `message` and wait for the reader's answer"""
+        driver = self.driver
+        driver._port_write(message)
+        deadline = time.monotonic() + self.response_timeout
+        while True:
+            waiting = driver.port.in_waiting
+            if waiting:
+                events = self._parser.feed(driver._port_read(waiting))
+                if events:
+                    return events[0]
+            if time.monotonic() > deadline:
+                self.stats.timeouts += 1
+                self._parser.reset()
+                raise PollingError(
+                    'No answer to poll from %s' % driver.portname)
+            if not waiting:
+                # wait for about one character
+                time.sleep(BITS_PER_CHARACTER / self.stats.baudrate)
+
+    def poll(self):
+        """Poll the reader once, returns a symbol string or None
+
+        The ACK for the returned symbol is sent with the next poll, or by
+        flush().
+        """
+        payload = self._poll()
+        return None if payload is None else payload.decode(
+            'ascii', errors='ignore')
+
+    def _poll(self):
+        with self.driver._lock:
+            message = REQ
+            if self._pending_ack:
+                message = ACK + REQ
+                self._pending_ack = False
+            self.stats.polls += 1
+            event, payload = self._exchange(message)
+            for _ in range(self.retries):
+                if event != CORRUPT:
+                    break
+                self.stats.retransmits += 1
+                event, payload = self._exchange(NAK)
+            if event == EMPTY:
+                return None
+            if event == CORRUPT:
+                raise PollingError(
+                    'Corrupt frame from %s after %d retransmits' %
+                    (self.driver.portname, self.retries))
+            self._pending_ack = True
+            self.stats.symbols += 1
+            self.stats.symbol_bytes += len(payload)
+            return payload
+
+    def flush(self):
+        """Send the ACK for the last symbol if it is still pending"""
+        with self.driver._lock:
+            if self._pending_ack:
+                self.driver._port_write(ACK)
+                self._pending_ack = False
+
+    def start(self, idle_interval=0.0):
+        """Poll continuously in a background thread
+
+        Symbols are passed to the driver's symbol listeners. After the
+        reader answers with RES, the next poll is sent after `idle_interval`
+        seconds. Polls that are not answered correctly are repeated. If the
+        serial port fails, the thread ends and the exception is stored in
+        `error`.
+        """
+        if self._thread is not None:
+            return
+        self._stop = threading.Event()
+        self.stats = PollStats(self.stats.baudrate)
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop, idle_interval),
+            name='microscan-poll-%s' % self.driver.portname, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the polling thread and acknowledge the last symbol"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self, stop, idle_interval):
+        while not stop.is_set():
+            try:
+                payload = self._poll()
+            except PollingError:
+                continue
+            except Exception as e:
+                logger.warning(
+                    'Polling %s stopped: %s' % (self.driver.portname, e))
+                self.error = e
+                return
+            if payload is None:
+                if idle_interval:
+                    stop.wait(idle_interval)
+            else:
+                self.driver._publish_symbol(payload)
@@ -0,0 +1,145 @@
+"""Read rate tests for aligning readers
+
+In a read rate test, the reader decodes continuously and reports how well it
+reads the symbol in front of it, about once per second: either as decodes
+per second (`<C>`) or as the percentage of scans that decoded (`<Cp>`). The
+test ends with `<J>`. `MicroscanDriver.start_read_rate_test()` starts a
+test and returns a `ReadRateTest`, which reads the reports in a background
+thread and yields them as `ReadRateUpdate` tuples:
+
+```
+test = driver.start_read_rate_test(percent=True)
+for update in test:
+    show(update.value)
+    if aligned:
+        driver.stop_read_rate_test()
+```
+
+Like the symbol stream, the thread checks the port for new data every
+`poll_interval` seconds and holds the driver's lock only while reading, so
+its reads do not interleave with driver operations.
+"""
+from collections import namedtuple
+import logging
+import queue
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+DECODES_PER_SECOND_COMMAND = b'<C>'
+PERCENT_COMMAND = b'<Cp>'
+STOP_COMMAND = b'<J>'
+
+ReadRateUpdate = namedtuple(
+    'ReadRateUpdate', ['timestamp', 'value', 'percent', 'data'])
+ReadRateUpdate.__doc__ = """One report of a read rate test
+
+`value` is the number of decodes per second or, if `percent` is True, the
+percentage of scans that decoded. `data` is the symbol data the reader
+reported with the rate, or an empty string.
+"""
+
+
+def parse_read_rate(line, timestamp=None):
+    """Parse one report line, returns a ReadRateUpdate or None
+
+    Reports start with the rate, optionally followed by `%` and the symbol
+    data, e.g. `b'087% 12345'`. Lines that do not start with a number
+    return None.
+    """
+    text = line.strip().decode('ascii', errors='ignore')
+    end = 0
+    while end < len(text) and text[end].isdigit():
+        end += 1
+    if not end:
+        return None
+    percent = text[end:end + 1] == '%'
+    data = text[end + 1 if percent else end:].strip()
+    return ReadRateUpdate(
+        time.time() if timestamp is None else timestamp, int(text[:end]),
+        percent, data)
+
+
+class ReadRateTest:
+    """A running read rate test, see MicroscanDriver.start_read_rate_test()
+
+    Iterating over the test yields updates until the test is stopped.
+    `latest` is the most recent update. If reading from the port fails, the
+    test ends and the exception is stored in `error`.
+    """
+    def __init__(self, driver, percent=False, poll_interval=0.01):
+        self.driver = driver
+        self.percent = percent
+        self.poll_interval = poll_interval
+        self.latest = None
+        self.error = None
+        self._updates = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name='microscan-read-rate-%s' %
+            self.driver.portname, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """End the background thread, after the test was ended on the
+        reader"""
+        self._stop.set()
+        if self._thread is not None and \
+                self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def __iter__(self):
+        while True:
+            update = self.next_update()
+            if update is None:
+                return
+            yield update
+
+    def next_update(self, timeout=None):
+        """Wait for the next update, returns None on timeout or when the test
+        has ended"""
+        try:
+            update = self._updates.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if update is None:
+            # keep the end marker for other consumers
+            self._updates.put(None)
+        return update
+
+    def _run(self):
+        driver = self.driver
+        splitter = driver._line_splitter()
+        try:
+            while not self._stop.is_set():
+                with driver._lock:
+                    waiting = driver.port.in_waiting
+                    data = driver._port_read(waiting) if waiting else b''
+                if not data:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                timestamp = time.time()
+                for line in splitter.feed(data):
+                    update = parse_read_rate(line, timestamp)
+                    if update is None:
+                        logger.debug('Ignoring read rate line %r' % line)
+                        continue
+                    self.latest = update
+                    self._updates.put(update)
+        except Exception as e:
+            if not self._stop.is_set():
+                logger.warning('Read rate test on %s stopped: %s' % (
+                    self.driver.portname, e))
+                self.error = e
+        finally:
+            self._updates.put(None)
@@ -0,0 +1,315 @@
+"""Binary RPC over Unix domain sockets
+
+A lighter alternative to the XML-RPC interface of `microscan_server` for
+clients on the same machine. Requests and responses are length-prefixed
+binary frames sent over a persistent connection. A client may send many
+requests before reading the responses (pipelining):
+
+```
+with RPCClient('/run/microscan.sock') as client:
+    client.call('read_barcode')
+    results = client.pipeline([('read_barcode', ()), ('read_barcode', ())])
+```
+
+Frames consist of the payload length (uint32) followed by the payload. A
+request payload is the request id (uint32), the method name, and the list of
+arguments. A response payload is the request id, a status byte (0 for
+success), and the result or, on error, the exception type name and message.
+Responses are sent in request order.
+
+Values are encoded with a one-byte type tag: None, bools, 64-bit ints,
+floats, str, bytes, lists (tuples are decoded as lists), dicts, settings
+(as their K-string) and MicroscanConfiguration (in the format of
+`microscan.binary`).
+"""
+import socket
+import socketserver
+import struct
+import threading
+
+from .binary import decode_config
+from .binary import encode_config
+from .config import KSetting
+from .config import MicroscanConfiguration
+from .config import REGISTRY
+
+
+_LENGTH = struct.Struct('<I')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+_ID_STATUS = struct.Struct('<IB')
+
+OK = 0
+ERROR = 1
+
+
+class RPCError(Exception):
+    """Raised for malformed frames and unsupported values"""
+
+
+class RemoteError(Exception):
+    """Raised by the client when the called method raised an exception
+
+    `type_name` is the name of the exception class raised on the server.
+    """
+    def __init__(self, type_name, message):
+        super().__init__('%s: %s' % (type_name, message))
+        self.type_name = type_name
+        self.message = message
+
+
+def _encode(value, parts):
+    if value is None:
+        parts.append(b'N')
+    elif value is True:
+        parts.append(b'T')
+    elif value is False:
+        parts.append(b'F')
+    elif isinstance(value, int):
+        parts.append(b'i' + _INT.pack(value))
+    elif isinstance(value, float):
+        parts.append(b'd' + _FLOAT.pack(value))
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        parts.append(b's' + _LENGTH.pack(len(data)) + data)
+    elif isinstance(value, (bytes, bytearray)):
+        parts.append(b'b' + _LENGTH.pack(len(value)) + value)
+    elif isinstance(value, (list, tuple)):
+        parts.append(b'l' + _LENGTH.pack(len(value)))
+        for item in value:
+            _encode(item, parts)
+    elif isinstance(value, dict):
+        parts.append(b'm' + _LENGTH.pack(len(value)))
+        for key, item in value.items():
+            _encode(key, parts)
+            _encode(item, parts)
+    elif isinstance(value, KSetting):
+        data = value.to_config_string()
+        parts.append(b'k' + _LENGTH.pack(len(data)) + data)
+    elif isinstance(value, MicroscanConfiguration):
+        data = encode_config(value)
+        parts.append(b'c' + _LENGTH.pack(len(data)) + data)
+    else:
+        raise RPCError('Cannot encode value of type %s' % type(value).__name__)
+
+
+def encode_value(value):
+    """Encode a value into bytes"""
+    parts = []
+    _encode(value, parts)
+    return b''.join(parts)
+
+
+def _decode(data, offset):
+    tag = data[offset:offset + 1]
+    offset += 1
+    if tag == b'N':
+        return None, offset
+    if tag == b'T':
+        return True, offset
+    if tag == b'F':
+        return False, offset
+    if tag == b'i':
+        return _INT.unpack_from(data, offset)[0], offset + _INT.size
+    if tag == b'd':
+        return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+    length, = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    if tag in (b'l', b'm'):
+        if tag == b'l':
+            items = []
+            for _ in range(length):
+                item, offset = _decode(data, offset)
+                items.append(item)
+            return items, offset
+        items = {}
+        for _ in range(length):
+            key, offset = _decode(data, offset)
+            items[key], offset = _decode(data, offset)
+        return items, offset
+    end = offset + length
+    if end > len(data):
+        raise RPCError('Frame is truncated')
+    value = bytes(data[offset:end])
+    if tag == b's':
+        return value.decode('utf-8'), end
+    if tag == b'b':
+        return value, end
+    if tag == b'k':
+        k_code = value[1:value.find(b',')]
+        return REGISTRY[k_code].from_config_string(value), end
+    if tag == b'c':
+        return decode_config(value), end
+    raise RPCError('Unknown type tag %r' % tag)
+
+
+def decode_value(data, offset=0):
+    """Decode a value from bytes, returns a tuple (value, end offset)"""
+    try:
+        return _decode(data, offset)
+    except (struct.error, KeyError):
+        raise RPCError('Cannot decode value at offset %d' % offset)
+
+
+def frame(payload):
+    """Prefix a payload with its length"""
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def read_frames(buffer):
+    """Split complete frames off the start of a bytearray
+
+    Returns the list of payloads. Incomplete data is left in `buffer`.
+    """
+    payloads = []
+    offset = 0
+    while len(buffer) - offset >= _LENGTH.size:
+        length, = _LENGTH.unpack_from(buffer, offset)
+        end = offset + _LENGTH.size + length
+        if end > len(buffer):
+            break
+        payloads.append(bytes(buffer[offset + _LENGTH.size:end]))
+        offset = end
+    del buffer[:offset]
+    return payloads
+
+
+def resolve_method(obj, method):
+    """Look up a dotted attribute name such as 'config.to_config_string'
+
+    Names starting with an underscore are not allowed.
+    """
+    for name in method.split('.'):
+        if name.startswith('_'):
+            raise AttributeError('Cannot call private method %s' % method)
+        obj = getattr(obj, name)
+    return obj
+
+
+class _RPCHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        buffer = bytearray()
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+            buffer += data
+            # answer all requests that arrived together with a single send
+            responses = [
+                self._handle_request(payload)
+                for payload in read_frames(buffer)]
+            if responses:
+                self.request.sendall(b''.join(responses))
+
+    def _handle_request(self, payload):
+        request_id = 0
+        try:
+            if len(payload) < _LENGTH.size:
+                raise RPCError('Frame is too short for a request id')
+            request_id, = _LENGTH.unpack_from(payload)
+            (method, args), _ = decode_value(payload, _LENGTH.size)
+            result = self.server.dispatch(method, args)
+            response = _ID_STATUS.pack(request_id, OK) + encode_value(result)
+        except Exception as e:
+            response = _ID_STATUS.pack(request_id, ERROR) + encode_value(
+                [type(e).__name__, str(e)])
+        return frame(response)
+
+
+class RPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves the methods of `instance` on a Unix domain socket
+
+    Like `SimpleXMLRPCServer.register_instance()`, calls are passed to
+    `instance._dispatch(method, params)` if it exists, otherwise the dotted
+    method name is looked up on the instance. Each connection is handled in
+    its own thread, requests on a connection are handled in order.
+    """
+    daemon_threads = True
+
+    def __init__(self, path, instance):
+        self.instance = instance
+        super().__init__(path, _RPCHandler)
+
+    def dispatch(self, method, args):
+        if hasattr(self.instance, '_dispatch'):
+            return self.instance._dispatch(method, args)
+        return resolve_method(self.instance, method)(*args)
+
+
+class RPCClient:
+    """Client for an RPCServer
+
+    Thread-safe, but calls from several threads are sent one after another
+    over the same connection. If sending or receiving fails, for example on
+    a timeout, the connection is closed, since responses arriving late
+    would be taken for the responses to later calls. Further calls raise
+    RPCError.
+    """
+    def __init__(self, path, timeout=None):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(path)
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._request_id = 0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._closed = True
+        self._socket.close()
+
+    def call(self, method, *args):
+        """Call a method on the server and return its result"""
+        return self.pipeline([(method, args)])[0]
+
+    def pipeline(self, calls):
+        """Send several calls at once, then wait for all results
+
+        `calls` is a list of (method, args) tuples. Returns the list of
+        results. If any call failed, RemoteError is raised for the first
+        failed call, after all responses have been received.
+        """
+        with self._lock:
+            if self._closed:
+                raise RPCError('Connection is closed')
+            first_id = self._request_id
+            requests = []
+            for method, args in calls:
+                self._request_id = (self._request_id + 1) % 2 ** 32
+                requests.append(frame(
+                    _LENGTH.pack(self._request_id) +
+                    encode_value([method, list(args)])))
+            try:
+                self._socket.sendall(b''.join(requests))
+                payloads = []
+                while len(payloads) < len(requests):
+                    data = self._socket.recv(65536)
+                    if not data:
+                        raise RPCError('Connection closed by server')
+                    self._buffer += data
+                    payloads.extend(read_frames(self._buffer))
+                for i, payload in enumerate(payloads):
+                    request_id, _ = _ID_STATUS.unpack_from(payload)
+                    if request_id != (first_id + i + 1) % 2 ** 32:
+                        raise RPCError('Response out of order')
+            except Exception:
+                self.close()
+                raise
+
+        results = []
+        error = None
+        for payload in payloads:
+            _, status = _ID_STATUS.unpack_from(payload)
+            value, _ = decode_value(payload, _ID_STATUS.size)
+            if status != OK and error is None:
+                error = RemoteError(*value)
+            results.append(value)
+        if error is not None:
+            raise error
+        return results
@@ -0,0 +1,405 @@
+"""Streams of symbols decoded by a barcode reader
+
+In continuous read and externally triggered modes, the reader sends each
+decoded symbol on its own. `MicroscanDriver.start_symbol_stream()` reads them
+in a background thread and passes a `Symbol` to every listener registered
+with `MicroscanDriver.add_symbol_listener()`:
+
+```
+driver.add_symbol_listener(lambda symbol: print(symbol.data))
+driver.start_symbol_stream()
+```
+
+Listeners are called from the stream thread, so they should return quickly.
+
+To share the stream of a reader with other processes on the same machine,
+publish it into a `SymbolRing` in shared memory and consume it there with a
+`SymbolRingReader`.
+
+In continuous read mode, a label that stays in the reader's field of view is
+reported repeatedly. A `DuplicateFilter` assigned to
+`MicroscanDriver.duplicate_filter` suppresses symbols that repeat within a
+time window.
+"""
+from collections import deque
+from collections import namedtuple
+import logging
+import math
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+import struct
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+Symbol = namedtuple('Symbol', ['sequence', 'timestamp', 'data'])
+Symbol.__doc__ = """A symbol received from the device
+
+- sequence: number of the symbol, incremented for each symbol of a driver
+- timestamp: `time.time()` when the symbol was received
+- data: the symbol as a string, without postamble
+"""
+
+
+# line ending of symbols and responses if the reader's postamble is disabled
+DEFAULT_POSTAMBLE = b'\r\n'
+
+
+class LineSplitter:
+    """Splits data received in chunks into lines ending with `postamble`
+
+    Incomplete lines are kept until the rest of the line is fed.
+    """
+    def __init__(self, postamble=DEFAULT_POSTAMBLE):
+        self.postamble = postamble
+        self.pending = b''
+
+    def feed(self, data):
+        """Add received bytes, returns the lines they completed, without
+        postamble"""
+        *lines, self.pending = (self.pending + data).split(self.postamble)
+        return lines
+
+    def reset(self):
+        """Discard an incomplete line"""
+        self.pending = b''
+
+
+class SymbolStream:
+    """Symbols of one reader that arrive through a shared connection
+
+    Base class for the per-reader handles of multidrop buses and daisy
+    chains. Symbols are passed to listeners and queued for read_barcode(),
+    the most recent `max_symbols` are kept.
+    """
+    def __init__(self, portname, max_symbols=1000):
+        self.portname = portname
+        self._symbol_listeners = ()
+        self._symbol_sequence = 0
+        self._symbols = deque(maxlen=max_symbols)
+        self._symbols_available = threading.Condition()
+
+    def add_symbol_listener(self, listener):
+        """Register a callable that receives a Symbol for each symbol of
+        this reader"""
+        self._symbol_listeners += (listener, )
+
+    def remove_symbol_listener(self, listener):
+        """Unregister a listener previously passed to add_symbol_listener()"""
+        self._symbol_listeners = tuple(
+            other for other in self._symbol_listeners
+            if other != listener)
+
+    def read_barcode(self, timeout=1.0):
+        """Return the oldest symbol not yet returned, waiting up to `timeout`
+        seconds for one to arrive
+
+        Returns an empty string on timeout.
+        """
+        with self._symbols_available:
+            if not self._symbols_available.wait_for(
+                    lambda: self._symbols, timeout):
+                return ''
+            return self._symbols.popleft().data
+
+    def _publish_symbol(self, data, timestamp=None):
+        self._symbol_sequence += 1
+        symbol = Symbol(
+            self._symbol_sequence,
+            time.time() if timestamp is None else timestamp, data)
+        with self._symbols_available:
+            self._symbols.append(symbol)
+            self._symbols_available.notify_all()
+        for listener in self._symbol_listeners:
+            try:
+                listener(symbol)
+            except Exception:
+                logger.exception('Symbol listener %r failed' % listener)
+        return symbol
+
+
+class DuplicateFilter:
+    """Suppresses symbols that were already seen within `window` seconds
+
+    Every sighting of a symbol restarts its window, so a label is reported
+    once for as long as the reader keeps seeing it. Expiry is tracked with a
+    hashed timing wheel of `window / resolution` slots: each check and each
+    expiry costs constant time, and only symbols seen within the last
+    window are remembered, at most `max_entries` of them (the oldest are
+    forgotten first). Windows are rounded up to whole `resolution` ticks.
+
+    `suppressed` and `passed` count the outcomes of is_duplicate().
+    """
+    def __init__(self, window=0.5, resolution=0.01, max_entries=65536):
+        if window <= 0 or resolution <= 0:
+            raise ValueError('window and resolution must be positive')
+        self.window = window
+        self.resolution = resolution
+        self.max_entries = max_entries
+        self._window_ticks = math.ceil(round(window / resolution, 9))
+        # slot i holds the symbols expiring at ticks congruent to i
+        self._wheel = [set() for _ in range(self._window_ticks + 1)]
+        # symbol data -> expiry tick, in order of the last sighting
+        self._expiry = {}
+        self._tick = None
+        self._lock = threading.Lock()
+        self.suppressed = 0
+        self.passed = 0
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def _advance(self, tick):
+        """Expire the symbols of all slots passed since the last call"""
+        if self._tick is None:
+            self._tick = tick
+        if tick <= self._tick:
+            # if the clock went backwards, keep the entries until it catches
+            # up again
+            return
+        wheel = self._wheel
+        expiry = self._expiry
+        for expired in range(
+                max(self._tick, tick - len(wheel)) + 1, tick + 1):
+            slot = wheel[expired % len(wheel)]
+            for data in slot:
+                del expiry[data]
+            slot.clear()
+        self._tick = tick
+
+    def is_duplicate(self, data, timestamp=None):
+        """Record a sighting of `data`, returns True if it is a repeat
+
+        `timestamp` defaults to the current time.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        tick = math.floor(timestamp / self.resolution)
+        with self._lock:
+            self._advance(tick)
+            expiry = self._expiry
+            wheel = self._wheel
+            duplicate = data in expiry
+            if duplicate:
+                # move to the end of the eviction order and to a later slot
+                wheel[expiry.pop(data) % len(wheel)].discard(data)
+            elif len(expiry) >= self.max_entries:
+                oldest = next(iter(expiry))
+                wheel[expiry.pop(oldest) % len(wheel)].discard(oldest)
+            expires = max(tick, self._tick) + self._window_ticks
+            expiry[data] = expires
+            wheel[expires % len(wheel)].add(data)
+            if duplicate:
+                self.suppressed += 1
+            else:
+                self.passed += 1
+            return duplicate
+
+    def reset(self):
+        """Forget all symbols seen so far, the counters are kept"""
+        with self._lock:
+            self._expiry.clear()
+            for slot in self._wheel:
+                slot.clear()
+
+
+# Shared memory ring buffer
+#
+# Layout, all values little-endian:
+#
+# - header: magic `MSRG`, capacity (uint32), slot size (uint32), padding,
+#   sequence number of the most recently published entry (uint64)
+# - `capacity` slots of `slot size` bytes: version (uint64), symbol sequence
+#   (uint64), symbol timestamp (double), data length (uint16), data
+#
+# Entries are numbered from 1 and entry n is stored in slot (n - 1) %
+# capacity. Each slot is protected by a sequence lock: the producer sets the
+# version to 0 before changing a slot and to the entry number afterwards, so
+# a consumer that reads the same version before and after copying a slot got
+# a consistent entry.
+
+RING_MAGIC = b'MSRG'
+
+_RING_HEADER = struct.Struct('<4sII4xQ')
+_RING_HEAD_OFFSET = 16
+_RING_VERSION = struct.Struct('<Q')
+_RING_FIELDS = struct.Struct('<QdH')
+_RING_SLOT = struct.Struct('<Q' + _RING_FIELDS.format[1:])
+
+
+class SymbolRing:
+    """Publishes symbols into a shared memory ring buffer
+
+    Any number of processes on the same machine can read the symbols with a
+    SymbolRingReader, without RPC or serialization. The producer never waits
+    for consumers: once the ring is full, the oldest entries are overwritten
+    and slow consumers see a gap in the entry numbers.
+
+    The ring is a symbol listener, so publishing the symbols of a driver is:
+
+    ```
+    ring = SymbolRing('line1-reader3')
+    driver.add_symbol_listener(ring)
+    driver.start_symbol_stream()
+    ```
+
+    Only one thread may publish into a ring. Symbol data longer than
+    `slot_size` minus 26 bytes is truncated. close() removes the shared
+    memory block.
+    """
+    def __init__(self, name=None, capacity=1024, slot_size=128):
+        if capacity < 1:
+            raise ValueError('capacity must be a positive integer')
+        if slot_size <= _RING_SLOT.size or slot_size % 8:
+            raise ValueError(
+                'slot_size must be a multiple of 8 larger than %d' %
+                _RING_SLOT.size)
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=True,
+            size=_RING_HEADER.size + capacity * slot_size)
+        self._buf = self._shm.buf
+        _RING_HEADER.pack_into(
+            self._buf, 0, RING_MAGIC, capacity, slot_size, 0)
+        self._head = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def name(self):
+        """Name of the shared memory block, to be passed to SymbolRingReader
+        """
+        return self._shm.name
+
+    @property
+    def head(self):
+        """Number of the most recently published entry, 0 if there is none"""
+        return self._head
+
+    def __call__(self, symbol):
+        self.publish(symbol)
+
+    def publish(self, symbol):
+        """Write a Symbol into the next slot, returns its entry number"""
+        buf = self._buf
+        sequence = self._head + 1
+        offset = _RING_HEADER.size + (
+            (sequence - 1) % self.capacity) * self.slot_size
+        data = symbol.data.encode('ascii', errors='replace')[
+            :self.slot_size - _RING_SLOT.size]
+        _RING_VERSION.pack_into(buf, offset, 0)
+        _RING_FIELDS.pack_into(
+            buf, offset + _RING_VERSION.size, symbol.sequence,
+            symbol.timestamp, len(data))
+        start = offset + _RING_SLOT.size
+        buf[start:start + len(data)] = data
+        _RING_VERSION.pack_into(buf, offset, sequence)
+        _RING_VERSION.pack_into(buf, _RING_HEAD_OFFSET, sequence)
+        self._head = sequence
+        return sequence
+
+    def close(self):
+        """Release and remove the shared memory block"""
+        if self._buf is None:
+            return
+        self._buf.release()
+        self._buf = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _attach_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13, the resource tracker would remove the block
+        # when the consumer exits
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SymbolRingReader:
+    """Reads symbols from a SymbolRing created by another process
+
+    By default, only symbols published after the reader was created are
+    returned, with `from_oldest=True` reading starts at the oldest entry still
+    in the ring. Entries that were overwritten before they could be read are
+    skipped and counted in `lost`:
+
+    ```
+    reader = SymbolRingReader('line1-reader3')
+    for symbol in reader.follow():
+        print(symbol.data, reader.lost)
+    ```
+    """
+    def __init__(self, name, from_oldest=False):
+        self._shm = _attach_shared_memory(name)
+        self._buf = self._shm.buf
+        magic, self.capacity, self.slot_size, head = \
+            _RING_HEADER.unpack_from(self._buf)
+        if magic != RING_MAGIC:
+            self.close()
+            raise ValueError('%s is not a symbol ring' % name)
+        if from_oldest:
+            self.next_entry = max(1, head - self.capacity + 1)
+        else:
+            self.next_entry = head + 1
+        self.lost = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def read(self):
+        """List of Symbols published since the last call, never blocks"""
+        buf = self._buf
+        head, = _RING_VERSION.unpack_from(buf, _RING_HEAD_OFFSET)
+        oldest = head - self.capacity + 1
+        if self.next_entry < oldest:
+            self.lost += oldest - self.next_entry
+            self.next_entry = oldest
+        symbols = []
+        while self.next_entry <= head:
+            entry = self.next_entry
+            self.next_entry += 1
+            offset = _RING_HEADER.size + (
+                (entry - 1) % self.capacity) * self.slot_size
+            version, sequence, timestamp, length = \
+                _RING_SLOT.unpack_from(buf, offset)
+            start = offset + _RING_SLOT.size
+            data = bytes(buf[start:start + length])
+            if version != entry or \
+                    _RING_VERSION.unpack_from(buf, offset)[0] != entry:
+                # overwritten by the producer before or while reading
+                self.lost += 1
+                continue
+            symbols.append(Symbol(
+                sequence, timestamp, data.decode('ascii', errors='ignore')))
+        return symbols
+
+    def follow(self, poll_interval=0.01):
+        """Generator yielding symbols as they are published, forever"""
+        while True:
+            symbols = self.read()
+            if not symbols:
+                time.sleep(poll_interval)
+            yield from symbols
+
+    def close(self):
+        """Detach from the shared memory block, the ring is not removed"""
+        if self._buf is None:
+            return
+        self._buf.release()
+        self._buf = None
+        self._shm.close()
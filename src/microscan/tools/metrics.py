@@ -0,0 +1,491 @@
+"""Metrics collection and Prometheus text-format exposition
+
+The classes in this module implement the small subset of the Prometheus
+client data model needed by `microscan_server`: counters, gauges (optionally
+computed at scrape time), and summaries with sliding-window quantiles. All
+metrics are organized in labelled families so that a single endpoint can
+report on several devices.
+
+The exposition format is documented at
+https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import math
+import threading
+import time
+
+from microscan.trace import INBOUND
+from microscan.trace import OUTBOUND
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NaN'
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+                '\n', r'\n'))
+        for name, value in pairs)
+
+
+class _Child:
+    """Base class for a single labelled time series of a metric family"""
+    def __init__(self):
+        self._lock = threading.Lock()
+
+
+class _CounterChild(_Child):
+    def __init__(self):
+        super().__init__()
+        self._value = 0
+        self._function = None
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError('Counters can only be incremented')
+        with self._lock:
+            self._value += amount
+
+    def set_function(self, function):
+        """Read the counter value from `function` at scrape time, for counts
+        that are kept elsewhere"""
+        self._function = function
+
+    def get(self):
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return float('nan')
+        return self._value
+
+    def samples(self, name):
+        yield name, (), self.get()
+
+
+class _GaugeChild(_Child):
+    def __init__(self):
+        super().__init__()
+        self._value = 0
+        self._function = None
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Compute the gauge value by calling `function` at scrape time"""
+        self._function = function
+
+    def get(self):
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return float('nan')
+        return self._value
+
+    def samples(self, name):
+        yield name, (), self.get()
+
+
+class _SummaryChild(_Child):
+    def __init__(self, quantiles, window):
+        super().__init__()
+        self._quantiles = quantiles
+        self._window = deque(maxlen=window)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value):
+        with self._lock:
+            self._window.append(value)
+            self._sum += value
+            self._count += 1
+
+    def time(self):
+        """Context manager observing the duration of the enclosed block"""
+        return _Timer(self)
+
+    def samples(self, name):
+        with self._lock:
+            window = sorted(self._window)
+            sum_, count = self._sum, self._count
+        for quantile in self._quantiles:
+            if window:
+                rank = min(len(window) - 1, int(quantile * len(window)))
+                value = window[rank]
+            else:
+                value = float('nan')
+            yield name, (('quantile', quantile), ), value
+        yield name + '_sum', (), sum_
+        yield name + '_count', (), count
+
+
+class _RateChild(_Child):
+    """Events per second, averaged over a sliding window of whole seconds"""
+    def __init__(self, window):
+        super().__init__()
+        self._window = window
+        self._buckets = deque(maxlen=window)
+        self._started = int(time.monotonic())
+
+    def mark(self, amount=1):
+        now = int(time.monotonic())
+        with self._lock:
+            self._expire(now)
+            if self._buckets and self._buckets[-1][0] == now:
+                self._buckets[-1][1] += amount
+            else:
+                self._buckets.append([now, amount])
+
+    def _expire(self, now):
+        while self._buckets and self._buckets[0][0] <= now - self._window:
+            self._buckets.popleft()
+
+    def get(self):
+        now = int(time.monotonic())
+        with self._lock:
+            self._expire(now)
+            total = sum(count for _, count in self._buckets)
+        elapsed = min(self._window, max(1, now - self._started))
+        return total / elapsed
+
+    def samples(self, name):
+        yield name, (), self.get()
+
+
+class _Timer:
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class MetricFamily:
+    """A named metric with a fixed set of label names
+
+    Use `labels()` to get the time series for one combination of label
+    values, for example `family.labels(device='/dev/ttyUSB0').inc()`.
+    """
+    TYPE = None
+    SUFFIX = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwvalues):
+        if kwvalues:
+            values = tuple(kwvalues[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                'Metric %s expects labels %s' %
+                (self.name, ', '.join(self.labelnames)))
+        values = tuple(str(value) for value in values)
+        try:
+            return self._children[values]
+        except KeyError:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+            return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def expose(self):
+        """Render this family in the Prometheus text exposition format"""
+        exposed_name = self.name + self.SUFFIX
+        documentation = self.documentation.replace('\\', r'\\').replace(
+            '\n', r'\n')
+        lines = [
+            '# HELP %s %s' % (exposed_name, documentation),
+            '# TYPE %s %s' % (exposed_name, self.TYPE),
+        ]
+        for values, child in sorted(self._children.items()):
+            for name, extra, value in child.samples(exposed_name):
+                lines.append('%s%s %s' % (
+                    name,
+                    _format_labels(self.labelnames, values, extra),
+                    _format_value(value)))
+        return lines
+
+
+class Counter(MetricFamily):
+    TYPE = 'counter'
+    SUFFIX = '_total'
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(MetricFamily):
+    TYPE = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Summary(MetricFamily):
+    """Summary with quantiles computed over the most recent observations
+
+    `window` is the number of most recent observations from which the
+    quantiles are computed. Sum and count cover all observations.
+    """
+    TYPE = 'summary'
+
+    def __init__(
+            self, name, documentation, labelnames=(),
+            quantiles=(0.5, 0.9, 0.99), window=1024):
+        super().__init__(name, documentation, labelnames)
+        self.quantiles = quantiles
+        self.window = window
+
+    def _new_child(self):
+        return _SummaryChild(self.quantiles, self.window)
+
+
+class Rate(MetricFamily):
+    """Gauge reporting events per second over a sliding window of seconds"""
+    TYPE = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), window=60):
+        super().__init__(name, documentation, labelnames)
+        self.window = window
+
+    def _new_child(self):
+        return _RateChild(self.window)
+
+
+class MetricsRegistry:
+    """Collection of metric families that are exposed together"""
+    def __init__(self):
+        self._families = []
+
+    def register(self, family):
+        if any(f.name == family.name for f in self._families):
+            raise ValueError('Duplicate metric name %s' % family.name)
+        self._families.append(family)
+        return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def summary(self, name, documentation, labelnames=(), **kwargs):
+        return self.register(
+            Summary(name, documentation, labelnames, **kwargs))
+
+    def rate(self, name, documentation, labelnames=(), **kwargs):
+        return self.register(Rate(name, documentation, labelnames, **kwargs))
+
+    def expose(self):
+        """Render all registered families in the text exposition format"""
+        lines = []
+        for family in self._families:
+            lines.extend(family.expose())
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class ServerMetrics:
+    """The metric families reported by `microscan_server`
+
+    All series are labelled with the serial device name so that a single
+    scrape target may report on several readers.
+    """
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.symbols = r.counter(
+            'microscan_symbols',
+            'Number of barcode symbols returned by the reader',
+            ['device'])
+        self.symbols_per_second = r.rate(
+            'microscan_symbols_per_second',
+            'Barcode symbols per second, averaged over the last minute',
+            ['device'])
+        self.read_barcode_latency = r.summary(
+            'microscan_read_barcode_seconds',
+            'Duration of read_barcode() calls',
+            ['device'])
+        self.serial_bytes = r.counter(
+            'microscan_serial_bytes',
+            'Bytes transferred over the serial port',
+            ['device', 'direction'])
+        self.rpc_requests = r.counter(
+            'microscan_rpc_requests',
+            'Number of RPC requests handled, by method and outcome',
+            ['device', 'method', 'status'])
+        self.rpc_duration = r.summary(
+            'microscan_rpc_duration_seconds',
+            'Duration of RPC requests, by method',
+            ['device', 'method'])
+        self.queue_depth = r.gauge(
+            'microscan_queue_depth_bytes',
+            'Bytes waiting in the serial port buffers',
+            ['device', 'queue'])
+        self.reconnects = r.counter(
+            'microscan_reconnects',
+            'Number of times the serial connection was re-established',
+            ['device'])
+        self.duplicates_suppressed = r.counter(
+            'microscan_duplicates_suppressed',
+            'Number of symbols dropped as repeats by the duplicate filter',
+            ['device'])
+
+    def observe_serial_port(self, device, port):
+        """Report the serial input and output buffer fill levels of `port`
+
+        The values are read from the port at scrape time.
+        """
+        self.queue_depth.labels(device, 'serial_in').set_function(
+            lambda: port.in_waiting)
+        self.queue_depth.labels(device, 'serial_out').set_function(
+            lambda: port.out_waiting)
+
+    def observe_symbol(self, device, symbol):
+        if symbol:
+            self.symbols.labels(device).inc()
+            self.symbols_per_second.labels(device).mark()
+
+    def observe_request(self, device, method, label, status, duration,
+                        result=None):
+        """Record an RPC request, reported with the method label `label`
+
+        Successful `read_barcode` calls are additionally reported as barcode
+        read latency and, if a symbol was returned, counted as symbols.
+        """
+        self.rpc_requests.labels(device, label, status).inc()
+        self.rpc_duration.labels(device, label).observe(duration)
+        if method == 'read_barcode' and status == 'ok':
+            self.read_barcode_latency.labels(device).observe(duration)
+            self.observe_symbol(device, result)
+
+
+def merge_expositions(expositions):
+    """Combine text expositions of registries with the same families into one
+
+    For example the metrics of several worker processes, each labelled with
+    its own device. The HELP and TYPE lines of each family are kept once,
+    followed by the samples of all expositions.
+    """
+    families = {}
+    for exposition in expositions:
+        samples = None
+        for line in exposition.decode('utf-8').splitlines():
+            if line.startswith('# HELP '):
+                name = line.split(' ')[2]
+                if name not in families:
+                    families[name] = ([line], [])
+                header, samples = families[name]
+            elif line.startswith('# TYPE '):
+                if len(header) < 2:
+                    header.append(line)
+            elif samples is not None:
+                samples.append(line)
+    lines = []
+    for header, samples in families.values():
+        lines.extend(header)
+        lines.extend(samples)
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class SerialByteCounter:
+    """Trace hook counting the bytes a driver writes to and reads from its port
+
+    See `MicroscanDriver.add_trace_hook()`.
+    """
+    def __init__(self, bytes_out, bytes_in):
+        self._counters = {OUTBOUND: bytes_out, INBOUND: bytes_in}
+
+    def __call__(self, event):
+        self._counters[event.direction].inc(len(event.data))
+
+
+def instrument_driver(metrics, device, driver):
+    """Count serial traffic, reconnects, suppressed duplicates and the
+    symbols of the symbol stream of a connected driver and watch its port
+    buffers
+
+    Symbols returned by `read_barcode` calls are counted by the instrumented
+    RPC servers instead, see `ServerMetrics.observe_request()`.
+    """
+    driver.add_trace_hook(SerialByteCounter(
+        metrics.serial_bytes.labels(device, OUTBOUND),
+        metrics.serial_bytes.labels(device, INBOUND)))
+    metrics.observe_serial_port(device, driver.port)
+    # expose the reconnect counter as zero before the first reconnect
+    reconnects = metrics.reconnects.labels(device)
+
+    def on_reconnect(driver):
+        reconnects.inc()
+        metrics.observe_serial_port(device, driver.port)
+    driver.add_reconnect_hook(on_reconnect)
+    driver.add_symbol_listener(
+        lambda symbol: metrics.observe_symbol(device, symbol.data))
+    if driver.duplicate_filter is not None:
+        metrics.duplicates_suppressed.labels(device).set_function(
+            lambda: driver.duplicate_filter.suppressed)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.expose()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(registry, port, host='localhost'):
+    """Serve `registry` over HTTP from a daemon thread
+
+    Returns the HTTPServer instance, call its `shutdown()` method to stop
+    serving.
+    """
+    httpd = HTTPServer((host, port), _MetricsRequestHandler)
+    httpd.registry = registry
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
@@ -0,0 +1,62 @@
+from argparse import ArgumentParser
+from collections import OrderedDict
+from sys import exit
+
+from microscan.capture import ReplayPort
+from microscan.capture import read_capture
+from microscan.capture import read_capture_header
+from microscan.capture import replay_session
+from microscan.driver import MS3Driver
+
+
+parser = ArgumentParser(
+    description='Replay a captured serial session into the Microscan driver')
+parser.add_argument(
+    'capture', type=str, help='Capture file recorded with microscan_server')
+speed = parser.add_mutually_exclusive_group()
+speed.add_argument(
+    '--speed', type=float, default=1.0,
+    help='Replay speed relative to real time, default 1.0')
+speed.add_argument(
+    '--fast', action='store_true',
+    help='Replay as fast as possible, ignoring captured timing')
+parser.add_argument(
+    '--strict', action='store_true',
+    help='Fail if the driver writes differ from the captured writes')
+parser.add_argument(
+    '--repeat', type=int, default=1,
+    help='Number of times to replay the capture, for benchmarking')
+parser.add_argument(
+    '--quiet', action='store_true', help='Do not print returned symbols')
+
+
+def main():
+    args = parser.parse_args()
+
+    with open(args.capture, 'rb') as f:
+        _, portname = read_capture_header(f)
+    events = list(read_capture(args.capture))
+
+    timings = OrderedDict()
+    for _ in range(args.repeat):
+        port = ReplayPort(
+            events, speed=None if args.fast else args.speed,
+            strict=args.strict)
+        driver = MS3Driver(portname or args.capture)
+        for operation, result, duration in replay_session(driver, port):
+            timings.setdefault(operation, []).append(duration)
+            if operation == 'read_barcode' and not args.quiet:
+                print(result)
+
+    print('%-16s %8s %12s %12s' % ('operation', 'calls', 'total [s]',
+                                   'mean [ms]'))
+    for operation, durations in timings.items():
+        print('%-16s %8d %12.4f %12.3f' % (
+            operation, len(durations), sum(durations),
+            1000 * sum(durations) / len(durations)))
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -1,8 +1,23 @@
 from argparse import ArgumentParser
+from functools import partial
+import os
+from socketserver import ThreadingMixIn
+import stat
 from sys import exit
+import threading
+import time
 from xmlrpc.server import SimpleXMLRPCServer
+from xmlrpc.server import resolve_dotted_attribute
 
+from microscan.capture import CaptureWriter
 from microscan.driver import MS3Driver
+from microscan.rpc import RPCServer
+from microscan.rpc import resolve_method
+from microscan.symbols import SymbolRing
+from microscan.tools.metrics import ServerMetrics
+from microscan.tools.metrics import instrument_driver
+from microscan.tools.metrics import start_metrics_server
+from microscan.workers import Supervisor
 
 
 parser = parser = ArgumentParser(
@@ -10,22 +25,287 @@ parser = parser = ArgumentParser(
 parser.add_argument(
     'port', type=int, help='Port number for XMLRPC server')
 parser.add_argument(
-    'device', type=str,
-    help='Serial port device name where reader is connected')
+    'device', type=str, nargs='+',
+    help='Serial port device name where reader is connected, several '
+         'devices are each run in a separate worker process')
+parser.add_argument(
+    '--workers', action='store_true',
+    help='Run the reader in a worker process even if there is only one')
+parser.add_argument(
+    '--stream-symbols', action='store_true',
+    help='With worker processes, continuously read symbols from all readers, '
+         'clients fetch them with the symbols() method')
+parser.add_argument(
+    '--unix-socket', type=str, default=None, metavar='PATH',
+    help='Additionally serve the same methods with the binary RPC protocol '
+         'on this Unix domain socket, see microscan.rpc.RPCClient')
+parser.add_argument(
+    '--symbol-ring', type=str, default=None, metavar='NAME',
+    help='Continuously read symbols and publish them into a shared memory '
+         'ring of this name for local consumers, see '
+         'microscan.symbols.SymbolRingReader. With several devices, the '
+         'rings are named NAME-0, NAME-1, etc. in the order of the devices')
+parser.add_argument(
+    '--suppress-duplicates', type=int, default=None, metavar='MS',
+    help='Drop symbols that repeat a symbol read within the last MS '
+         'milliseconds, e.g. when a label passes a reader in continuous '
+         'mode')
+parser.add_argument(
+    '--metrics-port', type=int, default=None,
+    help='Serve metrics in Prometheus text format on this local port. With '
+         'worker processes, the workers report their metrics to the '
+         'supervisor every second')
+parser.add_argument(
+    '--capture', type=str, default=None,
+    help='Record all serial traffic to this file, see microscan_replay. '
+         'With worker processes, each worker records to its own file, named '
+         'CAPTURE-0, CAPTURE-1, etc. in the order of the devices')
+
+
+class InstrumentedXMLRPCServer(SimpleXMLRPCServer):
+    """XMLRPC server that records request counts and durations
+
+    Calls to `read_barcode` are additionally reported as barcode read
+    latency and, if a symbol was returned, counted as symbols. Calls to
+    methods that do not exist are reported with the method label 'unknown',
+    so clients cannot create arbitrarily many series. See
+    `ServerMetrics.observe_request()`.
+    """
+    def __init__(self, addr, metrics, device, **kwargs):
+        super().__init__(addr, **kwargs)
+        self.metrics = metrics
+        self.device = device
+
+    def _method_label(self, method):
+        if method in self.funcs:
+            return method
+        if self.instance is not None:
+            try:
+                resolve_dotted_attribute(
+                    self.instance, method, self.allow_dotted_names)
+                return method
+            except AttributeError:
+                pass
+        return 'unknown'
+
+    def _dispatch(self, method, params):
+        start = time.perf_counter()
+        status = 'error'
+        result = None
+        try:
+            result = super()._dispatch(method, params)
+            status = 'ok'
+            return result
+        finally:
+            self.metrics.observe_request(
+                self.device, method, self._method_label(method), status,
+                time.perf_counter() - start, result)
+
+
+class InstrumentedRPCServer(RPCServer):
+    """microscan.rpc server that records request counts and durations like
+    InstrumentedXMLRPCServer"""
+    def __init__(self, path, instance, metrics, device):
+        super().__init__(path, instance)
+        self.metrics = metrics
+        self.device = device
+
+    def _method_label(self, method):
+        try:
+            resolve_method(self.instance, method)
+            return method
+        except AttributeError:
+            return 'unknown'
+
+    def dispatch(self, method, args):
+        start = time.perf_counter()
+        status = 'error'
+        result = None
+        try:
+            result = super().dispatch(method, args)
+            status = 'ok'
+            return result
+        finally:
+            self.metrics.observe_request(
+                self.device, method, self._method_label(method), status,
+                time.perf_counter() - start, result)
+
+
+class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """XMLRPC server handling each request in a separate thread, so that a
+    slow reader does not hold up calls to other readers"""
+    daemon_threads = True
+
+
+class SupervisorRPC:
+    """XMLRPC interface to a Supervisor
+
+    Driver methods are called as `<device>.<method>`, for example
+    `/dev/ttyUSB0.read_barcode`. In addition, devices(), status(), and
+    symbols(after) return the supervisor's devices, worker status, and
+    symbols as lists of [sequence, device, timestamp, data].
+    """
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+
+    def _listMethods(self):
+        return ['devices', 'status', 'symbols']
+
+    def _dispatch(self, method, params):
+        if method == 'devices':
+            return self.supervisor.devices
+        if method == 'status':
+            return self.supervisor.status()
+        if method == 'symbols':
+            return [
+                [sequence, device, symbol.timestamp, symbol.data]
+                for sequence, device, symbol
+                in self.supervisor.symbols(*params)]
+        for device in self.supervisor.devices:
+            if method.startswith(device + '.'):
+                return self.supervisor.call(
+                    device, method[len(device) + 1:], *params)
+        raise Exception('method "%s" is not supported' % method)
+
+
+class SupervisorMetrics:
+    """Metrics forwarded by the workers of a Supervisor, for
+    start_metrics_server()"""
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+
+    def expose(self):
+        return self.supervisor.metrics()
+
+
+def start_unix_socket_server(path, instance, metrics=None, device=None):
+    """Serve `instance` with microscan.rpc on a Unix domain socket in a
+    background thread
+
+    If `metrics` are given, requests are recorded for `device`.
+    """
+    # remove the socket left behind by a previous run, but no other files
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.unlink(path)
+    if metrics is None:
+        server = RPCServer(path, instance)
+    else:
+        server = InstrumentedRPCServer(path, instance, metrics, device)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def suppress_duplicates(args):
+    """Duplicate suppression window in seconds, or None"""
+    if args.suppress_duplicates is None:
+        return None
+    return args.suppress_duplicates / 1000
+
+
+def serve_workers(args):
+    server = ThreadingXMLRPCServer(("localhost", args.port), allow_none=True)
+    capture = None
+    if args.capture is not None:
+        capture = {
+            device: '%s-%d' % (args.capture, i)
+            for i, device in enumerate(args.device)}
+    supervisor = Supervisor(
+        args.device, driver_factory=partial(
+            MS3Driver, auto_reconnect=True,
+            suppress_duplicates=suppress_duplicates(args)),
+        stream_symbols=args.stream_symbols or args.symbol_ring is not None,
+        metrics_interval=1.0 if args.metrics_port is not None else None,
+        capture=capture)
+    rings = {}
+    if args.symbol_ring is not None:
+        # the rings live in the supervisor process, so consumers are not
+        # affected by worker restarts
+        for i, device in enumerate(args.device):
+            rings[device] = SymbolRing('%s-%d' % (args.symbol_ring, i))
+        supervisor.add_symbol_listener(
+            lambda device, symbol: rings[device].publish(symbol))
+    rpc_server = None
+    metrics_server = None
+    try:
+        with supervisor:
+            if args.metrics_port is not None:
+                metrics_server = start_metrics_server(
+                    SupervisorMetrics(supervisor), args.metrics_port)
+            instance = SupervisorRPC(supervisor)
+            if args.unix_socket is not None:
+                rpc_server = start_unix_socket_server(
+                    args.unix_socket, instance)
+            server.register_instance(instance)
+            server.register_introspection_functions()
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if rpc_server is not None:
+            rpc_server.shutdown()
+            rpc_server.server_close()
+            os.unlink(args.unix_socket)
+        for ring in rings.values():
+            ring.close()
+    return 0
 
 
 def main():
     args = parser.parse_args()
+    if len(args.device) > 1 or args.workers:
+        return serve_workers(args)
+    args.device = args.device[0]
+
+    if args.metrics_port is None:
+        server = SimpleXMLRPCServer(("localhost", args.port))
+    else:
+        metrics = ServerMetrics()
+        server = InstrumentedXMLRPCServer(
+            ("localhost", args.port), metrics, args.device)
+        metrics_server = start_metrics_server(
+            metrics.registry, args.metrics_port)
 
-    server = SimpleXMLRPCServer(("localhost", args.port))
+    driver = MS3Driver(
+        args.device, auto_reconnect=True,
+        suppress_duplicates=suppress_duplicates(args))
+    if args.capture is not None:
+        capture = CaptureWriter(args.capture, portname=args.device)
+        driver.add_trace_hook(capture)
+    if args.symbol_ring is not None:
+        ring = SymbolRing(args.symbol_ring)
+        driver.add_symbol_listener(ring)
+    rpc_server = None
 
     try:
-        with MS3Driver(args.device) as driver:
+        with driver:
+            if args.metrics_port is not None:
+                instrument_driver(metrics, args.device, driver)
+            if args.symbol_ring is not None:
+                driver.start_symbol_stream()
+            if args.unix_socket is not None:
+                rpc_server = start_unix_socket_server(
+                    args.unix_socket, driver,
+                    metrics if args.metrics_port is not None else None,
+                    args.device)
             server.register_instance(driver, allow_dotted_names=True)
             server.register_introspection_functions()
             server.serve_forever()
     except KeyboardInterrupt:
         pass
+    finally:
+        if args.metrics_port is not None:
+            metrics_server.shutdown()
+        if args.capture is not None:
+            capture.close()
+        if args.symbol_ring is not None:
+            ring.close()
+        if rpc_server is not None:
+            rpc_server.shutdown()
+            rpc_server.server_close()
+            os.unlink(args.unix_socket)
 
     return 0
 
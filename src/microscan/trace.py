@@ -0,0 +1,58 @@
+"""Wire-level tracing of the serial communication with a barcode reader
+
+A trace hook is any callable that accepts a single `TraceEvent` argument.
+Hooks are registered with `MicroscanDriver.add_trace_hook()` and are called
+synchronously for every chunk of bytes written to or read from the serial
+port, so they should return quickly. When no hooks are registered, the driver
+skips event creation entirely.
+
+Each event carries the name of the driver operation that caused the traffic
+(for example 'read_config' or 'read_barcode') and a sequence number that is
+incremented once per operation. Sampling is done per operation, i.e. a hook
+registered with `sample_every=10` sees all bytes of every tenth operation
+rather than every tenth chunk of bytes.
+"""
+from collections import deque
+from collections import namedtuple
+
+
+OUTBOUND = 'out'
+INBOUND = 'in'
+
+
+TraceEvent = namedtuple(
+    'TraceEvent', ['direction', 'operation', 'sequence', 'timestamp', 'data'])
+TraceEvent.__doc__ = """A chunk of bytes sent to or received from the device
+
+- direction: `OUTBOUND` or `INBOUND`
+- operation: name of the driver method that caused the transfer
+- sequence: number of the operation, incremented for each driver operation
+- timestamp: `time.monotonic()` when the chunk was written or received
+- data: the bytes transferred
+"""
+
+
+class ByteCounter:
+    """Trace hook that counts the bytes transferred in each direction"""
+    def __init__(self):
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def __call__(self, event):
+        if event.direction == OUTBOUND:
+            self.bytes_out += len(event.data)
+        else:
+            self.bytes_in += len(event.data)
+
+
+class TraceRecorder:
+    """Trace hook that keeps the most recent events in memory
+
+    Set `maxlen` to limit the number of events retained, older events are
+    discarded first.
+    """
+    def __init__(self, maxlen=None):
+        self.events = deque(maxlen=maxlen)
+
+    def __call__(self, event):
+        self.events.append(event)
@@ -0,0 +1,355 @@
+"""Run each barcode reader in a dedicated worker process
+
+With many readers in one Python process, symbol framing, RPC marshalling and
+configuration parsing all compete for the same interpreter lock. A
+`Supervisor` starts one worker process per serial port instead, routes method
+calls to the right worker, and collects the symbol streams of all workers:
+
+```
+with Supervisor(['/dev/ttyUSB0', '/dev/ttyUSB1'], stream_symbols=True) as s:
+    s.call('/dev/ttyUSB0', 'read_config')
+    for sequence, device, symbol in s.symbols():
+        print(device, symbol.data)
+```
+
+Each worker talks to its supervisor over two pipes, one for method calls and
+one for symbols and metrics, so a crashing worker does not affect the others.
+The supervisor restarts workers that exit, after `restart_delay` seconds.
+Method calls to a worker that is not running raise WorkerError.
+
+With `metrics_interval`, each worker instruments its driver with the
+`microscan.tools.metrics.ServerMetrics` families, records the method calls
+it handles, and sends its metrics to the supervisor every `metrics_interval`
+seconds, see `Supervisor.metrics()`. With `capture`, each worker records the
+traffic of its reader to its own capture file, see `microscan.capture`.
+
+Workers are started with the 'spawn' method by default, so `driver_factory`
+and its arguments must be picklable, e.g. a driver class.
+"""
+from collections import deque
+from contextlib import ExitStack
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+import threading
+import time
+
+from .capture import CaptureWriter
+from .driver import MS3Driver
+from .rpc import resolve_method
+from .symbols import Symbol
+from .tools.metrics import ServerMetrics
+from .tools.metrics import instrument_driver
+from .tools.metrics import merge_expositions
+
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerError(Exception):
+    """Raised when a method call cannot be completed by a worker process"""
+
+
+def _worker_main(device, driver_factory, stream_symbols, rpc, symbols,
+                 metrics_interval=None, capture=None):
+    """Entry point of a worker process"""
+    driver = driver_factory(device)
+    # the symbol stream thread and the main thread both send to the supervisor
+    send_lock = threading.Lock()
+
+    def send(item):
+        with send_lock:
+            symbols.send(item)
+    driver.add_symbol_listener(lambda symbol: send(tuple(symbol)))
+    with ExitStack() as stack:
+        if capture is not None:
+            writer = stack.enter_context(
+                CaptureWriter(capture, portname=device))
+            driver.add_trace_hook(writer)
+        stack.enter_context(driver)
+        metrics = None
+        if metrics_interval is not None:
+            metrics = ServerMetrics()
+            instrument_driver(metrics, device, driver)
+            next_report = time.monotonic()
+        if stream_symbols:
+            driver.start_symbol_stream()
+        while True:
+            if metrics is not None and time.monotonic() >= next_report:
+                send(metrics.registry.expose())
+                next_report = time.monotonic() + metrics_interval
+            if not rpc.poll(0.1):
+                if stream_symbols and not driver.symbol_stream_alive:
+                    # let the supervisor restart the worker
+                    raise WorkerError(
+                        'Symbol stream stopped: %s' % driver.stream_error)
+                continue
+            try:
+                request = rpc.recv()
+            except EOFError:
+                return
+            if request is None:
+                return
+            method, args = request
+            start = time.perf_counter()
+            function = None
+            try:
+                function = resolve_method(driver, method)
+                response = (True, function(*args))
+            except Exception as e:
+                response = (False, e)
+            if metrics is not None:
+                # like InstrumentedXMLRPCServer, do not create series for
+                # methods that do not exist
+                metrics.observe_request(
+                    device, method,
+                    method if function is not None else 'unknown',
+                    'ok' if response[0] else 'error',
+                    time.perf_counter() - start, response[1])
+            try:
+                rpc.send(response)
+            except Exception:
+                # the result or exception cannot be pickled
+                rpc.send((False, WorkerError(
+                    '%s failed: %r' % (method, response[1]))))
+
+
+class _Worker:
+    """Supervisor-side state of one worker process"""
+    def __init__(self, device):
+        self.device = device
+        self.process = None
+        self.rpc = None
+        self.symbols = None
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self.exited_at = None
+        # the most recent metrics exposition received from the worker
+        self.metrics = None
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class Supervisor:
+    """Starts, restarts and routes calls to one worker process per device
+
+    `driver_factory` is called with the device name in the worker process and
+    must return an unconnected MicroscanDriver. With `stream_symbols=True`,
+    each worker runs its driver's symbol stream and forwards the symbols to
+    the supervisor, where the most recent `symbol_history` symbols of all
+    devices are kept for symbols() and passed to listeners registered with
+    add_symbol_listener().
+
+    With `metrics_interval`, workers send their metrics every
+    `metrics_interval` seconds, see metrics(). `capture` maps devices to the
+    paths of the capture files their workers write; a restarted worker
+    overwrites its file.
+    """
+    def __init__(
+            self, devices, driver_factory=MS3Driver, stream_symbols=False,
+            restart_delay=1.0, symbol_history=10000, mp_context=None,
+            metrics_interval=None, capture=None):
+        self.driver_factory = driver_factory
+        self.stream_symbols = stream_symbols
+        self.metrics_interval = metrics_interval
+        self.capture = capture or {}
+        self.restart_delay = restart_delay
+        self._context = mp_context or multiprocessing.get_context('spawn')
+        self._workers = {device: _Worker(device) for device in devices}
+        self._symbols = deque(maxlen=symbol_history)
+        self._symbols_lock = threading.Lock()
+        self._symbol_sequence = 0
+        self._symbol_listeners = ()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def devices(self):
+        return list(self._workers)
+
+    def start(self):
+        """Start all worker processes and the supervising thread"""
+        self._stop.clear()
+        for worker in self._workers.values():
+            with worker.lock:
+                self._start_worker(worker)
+        self._thread = threading.Thread(
+            target=self._supervise, name='microscan-supervisor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Ask all workers to close their drivers and wait for them to exit
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for worker in self._workers.values():
+            with worker.lock:
+                if worker.alive:
+                    try:
+                        worker.rpc.send(None)
+                    except OSError:
+                        pass
+        deadline = time.monotonic() + timeout
+        for worker in self._workers.values():
+            if worker.process is None:
+                continue
+            worker.process.join(max(0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            self._close_pipes(worker)
+
+    def _start_worker(self, worker):
+        rpc, worker_rpc = self._context.Pipe()
+        symbols, worker_symbols = self._context.Pipe(duplex=False)
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.device, self.driver_factory, self.stream_symbols,
+                  worker_rpc, worker_symbols, self.metrics_interval,
+                  self.capture.get(worker.device)),
+            name='microscan-worker-%s' % worker.device, daemon=True)
+        worker.process.start()
+        # only the worker may hold its ends of the pipes, otherwise the
+        # supervisor would not notice when the worker exits
+        worker_rpc.close()
+        worker_symbols.close()
+        worker.rpc = rpc
+        worker.symbols = symbols
+        worker.exited_at = None
+
+    def _close_pipes(self, worker):
+        for conn in (worker.rpc, worker.symbols):
+            if conn is not None:
+                conn.close()
+        worker.rpc = worker.symbols = None
+
+    def _supervise(self):
+        """Collect symbols from all workers and restart workers that exited
+        """
+        while not self._stop.is_set():
+            connections = {
+                worker.symbols: worker for worker in self._workers.values()
+                if worker.symbols is not None}
+            for conn in wait(list(connections), timeout=0.1):
+                try:
+                    item = conn.recv()
+                except (EOFError, OSError):
+                    # the worker exited, stop waiting for its symbols
+                    connections[conn].symbols = None
+                    conn.close()
+                    continue
+                if isinstance(item, bytes):
+                    connections[conn].metrics = item
+                    continue
+                self._publish_symbol(connections[conn].device, Symbol(*item))
+            if not connections:
+                self._stop.wait(0.1)
+            self._check_workers()
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker in self._workers.values():
+            if worker.alive or self._stop.is_set():
+                continue
+            if worker.exited_at is None:
+                worker.exited_at = now
+                logger.warning(
+                    'Worker for %s exited with code %s' %
+                    (worker.device, worker.process.exitcode))
+            elif now - worker.exited_at >= self.restart_delay:
+                with worker.lock:
+                    self._close_pipes(worker)
+                    worker.restarts += 1
+                    self._start_worker(worker)
+
+    def _publish_symbol(self, device, symbol):
+        with self._symbols_lock:
+            self._symbol_sequence += 1
+            sequence = self._symbol_sequence
+            self._symbols.append((sequence, device, symbol))
+        for listener in self._symbol_listeners:
+            try:
+                listener(device, symbol)
+            except Exception:
+                logger.exception('Symbol listener %r failed' % listener)
+
+    def add_symbol_listener(self, listener):
+        """Register a callable that is called with (device, Symbol) for each
+        symbol received from any worker"""
+        self._symbol_listeners += (listener, )
+
+    def remove_symbol_listener(self, listener):
+        """Unregister a listener previously passed to add_symbol_listener()"""
+        self._symbol_listeners = tuple(
+            other for other in self._symbol_listeners
+            if other != listener)
+
+    def symbols(self, after=0):
+        """Symbols received from all devices, oldest first
+
+        Returns a list of (sequence, device, Symbol) tuples. `sequence` is
+        assigned by the supervisor and increases across all devices; pass the
+        last sequence seen as `after` to only get newer symbols.
+        """
+        with self._symbols_lock:
+            return [item for item in self._symbols if item[0] > after]
+
+    def metrics(self):
+        """The most recent metrics of all workers in the Prometheus text
+        exposition format, see `microscan.tools.metrics`
+
+        Workers only report metrics with `metrics_interval`. The metrics of a
+        worker that exited are reported until it restarts.
+        """
+        return merge_expositions([
+            worker.metrics for worker in self._workers.values()
+            if worker.metrics is not None])
+
+    def status(self):
+        """Dict mapping each device to a dict with keys 'alive', 'pid' and
+        'restarts'"""
+        return {
+            device: {
+                'alive': worker.alive,
+                'pid': worker.process.pid if worker.process else None,
+                'restarts': worker.restarts,
+            }
+            for device, worker in self._workers.items()}
+
+    def call(self, device, method, *args):
+        """Call a method of the driver of `device` in its worker process
+
+        `method` may be a dotted name, for example 'config.to_config_string'.
+        Exceptions raised by the method are raised again in the caller.
+        """
+        try:
+            worker = self._workers[device]
+        except KeyError:
+            raise WorkerError('Unknown device %s' % device)
+        with worker.lock:
+            if not worker.alive:
+                raise WorkerError('Worker for %s is not running' % device)
+            try:
+                worker.rpc.send((method, args))
+                while not worker.rpc.poll(0.1):
+                    if not worker.process.is_alive():
+                        raise EOFError
+                ok, result = worker.rpc.recv()
+            except (EOFError, OSError):
+                raise WorkerError(
+                    'Worker for %s exited during call to %s' %
+                    (device, method))
+        if not ok:
+            raise result
+        return result
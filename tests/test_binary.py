@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+from microscan import binary
+from microscan import config
+
+
+class TestBinaryEncoding(TestCase):
+    def test_round_trip_defaults(self):
+        cfg = config.MicroscanConfiguration()
+        data = binary.encode_config(cfg)
+        self.assertLess(len(data), len(cfg.to_config_string()))
+        self.assertEqual(
+            binary.decode_config(data).to_config_string(),
+            cfg.to_config_string())
+
+    def test_round_trip_parsed(self):
+        cfg = config.MicroscanConfiguration.from_config_strings([
+            b'<K101,2,3,1,1,0,1,AB>',
+            b'<K141,0,>',
+            b'<K220,1,65535>',
+            b'<K474,1,0,10,1,0,0,;,0,0>',
+        ])
+        decoded = binary.decode_config(binary.encode_config(cfg))
+        self.assertEqual(decoded.rs232auxiliary_port.daisy_chain_id, b'AB')
+        self.assertIsNone(decoded.preamble.characters)
+        self.assertEqual(decoded.end_read_cycle.ready_cycle_timeout, 65535)
+        self.assertEqual(
+            decoded.code128.application_record_separator_character, b';')
+        self.assertEqual(decoded.to_config_string(), cfg.to_config_string())
+
+    def test_invalid_data(self):
+        data = binary.encode_config(config.MicroscanConfiguration())
+        with self.assertRaises(binary.BinaryFormatError):
+            binary.decode_config(b'XXXX' + data[4:])
+        with self.assertRaises(binary.BinaryFormatError):
+            binary.decode_config(data[:20])
+        with self.assertRaises(binary.BinaryFormatError):
+            binary.decode_config(data[:-1])
+        # K100 starts with an int32 baud rate followed by the enum parity
+        invalid = bytearray(data)
+        invalid[binary._HEADER.size + 4] = 0xfe
+        with self.assertRaises(binary.BinaryFormatError):
+            binary.decode_config(invalid)
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from microscan import config
+from microscan.cache import ConfigCache
+from microscan.driver import MicroscanDriver
+
+from .test_driver import FakePort, config_response, serial_trigger_config
+
+
+SPOT_CHECK = (b'K200', b'K201')
+
+
+class TestConfigCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ConfigCache(self.directory, spot_check=SPOT_CHECK)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.load('/dev/ttyUSB0'))
+        self.cache.store('/dev/ttyUSB0', serial_trigger_config())
+        cfg = self.cache.load('/dev/ttyUSB0')
+        self.assertEqual(
+            cfg.to_config_string(), serial_trigger_config().to_config_string())
+        self.assertIsNone(self.cache.load('/dev/ttyUSB0', device_id='SN1'))
+
+        self.cache.invalidate('/dev/ttyUSB0')
+        self.assertIsNone(self.cache.load('/dev/ttyUSB0'))
+
+    def test_corrupt_file(self):
+        self.cache.store('COM1', config.MicroscanConfiguration())
+        with open(self.cache.path('COM1'), 'ab') as f:
+            f.write(b'<K200,4,244>')
+        self.assertIsNone(self.cache.load('COM1'))
+
+    def test_connect_uses_cache(self):
+        cfg = serial_trigger_config()
+        self.cache.store('COM1', cfg)
+        driver = MicroscanDriver('COM1', config_cache=self.cache)
+        port = FakePort(responses={
+            b'<K200?><K201?>': b'<K200,4,244><K201,T>',
+        })
+        driver.attach(port)
+        self.assertEqual(port.written, b'<I><K200?><K201?><H>')
+        self.assertEqual(
+            driver.config.trigger.trigger_mode, config.TriggerMode.SerialData)
+
+    def test_connect_reads_config_on_mismatch(self):
+        self.cache.store('COM1', serial_trigger_config())
+        device_config = config.MicroscanConfiguration()
+        device_config.serial_trigger.serial_trigger_character = b'X'
+        driver = MicroscanDriver('COM1', config_cache=self.cache)
+        port = FakePort(responses={
+            b'<K200?><K201?>': b'<K200,0,244><K201,T>',
+            b'<K?>': config_response(device_config),
+        })
+        driver.attach(port)
+        self.assertIn(b'<K?>', port.written)
+        self.assertEqual(
+            driver.config.serial_trigger.serial_trigger_character, b'X')
+        # the full read updates the cache
+        cached = self.cache.load('COM1')
+        self.assertEqual(
+            cached.serial_trigger.serial_trigger_character, b'X')
+        self.assertTrue(os.path.exists(self.cache.path('COM1')))
+
+    def test_incomplete_config_not_stored(self):
+        driver = MicroscanDriver('COM1', config_cache=self.cache)
+        driver.port = FakePort(responses={b'<K?>': b'<K200,4,244>\r\n'})
+        cfg = driver.read_config(timeout=0.05)
+        self.assertEqual(
+            cfg.trigger.trigger_mode, config.TriggerMode.SerialData)
+        self.assertIsNone(self.cache.load('COM1'))
@@ -0,0 +1,116 @@
+from io import BytesIO
+from unittest import TestCase
+
+from microscan import capture
+from microscan import config
+from microscan.driver import MicroscanDriver
+from microscan.trace import INBOUND, OUTBOUND, TraceEvent, TraceRecorder
+
+from .test_driver import FakePort, config_response, serial_trigger_config
+
+
+class TestCaptureFile(TestCase):
+    def test_round_trip(self):
+        events = [
+            TraceEvent(OUTBOUND, 'read_barcode', 1, 0.5, b'<T>'),
+            TraceEvent(INBOUND, 'read_barcode', 1, 0.75, b'12345\r\n'),
+            TraceEvent(OUTBOUND, 'write', 1, 1.0, b'<K705,1,0>'),
+        ]
+        file = BytesIO()
+        writer = capture.CaptureWriter(file, portname='COM1')
+        writer._start = 0.0
+        for event in events:
+            writer(event)
+        writer.close()
+
+        file.seek(0)
+        _, portname = capture.read_capture_header(file)
+        self.assertEqual(portname, 'COM1')
+        file.seek(0)
+        self.assertEqual(list(capture.read_capture(file)), events)
+
+    def test_invalid_file(self):
+        with self.assertRaises(capture.CaptureFormatError):
+            list(capture.read_capture(BytesIO(b'GIF89a' + bytes(20))))
+
+
+class TestReplay(TestCase):
+    def record_session(self):
+        driver = MicroscanDriver('COM1')
+        recorder = TraceRecorder()
+        driver.add_trace_hook(recorder)
+        driver.port = FakePort(config_response(serial_trigger_config()))
+        driver.read_config(timeout=0.5)
+        driver.port.incoming += b'12345\r\n'
+        driver.read_barcode()
+        return list(recorder.events)
+
+    def test_replay_session(self):
+        events = self.record_session()
+        driver = MicroscanDriver('replay')
+        port = capture.ReplayPort(events, speed=None, strict=True)
+        results = capture.replay_session(driver, port)
+
+        self.assertEqual(
+            [operation for operation, _, _ in results],
+            ['read_config', 'read_barcode'])
+        self.assertEqual(
+            results[0][1].trigger.trigger_mode, config.TriggerMode.SerialData)
+        self.assertEqual(results[1][1], '12345')
+        self.assertTrue(port.exhausted)
+
+    def test_nested_operations(self):
+        # connect() is not repeated, and neither is the read_settings() call
+        # nested in it
+        events = [
+            TraceEvent(OUTBOUND, 'connect', 1, 0.0, b'<A>'),
+            TraceEvent(OUTBOUND, 'read_settings', 2, 0.1, b'<I>'),
+            TraceEvent(OUTBOUND, 'read_settings', 2, 0.1, b'<K200?>'),
+            TraceEvent(INBOUND, 'read_settings', 2, 0.2, b'<K200,4,244>'),
+            TraceEvent(OUTBOUND, 'read_settings', 2, 0.3, b'<H>'),
+            TraceEvent(OUTBOUND, 'connect', 1, 0.4, b'<B>'),
+        ]
+        events += [
+            event._replace(sequence=event.sequence + 2)
+            for event in self.record_session()]
+        port = capture.ReplayPort(events, speed=None, strict=True)
+        results = capture.replay_session(MicroscanDriver('replay'), port)
+
+        self.assertEqual(
+            [operation for operation, _, _ in results],
+            ['read_config', 'read_barcode'])
+        self.assertEqual(results[1][1], '12345')
+        self.assertTrue(port.exhausted)
+
+    def test_lazy_connect(self):
+        driver = MicroscanDriver('COM1')
+        recorder = TraceRecorder()
+        driver.add_trace_hook(recorder)
+        driver.attach(FakePort(responses={
+            b'<K200?><K201?><K229?>': b'<K200,4,244><K201,T><K229,>',
+            b'<T>': b'12345\r\n',
+        }), lazy=True)
+        driver.read_barcode()
+
+        port = capture.ReplayPort(recorder.events, speed=None, strict=True)
+        results = capture.replay_session(MicroscanDriver('replay'), port)
+        self.assertEqual(
+            [(operation, result) for operation, result, _ in results],
+            [('read_barcode', '12345')])
+        self.assertTrue(port.exhausted)
+
+    def test_strict_mismatch(self):
+        events = [TraceEvent(OUTBOUND, 'write', 0, 0.0, b'<A>')]
+        port = capture.ReplayPort(events, strict=True)
+        with self.assertRaises(capture.ReplayMismatch):
+            port.write(b'<B>')
+
+    def test_timing(self):
+        events = [
+            TraceEvent(OUTBOUND, 'read_barcode', 1, 10.0, b'<T>'),
+            TraceEvent(INBOUND, 'read_barcode', 1, 12.0, b'12345\r\n'),
+        ]
+        port = capture.ReplayPort(events, speed=1000)
+        port.write(b'<T>')
+        self.assertEqual(port.in_waiting, 0)
+        self.assertEqual(port.readline(), b'12345\r\n')
@@ -0,0 +1,107 @@
+from unittest import TestCase
+
+from microscan import config
+from microscan.checkdigits import CheckDigitVerifier
+from microscan.checkdigits import mod10_valid, mod43_valid, upc_e_to_upc_a
+from microscan.symbols import Symbol
+
+
+def ean_config():
+    cfg = config.MicroscanConfiguration()
+    cfg.code39.status = config.Code39Status.Disabled
+    cfg.upc_ean.upc_status = config.UPCStatus.Enabled
+    cfg.upc_ean.ean_status = config.EANStatus.Enabled
+    return cfg
+
+
+class TestCheckDigits(TestCase):
+    def test_mod10(self):
+        for digits in ('4006381333931', '036000291452', '96385074'):
+            self.assertTrue(mod10_valid(digits))
+        self.assertFalse(mod10_valid('4006381333932'))
+        self.assertFalse(mod10_valid('40063X1333931'))
+        self.assertEqual(upc_e_to_upc_a('04252614'), '042100005264')
+        self.assertTrue(mod10_valid('042100005264'))
+
+    def test_mod43(self):
+        self.assertTrue(mod43_valid('CODE39W'))
+        self.assertFalse(mod43_valid('CODE39X'))
+        self.assertIsNone(mod43_valid('code39W'))
+
+
+class TestCheckDigitVerifier(TestCase):
+    def test_ean(self):
+        verifier = CheckDigitVerifier(ean_config())
+        self.assertTrue(verifier.verify('4006381333931'))
+        self.assertFalse(verifier.verify('4006381333932'))
+        self.assertTrue(verifier.verify('04252614'))
+        self.assertIsNone(verifier.verify('CODE39W'))
+
+    def test_supplementals(self):
+        cfg = ean_config()
+        cfg.upc_ean.supplementals_status = config.SupplementalsStatus.Enabled
+        self.assertTrue(CheckDigitVerifier(cfg).verify('400638133393112'))
+        cfg.upc_ean.separator_status = config.SeparatorStatus.Enabled
+        cfg.upc_ean.separator_character = b','
+        self.assertTrue(CheckDigitVerifier(cfg).verify('4006381333931,12345'))
+        cfg.upc_ean.separator_character = b'^]'
+        self.assertTrue(
+            CheckDigitVerifier(cfg).verify('4006381333931\x1d12345'))
+
+    def test_code39(self):
+        cfg = config.MicroscanConfiguration()
+        verifier = CheckDigitVerifier(cfg)
+        # check digits are not output by default
+        self.assertIsNone(verifier.verify('CODE39W'))
+        cfg.code39.check_digit_status = config.CheckDigitStatus.Enabled
+        cfg.code39.check_digit_output = config.CheckDigitOutputStatus.Enabled
+        verifier.update_config(cfg)
+        self.assertTrue(verifier.verify('CODE39W'))
+        self.assertFalse(verifier.verify('CODE39X'))
+
+    def test_ambiguous_symbology(self):
+        cfg = config.MicroscanConfiguration()
+        cfg.code39.check_digit_status = config.CheckDigitStatus.Enabled
+        cfg.code39.check_digit_output = config.CheckDigitOutputStatus.Enabled
+        cfg.upc_ean.ean_status = config.EANStatus.Enabled
+        verifier = CheckDigitVerifier(cfg, drop_invalid=True)
+        # digits could be EAN-13 or Code 39
+        self.assertIsNone(verifier.verify('4006381333932'))
+        # only Code 39 can produce letters
+        self.assertFalse(verifier.verify('CODE39X'))
+        # any symbol could be Code 128
+        cfg.code128.status = config.Code128Status.Enabled
+        verifier.update_config(cfg)
+        self.assertIsNone(verifier.verify('CODE39X'))
+        self.assertIsNone(
+            verifier(Symbol(1, 0.0, 'PALLET-4711')).check_digit)
+
+    def test_symbology_id(self):
+        cfg = ean_config()
+        cfg.narrow_margins_and_symbology_id.symbology_id_status = \
+            config.SymbologyIDStatus.Enabled
+        verifier = CheckDigitVerifier(cfg)
+        self.assertTrue(verifier.verify(']E04006381333931'))
+        self.assertTrue(verifier.verify(']E004252614'))
+        self.assertTrue(verifier.verify(']E496385074'))
+        self.assertFalse(verifier.verify(']E496385075'))
+        self.assertTrue(verifier.verify(']A1CODE39W'))
+        self.assertIsNone(verifier.verify(']A0CODE39'))
+        self.assertIsNone(verifier.verify(']C012345'))
+        self.assertIsNone(verifier.verify('4006381333931'))
+
+    def test_listeners(self):
+        verifier = CheckDigitVerifier(ean_config())
+        received = []
+        verifier.add_symbol_listener(received.append)
+        verifier(Symbol(1, 0.0, '4006381333931'))
+        verifier(Symbol(2, 0.0, '4006381333932'))
+        verifier(Symbol(3, 0.0, 'ABC'))
+        self.assertEqual(
+            [(s.sequence, s.check_digit) for s in received],
+            [(1, True), (2, False), (3, None)])
+        verifier.drop_invalid = True
+        self.assertIsNone(verifier(Symbol(4, 0.0, '4006381333932')))
+        self.assertEqual(len(received), 3)
+        self.assertEqual(
+            (verifier.checked, verifier.invalid, verifier.dropped), (3, 2, 1))
@@ -1,3 +1,4 @@
+from copy import copy
 from unittest import TestCase
 
 from microscan import config
@@ -38,6 +39,107 @@ class TestHostPortConnectionSerializer(TestCase):
         str_ = obj.to_config_string()
         self.assertEqual(str_, b'<K100,4,1,0,0>')
 
+    def test_serialization_invalid_baud_rate(self):
+        obj = config.HostPortConnection(baud_rate=9601)
+        with self.assertRaises(ValueError):
+            obj.to_config_string()
+
+    def test_serialization_invalid_enum(self):
+        obj = config.HostPortConnection(parity=b'1')
+        with self.assertRaises(ValueError):
+            obj.to_config_string()
+
+
+class TestLookupTable(TestCase):
+    def test_enum_tables(self):
+        table = config.ENUM_TABLES[config.Parity]
+        self.assertIs(table.decode(b'2'), config.Parity.ODD)
+        self.assertEqual(table.encode(config.Parity.ODD), b'2')
+        with self.assertRaises(ValueError):
+            table.decode(b'3')
+
+    def test_baud_rate_table(self):
+        self.assertEqual(config.BAUD_RATE_TABLE.decode(b'8'), 115200)
+        self.assertEqual(config.BAUD_RATE_TABLE.encode(115200), b'8')
+        with self.assertRaises(ValueError):
+            config.BAUD_RATE_TABLE.decode(None)
+
+
+class TestSettingSchema(TestCase):
+    def test_generated_pattern(self):
+        self.assertEqual(
+            config.Trigger.K_PATTERN, b'^<K200,([012345])?,(\\d{1,})?>$')
+
+    def test_generated_constructor(self):
+        obj = config.Code93(fixed_symbol_length=5)
+        self.assertEqual(obj.status, config.Code93Status.Disabled)
+        self.assertEqual(obj.fixed_symbol_length, 5)
+        self.assertEqual(
+            config.setting_fields(config.UPC_EAN)[-1],
+            ('undocumented_field', 0))
+
+    def test_custom_setting(self):
+        class Custom(config.KSetting):
+            K_CODE = b'K999'
+            FIELDS = [
+                config.EnumField('color', config.Color.White),
+                config.IntField('size', 5, maximum=10, max_digits=2),
+                config.TextField('label', None, max_length=3),
+            ]
+
+        obj = Custom.from_config_string(b'<K999,1,10,a,b>')
+        self.assertEqual(obj.color, config.Color.Black)
+        self.assertEqual(obj.size, 10)
+        self.assertEqual(obj.label, b'a,b')
+        self.assertTrue(obj.is_valid())
+        self.assertEqual(obj.to_config_string(), b'<K999,1,10,a,b>')
+        self.assertEqual(Custom(size=11).to_config_string(), b'<K999,0,11,>')
+        self.assertFalse(Custom(size=11).is_valid())
+
+    def test_empty_values(self):
+        obj = config.ScannerSetup.from_config_string(b'<K504,90,0,,>')
+        self.assertIsNone(obj.agc_min)
+        self.assertIsNone(obj.agc_max)
+        self.assertFalse(obj.is_valid())
+
+    def test_escaped_character(self):
+        obj = config.Code128.from_config_string(
+            b'<K474,1,0,10,1,0,0,^],0,0>')
+        self.assertEqual(obj.application_record_separator_character, b'^]')
+        self.assertEqual(obj.to_config_string(), b'<K474,1,0,10,1,0,0,^],0,0>')
+
+    def test_invalid_strings(self):
+        for str_ in [b'<K100,4,0>', b'<K100,4,9,1,0>', b'<K100,4,0,0,0',
+                     b'<K200,0,+1>', b'<K473,0,0,0,0,,x,0,0>']:
+            serializer = config.REGISTRY[str_[1:5]]
+            with self.assertRaises(config.InvalidConfigString):
+                serializer.from_config_string(str_)
+
+    def test_out_of_range(self):
+        for str_ in [b'<K222,9,0>', b'<K222,0,0>', b'<K504,30,0,70,245>']:
+            serializer = config.REGISTRY[str_[1:5]]
+            with self.assertRaises(config.InvalidConfigString):
+                serializer.from_config_string(str_)
+        with self.assertRaises(ValueError):
+            config.Multisymbol.FIELDS[0].decode(b'9')
+        self.assertEqual(
+            config.Multisymbol.from_config_string(b'<K222,5,0>')
+            .number_of_symbols, 5)
+        self.assertTrue(config.ScanSpeed().is_valid())
+        self.assertTrue(config.ScannerSetup().is_valid())
+
+    def test_invalid_values(self):
+        with self.assertRaises(config.InvalidConfigString):
+            config.Preamble(characters='ABCDE').to_config_string()
+        with self.assertRaises(config.InvalidConfigString):
+            config.Trigger(trigger_filter_duration=-1).to_config_string()
+
+    def test_is_valid(self):
+        self.assertTrue(config.Code128().is_valid())
+        self.assertTrue(config.ScanWidthEnhance().is_valid())
+        self.assertFalse(config.LaserSetup(laser_on_position=5).is_valid())
+        self.assertFalse(config.Trigger(trigger_mode=None).is_valid())
+
 
 class TestHostProtocolSerializer(TestCase):
     def test_deserialization_1(self):
@@ -719,3 +821,105 @@ class TestSymbolRatioMode(TestCase):
         )
         str_ = obj.to_config_string()
         self.assertEqual(str_, b'<K452,2,0,2,1>')
+
+
+class TestLazyMicroscanConfiguration(TestCase):
+    RESPONSE = (
+        b'<K100,4,0,0,0><K140,5,1,2><K200,4,244>\r\n<K474,1,0,10,1,0,0,,,0,0>'
+        b'<K999,1>')
+
+    def test_decode_on_access(self):
+        cfg = config.LazyMicroscanConfiguration.from_config_response(
+            self.RESPONSE)
+        self.assertFalse(cfg.is_decoded(b'K200'))
+        self.assertEqual(
+            cfg.trigger.trigger_mode, config.TriggerMode.SerialData)
+        self.assertTrue(cfg.is_decoded(b'K200'))
+        self.assertFalse(cfg.is_decoded(b'K474'))
+        self.assertEqual(
+            cfg.get_setting(b'K474').application_record_separator_character,
+            b',')
+        # settings missing from the response have default values
+        self.assertEqual(cfg.lrc.status, config.LRCStatus.Disabled)
+
+    def test_pass_through(self):
+        cfg = config.LazyMicroscanConfiguration.from_config_response(
+            self.RESPONSE)
+        cfg.trigger.trigger_mode = config.TriggerMode.ContinuousRead
+        eager = config.MicroscanConfiguration.from_config_strings(
+            [b'<K100,4,0,0,0>', b'<K474,1,0,10,1,0,0,,,0,0>'])
+        expected = eager.to_config_string().replace(
+            b'<K140,0>', b'<K140,5,1,2>')
+        self.assertEqual(cfg.to_config_string(), expected)
+        self.assertFalse(cfg.is_decoded(b'K140'))
+
+    def test_copy(self):
+        cfg = config.LazyMicroscanConfiguration.from_config_response(
+            self.RESPONSE)
+        other = copy(cfg)
+        self.assertEqual(
+            other.trigger.trigger_mode, config.TriggerMode.SerialData)
+        self.assertEqual(
+            cfg.trigger.trigger_mode, config.TriggerMode.SerialData)
+        # assigned settings replace the raw strings of the copy only
+        other.code128 = config.MicroscanConfiguration().code128
+        self.assertIn(b'<K474,0,', other.to_config_string())
+        self.assertIn(b'<K474,1,', cfg.to_config_string())
+
+    def test_invalid_setting(self):
+        cfg = config.LazyMicroscanConfiguration.from_config_strings(
+            [b'<K200,9,244>'])
+        with self.assertRaises(config.InvalidConfigString):
+            cfg.trigger
+        with self.assertRaises(AttributeError):
+            cfg.not_a_setting
+
+
+class TestConfigStreamParser(TestCase):
+    RESPONSE = (
+        b'<K100,4,0,0,0><K141,1,^]>\r\n<K200,4,244>\r\n'
+        b'<K474,1,0,10,1,0,0,,,0,0><K999,1>\r\n')
+
+    def test_single_chunk(self):
+        parser = config.ConfigStreamParser()
+        settings = parser.feed(self.RESPONSE)
+        self.assertEqual(
+            [s.K_CODE for s in settings],
+            [b'K100', b'K141', b'K200', b'K474'])
+        self.assertEqual(parser.unknown, [b'<K999,1>'])
+        self.assertFalse(parser.pending)
+
+    def test_chunk_boundaries(self):
+        expected = config.ConfigStreamParser()
+        expected.feed(self.RESPONSE)
+        for size in range(1, 8):
+            parser = config.ConfigStreamParser()
+            for i in range(0, len(self.RESPONSE), size):
+                parser.feed(self.RESPONSE[i:i + size])
+            self.assertEqual(
+                parser.config().to_config_string(),
+                expected.config().to_config_string())
+        self.assertEqual(
+            parser.config().preamble.characters, b'^]')
+
+    def test_split_inside_setting(self):
+        parser = config.ConfigStreamParser()
+        self.assertEqual(parser.feed(b'\r\n<'), [])
+        self.assertFalse(parser.pending)
+        self.assertEqual(parser.feed(b'K141,1,^'), [])
+        self.assertTrue(parser.pending)
+        settings = parser.feed(b']><K2')
+        self.assertEqual(settings[0].characters, b'^]')
+        self.assertTrue(parser.pending)
+        self.assertEqual(
+            parser.feed(b'00,4,244>')[0].trigger_mode,
+            config.TriggerMode.SerialData)
+
+    def test_invalid_setting(self):
+        parser = config.ConfigStreamParser()
+        with self.assertRaises(config.InvalidConfigString):
+            parser.feed(b'<K200,9,244><K201,T>')
+        # parsing continues after the invalid setting
+        self.assertEqual(
+            parser.feed(b'')[0].serial_trigger_character, b'T')
+        self.assertEqual(list(parser.settings), [b'K201'])
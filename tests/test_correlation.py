@@ -0,0 +1,84 @@
+import time
+from unittest import TestCase
+
+from microscan.correlation import Correlator
+from microscan.driver import MicroscanDriver
+from microscan.symbols import Symbol
+
+from .test_driver import FakePort
+
+
+def symbol(data, timestamp):
+    return Symbol(1, timestamp, data)
+
+
+class TestCorrelator(TestCase):
+    def setUp(self):
+        self.correlator = Correlator(window=0.2)
+        self.items = []
+        self.correlator.add_item_listener(self.items.append)
+
+    def test_join(self):
+        c = self.correlator
+        c.add_symbol('top', symbol('A', 100.0))
+        c.add_symbol('left', symbol('A', 100.05))
+        c.add_symbol('right', symbol('', 100.06))
+        c.add_symbol('right', symbol('B', 100.1))
+        c.add_symbol('bottom', symbol('A', 100.15))
+        c.add_symbol('top', symbol('C', 100.3))
+        c.add_symbol('left', symbol('C', 100.31))
+        c.close_expired(100.25)
+        c.close_expired(100.6)
+
+        first, second = self.items
+        self.assertEqual(first.readers, ['top', 'left', 'right', 'bottom'])
+        self.assertTrue(first.conflict)
+        self.assertIsNone(first.code)
+        self.assertEqual(first.codes, {
+            'A': {'top', 'left', 'bottom'}, 'B': {'right'}})
+        self.assertEqual(first.last_seen, 100.15)
+        self.assertEqual(second.code, 'C')
+        self.assertEqual(second.readers, ['top', 'left'])
+        self.assertEqual((c.items, c.conflicts), (2, 1))
+
+    def test_window_ended(self):
+        # the item with code A is still open when the next A is read, but its
+        # window has ended
+        c = self.correlator
+        c.add_symbol('top', symbol('A', 100.0))
+        c.add_symbol('top', symbol('A', 100.5))
+        c.close_expired(101.0)
+        self.assertEqual(
+            [(item.code, item.first_seen) for item in self.items],
+            [('A', 100.0), ('A', 100.5)])
+
+    def test_max_open(self):
+        c = Correlator(window=10.0, max_open=2)
+        c.add_item_listener(self.items.append)
+        c.add_symbol('top', symbol('A', 100.0))
+        c.add_symbol('top', symbol('B', 120.0))
+        self.assertEqual(self.items, [])
+        c.add_symbol('top', symbol('C', 140.0))
+        self.assertEqual([item.code for item in self.items], ['A'])
+        c.flush()
+        self.assertEqual(
+            [item.code for item in self.items], ['A', 'B', 'C'])
+
+    def test_drivers(self):
+        drivers = [MicroscanDriver('COM%d' % n) for n in (1, 2)]
+        for driver in drivers:
+            driver.port = FakePort()
+            self.correlator.add_reader(driver.portname, driver)
+        with self.correlator:
+            drivers[0]._publish_symbol(b'12345\r\n')
+            drivers[1]._publish_symbol(b'12345\r\n')
+            deadline = time.monotonic() + 5
+            while not self.items and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(self.items), 1)
+            self.correlator.remove_reader('COM2')
+            drivers[1]._publish_symbol(b'678\r\n')
+        item, = self.items
+        self.assertEqual(item.readers, ['COM1', 'COM2'])
+        self.assertEqual(item.code, '12345')
+        self.assertLess(self.correlator.max_delay, 1.0)
@@ -0,0 +1,93 @@
+import time
+from unittest import TestCase
+
+from microscan.counters import CounterError, CounterPoller, DeviceCounters
+from microscan.counters import counter_delta
+from microscan.driver import MicroscanDriver
+
+from .test_driver import FakePort
+
+
+class CounterPort(FakePort):
+    """Answers counter queries with counts that grow by each query
+
+    `symbols` are sent before the response to the next query.
+    """
+    def __init__(self):
+        super().__init__()
+        self.counts = {b'<N>': 1, b'<T>': 10, b'<V>': 9}
+        self.symbols = b''
+
+    def write(self, data):
+        super().write(data)
+        if data in self.counts:
+            self.incoming += self.symbols + b'%05d\r\n' % self.counts[data]
+            self.symbols = b''
+            self.counts[data] += 1 if data == b'<N>' else 5
+
+
+class TestCounters(TestCase):
+    def setUp(self):
+        self.driver = MicroscanDriver('COM1')
+        self.driver.port = CounterPort()
+
+    def test_read_counters(self):
+        counters = self.driver.read_counters(reset=True)
+        self.assertEqual(counters[1:], (10, 9, 1))
+        self.assertEqual(self.driver.port.written, b'<N><T><V><O><U><W>')
+
+    def test_symbols_during_query(self):
+        # a numeric symbol is not mistaken for a count, and is published by
+        # the symbol stream
+        symbols = []
+        self.driver.add_symbol_listener(symbols.append)
+        self.driver.start_symbol_stream()
+        self.driver.port.symbols = b'4006381333931\r\n'
+        counters = self.driver.read_counters()
+        self.assertEqual(counters[1:], (10, 9, 1))
+        deadline = time.monotonic() + 5
+        while not symbols and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.driver.stop_symbol_stream()
+        self.assertEqual([s.data for s in symbols], ['4006381333931'])
+
+    def test_symbols_without_stream(self):
+        symbols = []
+        self.driver.add_symbol_listener(symbols.append)
+        self.driver.port.symbols = b'ABC\r\n'
+        self.assertEqual(self.driver.read_counters()[1:], (10, 9, 1))
+        self.assertEqual(symbols, [])
+
+    def test_no_response(self):
+        self.driver.port = FakePort()
+        # a reader that does not answer is not a port failure
+        self.driver.auto_reconnect = True
+        self.driver._port_settings = {}
+        self.driver.reconnect = self.fail
+        with self.assertRaises(CounterError):
+            self.driver.read_counters(timeout=0.05)
+
+    def test_delta(self):
+        delta = counter_delta(
+            DeviceCounters(1.0, 65530, 100, 0),
+            DeviceCounters(2.0, 4, 103, 1))
+        self.assertEqual(tuple(delta), (1.0, 10, 3, 1))
+        self.assertEqual(delta.good_read_rate, 0.75)
+
+    def test_poller(self):
+        poller = CounterPoller(self.driver, interval=0.02)
+        deltas = []
+        poller.add_listener(lambda counters, delta: deltas.append(delta))
+        # a busy driver postpones the poll
+        with self.driver._lock:
+            poller.start()
+            time.sleep(0.05)
+            self.assertIsNone(poller.latest)
+        deadline = time.monotonic() + 5
+        while len(deltas) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        poller.stop()
+        self.assertGreater(poller.postponed, 0)
+        self.assertIsNone(poller.error)
+        self.assertEqual(deltas[0][1:], (5, 5, 1))
+        self.assertAlmostEqual(deltas[0].good_read_rate, 5 / 6)
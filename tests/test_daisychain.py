@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+from microscan import config
+from microscan.daisychain import DaisyChain
+from microscan.driver import MicroscanDriver
+
+from .test_driver import FakePort
+
+
+class TestDemultiplex(TestCase):
+    def setUp(self):
+        self.driver = MicroscanDriver('COM1')
+        self.driver.port = FakePort()
+        self.chain = DaisyChain(self.driver, [b'1/', b'2/', '12'])
+
+    def test_routing(self):
+        received = []
+        self.chain[b'2/'].add_symbol_listener(received.append)
+        self.driver._publish_symbol(b'1/ABC\r\n')
+        self.driver._publish_symbol(b'2/DEF\r\n')
+        self.driver._publish_symbol(b'12GHI\r\n')
+        self.driver._publish_symbol(b'3/JKL\r\n')
+        self.driver._publish_symbol(b'2/MNO\r\n')
+
+        self.assertEqual([s.data for s in received], ['DEF', 'MNO'])
+        self.assertEqual([s.sequence for s in received], [1, 2])
+        self.assertEqual(self.chain['1/'].read_barcode(0), 'ABC')
+        self.assertEqual(self.chain['1/'].read_barcode(0), '')
+        self.assertEqual(self.chain[b'12'].read_barcode(0), 'GHI')
+        self.assertEqual(self.chain.unattributed, 1)
+
+        stats = self.chain[b'2/'].stats
+        self.assertEqual(stats.symbols, 2)
+        self.assertEqual(stats.last_timestamp, received[-1].timestamp)
+        self.assertEqual(
+            stats.mean_interval,
+            received[1].timestamp - received[0].timestamp)
+        self.assertEqual(stats.max_interval, stats.mean_interval)
+        self.assertIsNone(self.chain[b'1/'].stats.mean_interval)
+
+    def test_close(self):
+        self.chain.close()
+        self.driver._publish_symbol(b'1/ABC\r\n')
+        self.assertEqual(self.chain[b'1/'].stats.symbols, 0)
+
+
+class TestConfigure(TestCase):
+    def test_aux_port_not_written(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort()
+        driver._config = config.MicroscanConfiguration()
+        driver._config.rs232auxiliary_port.daisy_chain_id = '2/'
+        new = config.MicroscanConfiguration()
+        new.trigger.trigger_mode = config.TriggerMode.SerialData
+
+        DaisyChain(driver, [b'1/', b'2/']).configure(new)
+
+        written = bytes(driver.port.written)
+        self.assertIn(new.trigger.to_config_string(), written)
+        self.assertNotIn(b'<K101,', written)
+        self.assertTrue(written.startswith(b'<I>'))
+        self.assertTrue(written.endswith(b'<H>'))
+        self.assertEqual(
+            driver.config.rs232auxiliary_port.daisy_chain_id, '2/')
+        self.assertEqual(
+            driver.config.trigger.trigger_mode, config.TriggerMode.SerialData)
+        # the caller's configuration is left alone
+        self.assertEqual(new.rs232auxiliary_port.daisy_chain_id, '1/')
@@ -0,0 +1,309 @@
+import time
+from unittest import TestCase
+
+from microscan import config
+from microscan.driver import MicroscanDriver
+from microscan.driver import _operation
+from microscan.trace import INBOUND, OUTBOUND, TraceRecorder
+
+
+class FakePort:
+    """Minimal stand-in for serial.Serial returning canned input
+
+    `responses` maps commands to the bytes the fake device sends in response
+    to each write of that command.
+    """
+    def __init__(self, incoming=b'', responses=None):
+        self.incoming = bytearray(incoming)
+        self.written = bytearray()
+        self.responses = responses or {}
+
+    @property
+    def in_waiting(self):
+        return len(self.incoming)
+
+    def write(self, data):
+        self.written += data
+        self.incoming += self.responses.get(bytes(data), b'')
+
+    def flush(self):
+        pass
+
+    def read(self, size=1):
+        data = bytes(self.incoming[:size])
+        del self.incoming[:size]
+        return data
+
+    def read_all(self):
+        data = bytes(self.incoming)
+        self.incoming.clear()
+        return data
+
+    def readline(self):
+        end = self.incoming.find(b'\n') + 1 or len(self.incoming)
+        data = bytes(self.incoming[:end])
+        del self.incoming[:end]
+        return data
+
+    def close(self):
+        pass
+
+
+def serial_trigger_config():
+    cfg = config.MicroscanConfiguration()
+    cfg.trigger.trigger_mode = config.TriggerMode.SerialData
+    cfg.serial_trigger.serial_trigger_character = b'T'
+    return cfg
+
+
+def config_response(cfg):
+    """Complete response of a device with configuration `cfg` to <K?>"""
+    return cfg.to_config_string(separator=b'\r\n') + b'\r\n'
+
+
+class TestTraceHooks(TestCase):
+    def setUp(self):
+        self.driver = MicroscanDriver('COM1')
+        self.driver.port = FakePort(b'12345\r\n')
+        self.driver._config = serial_trigger_config()
+
+    def test_events(self):
+        recorder = TraceRecorder()
+        self.driver.add_trace_hook(recorder)
+        self.assertEqual(self.driver.read_barcode(), '12345')
+
+        out, in_ = recorder.events
+        self.assertEqual(out.direction, OUTBOUND)
+        self.assertEqual(out.data, b'<T>')
+        self.assertEqual(out.operation, 'read_barcode')
+        self.assertEqual(in_.direction, INBOUND)
+        self.assertEqual(in_.data, b'12345\r\n')
+        self.assertEqual(in_.sequence, out.sequence)
+        self.assertLessEqual(out.timestamp, in_.timestamp)
+
+    def test_direct_write(self):
+        recorder = TraceRecorder()
+        self.driver.add_trace_hook(recorder)
+        self.driver.write(b'<K705,1,0>')
+        self.assertEqual(recorder.events[0].operation, 'write')
+
+    def test_sampling(self):
+        recorder = TraceRecorder()
+        self.driver.add_trace_hook(recorder, sample_every=2)
+        for _ in range(4):
+            self.driver.port.incoming += b'12345\r\n'
+            self.driver.read_barcode()
+        sequences = set(event.sequence for event in recorder.events)
+        self.assertEqual(len(recorder.events), 4)
+        self.assertEqual(len(sequences), 2)
+
+    def test_nested_operations(self):
+        class NestingDriver(MicroscanDriver):
+            @_operation
+            def outer(self):
+                self._port_write(b'<A>')
+                self.inner()
+                self._port_write(b'<C>')
+
+            @_operation
+            def inner(self):
+                self._port_write(b'<B>')
+
+        driver = NestingDriver('COM1')
+        driver.port = FakePort()
+        recorder = TraceRecorder()
+        driver.add_trace_hook(recorder)
+        driver.outer()
+        self.assertEqual(
+            [(e.operation, e.sequence) for e in recorder.events],
+            [('outer', 1), ('inner', 2), ('outer', 1)])
+
+    def test_remove(self):
+        recorder = TraceRecorder()
+        self.driver.add_trace_hook(recorder)
+        self.driver.remove_trace_hook(recorder)
+        self.driver.read_barcode()
+        self.assertEqual(len(recorder.events), 0)
+
+
+class TestReadSettings(TestCase):
+    def test_read_settings(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort(responses={
+            b'<K200?><K201?>': b'<K200,4,244>\r\n<K201,T>\r\n',
+        })
+        settings = driver.read_settings([b'K200', b'K201'])
+        self.assertEqual(
+            settings[b'K200'].trigger_mode, config.TriggerMode.SerialData)
+        self.assertEqual(
+            settings[b'K201'].serial_trigger_character, b'T')
+        self.assertEqual(
+            driver.port.written, b'<I><K200?><K201?><H>')
+
+    def test_missing_response(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort(responses={
+            b'<K200?><K201?>': b'<K200,4,244>\r\n',
+        })
+        settings = driver.read_settings([b'K200', b'K201'], timeout=0.05)
+        self.assertEqual(list(settings), [b'K200'])
+
+    def test_invalid_response(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort(responses={b'<K200?>': b'<K200,9,x>\r\n'})
+        with self.assertRaises(config.InvalidConfigString):
+            driver.read_settings([b'K200'])
+        # scanning is resumed anyway
+        self.assertEqual(driver.port.written, b'<I><K200?><H>')
+
+
+class ChunkedPort(FakePort):
+    """Fake port that makes its input available a few bytes per poll"""
+    def __init__(self, incoming, chunk_size):
+        super().__init__()
+        self.pending = bytearray(incoming)
+        self.chunk_size = chunk_size
+
+    @property
+    def in_waiting(self):
+        self.incoming += self.pending[:self.chunk_size]
+        del self.pending[:self.chunk_size]
+        return len(self.incoming)
+
+
+class TestReadConfig(TestCase):
+    def setUp(self):
+        cfg = serial_trigger_config()
+        cfg.preamble.status = config.PreambleStatus.Enabled
+        cfg.preamble.characters = b'^]'
+        self.response = config_response(cfg)
+
+    def test_read_config(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort(responses={b'<K?>': self.response})
+        start = time.monotonic()
+        cfg = driver.read_config()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(
+            cfg.trigger.trigger_mode, config.TriggerMode.SerialData)
+        self.assertEqual(driver.port.written, b'<I><K?><H>')
+
+    def test_chunked_response(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = ChunkedPort(self.response, 3)
+        cfg = driver.read_config(idle_time=0.05)
+        self.assertEqual(cfg.serial_trigger.serial_trigger_character, b'T')
+        self.assertEqual(cfg.preamble.characters, b'^]')
+
+    def test_incomplete_response(self):
+        # without the rest of the settings, the response is read until the
+        # timeout, even after a pause
+        driver = MicroscanDriver('COM1')
+        driver.port = ChunkedPort(b'<K200,4,244><K201,T>\r\n', 3)
+        start = time.monotonic()
+        cfg = driver.read_config(timeout=0.2, idle_time=0.01)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(cfg.serial_trigger.serial_trigger_character, b'T')
+
+    def test_no_response(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort()
+        cfg = driver.read_config(timeout=0.05)
+        self.assertEqual(
+            cfg.to_config_string(),
+            config.MicroscanConfiguration().to_config_string())
+
+    def test_invalid_setting(self):
+        driver = MicroscanDriver('COM1')
+        response = self.response.replace(b'<K200,4,', b'<K200,9,')
+        driver.port = FakePort(responses={b'<K?>': response})
+        with self.assertRaises(config.InvalidConfigString):
+            driver.read_config()
+        # the whole response was read and scanning is resumed
+        self.assertEqual(driver.port.incoming, b'')
+        self.assertEqual(driver.port.written, b'<I><K?><H>')
+
+
+class TestSymbolStream(TestCase):
+    def test_stream(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort(b'12345\r\n\r\n678')
+        symbols = []
+        driver.add_symbol_listener(symbols.append)
+        driver.start_symbol_stream()
+        self.assertTrue(driver.symbol_stream_alive)
+        deadline = time.monotonic() + 5
+        while not symbols and time.monotonic() < deadline:
+            time.sleep(0.01)
+        driver.port.incoming += b'90\r\n'
+        while len(symbols) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        driver.close()
+        self.assertFalse(driver.symbol_stream_alive)
+        self.assertEqual([s.data for s in symbols], ['12345', '67890'])
+        self.assertEqual([s.sequence for s in symbols], [1, 2])
+
+    def test_postamble(self):
+        driver = MicroscanDriver('COM1')
+        driver._config = config.MicroscanConfiguration()
+        driver._config.postamble.status = config.PostambleStatus.Enabled
+        driver._config.postamble.characters = b'^M'
+        driver.port = FakePort(b'12345\r678\r')
+        symbols = []
+        driver.add_symbol_listener(symbols.append)
+        driver.start_symbol_stream()
+        deadline = time.monotonic() + 5
+        while len(symbols) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        driver.close()
+        self.assertEqual([s.data for s in symbols], ['12345', '678'])
+
+    def test_read_error(self):
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort()
+        driver.port.read = None
+        driver.port.incoming += b'1'
+        driver.start_symbol_stream()
+        driver._stream_thread.join(5)
+        self.assertFalse(driver.symbol_stream_alive)
+        self.assertIsInstance(driver.stream_error, TypeError)
+
+    def test_duplicate_filter(self):
+        driver = MicroscanDriver('COM1', suppress_duplicates=60)
+        driver.port = FakePort()
+        symbols = []
+        driver.add_symbol_listener(symbols.append)
+        for line in (b'12345\r\n', b'12345\r\n', b'678\r\n'):
+            driver._publish_symbol(line)
+        self.assertEqual([s.data for s in symbols], ['12345', '678'])
+        self.assertEqual([s.sequence for s in symbols], [1, 2])
+
+        driver._config = serial_trigger_config()
+        driver.port = FakePort(responses={b'<T>': b'678\r\n'})
+        self.assertEqual(driver.read_barcode(), '')
+        self.assertEqual(driver.duplicate_filter.suppressed, 2)
+
+
+class TestLazyConnect(TestCase):
+    def test_read_barcode_queries_trigger_settings(self):
+        driver = MicroscanDriver('COM1')
+        port = FakePort(responses={
+            b'<K200?><K201?><K229?>': b'<K200,4,244><K201,T><K229,>',
+            b'<T>': b'12345\r\n',
+        })
+        driver.attach(port, lazy=True)
+        self.assertEqual(port.written, b'')
+
+        self.assertEqual(driver.read_barcode(), '12345')
+        self.assertEqual(driver.read_barcode(), '12345')
+        self.assertEqual(
+            port.written, b'<I><K200?><K201?><K229?><H><T><T>')
+
+    def test_config_loaded_on_access(self):
+        driver = MicroscanDriver('COM1')
+        port = FakePort(
+            responses={b'<K?>': config_response(serial_trigger_config())})
+        driver.attach(port, lazy=True)
+        self.assertEqual(
+            driver.config.trigger.trigger_mode, config.TriggerMode.SerialData)
+        self.assertIn(b'<K?>', port.written)
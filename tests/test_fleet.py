@@ -0,0 +1,156 @@
+import re
+from unittest import TestCase
+
+from microscan import config
+from microscan import fleet
+from microscan.driver import MicroscanDriver
+
+from .test_driver import FakePort
+
+
+class SimulatedDevicePort(FakePort):
+    """Fake port that stores written settings and answers <Kxxx?> queries
+
+    Settings listed in `stuck` are acknowledged but never changed, like on a
+    reader that rejects the new value.
+    """
+    def __init__(self, cfg, stuck=()):
+        super().__init__()
+        self.settings = {
+            k_code: cfg.get_setting(k_code).to_config_string()
+            for k_code in config.REGISTRY}
+        self.stuck = stuck
+
+    def write(self, data):
+        self.written += data
+        for k_code, query in re.findall(rb'<(K\d+)(\?)?[^>]*>', data):
+            if query:
+                self.incoming += self.settings[k_code]
+        for match in re.finditer(rb'<(K\d+),[^>]*>', data):
+            if match.group(1) not in self.stuck:
+                self.settings[match.group(1)] = match.group(0)
+
+
+def connected_driver(name, port):
+    driver = MicroscanDriver(name)
+    driver.port = port
+    driver._config = config.MicroscanConfiguration()
+    return driver
+
+
+def recipe():
+    cfg = config.MicroscanConfiguration()
+    cfg.trigger.trigger_mode = config.TriggerMode.SerialData
+    cfg.code128.status = config.Code128Status.Enabled
+    return cfg
+
+
+class TestRollout(TestCase):
+    def test_changed_settings(self):
+        self.assertEqual(
+            fleet.changed_settings(config.MicroscanConfiguration(), recipe()),
+            [b'K200', b'K474'])
+
+    def test_device_specific_settings_are_kept(self):
+        port = SimulatedDevicePort(config.MicroscanConfiguration())
+        driver = connected_driver('COM1', port)
+        cfg = recipe()
+        cfg.host_port_connection.baud_rate = 115200
+        cfg.host_protocol.protocol = config.Protocol.PollingModeD
+        report = fleet.rollout([driver], cfg)
+
+        self.assertTrue(report.succeeded)
+        self.assertEqual(report.outcomes[0].changed, [b'K200', b'K474'])
+        self.assertNotIn(b'<K100,', port.written)
+        self.assertNotIn(b'<K140,', port.written)
+        self.assertEqual(port.settings[b'K100'], b'<K100,4,0,0,0>')
+        self.assertEqual(
+            driver.config.host_port_connection.baud_rate,
+            9600)
+
+    def test_full_configuration(self):
+        port = SimulatedDevicePort(config.MicroscanConfiguration())
+        cfg = recipe()
+        cfg.host_port_connection.baud_rate = 115200
+        report = fleet.rollout(
+            [connected_driver('COM1', port)], cfg, exclude=())
+
+        self.assertEqual(
+            report.outcomes[0].changed, [b'K100', b'K200', b'K474'])
+        self.assertEqual(port.settings[b'K100'], b'<K100,8,0,0,0>')
+
+    def test_success(self):
+        ports = [SimulatedDevicePort(config.MicroscanConfiguration())
+                 for _ in range(3)]
+        drivers = [connected_driver('COM%d' % i, p)
+                   for i, p in enumerate(ports)]
+        report = fleet.rollout(drivers, recipe())
+
+        self.assertTrue(report.succeeded)
+        self.assertFalse(report.rolled_back)
+        for outcome, port in zip(report.outcomes, ports):
+            self.assertEqual(outcome.changed, [b'K200', b'K474'])
+            self.assertEqual(port.settings[b'K200'], b'<K200,4,244>')
+            self.assertEqual(
+                outcome.driver.config.trigger.trigger_mode,
+                config.TriggerMode.SerialData)
+
+    def test_unchanged_reader_is_skipped(self):
+        port = SimulatedDevicePort(recipe())
+        driver = connected_driver('COM1', port)
+        driver._config = recipe()
+        report = fleet.rollout([driver], recipe())
+        self.assertTrue(report.succeeded)
+        self.assertEqual(port.written, b'')
+
+    def test_rollback(self):
+        good = SimulatedDevicePort(config.MicroscanConfiguration())
+        bad = SimulatedDevicePort(
+            config.MicroscanConfiguration(), stuck=[b'K474'])
+        drivers = [connected_driver('COM1', good),
+                   connected_driver('COM2', bad)]
+        report = fleet.rollout(drivers, recipe())
+
+        self.assertFalse(report.succeeded)
+        self.assertTrue(report.rolled_back)
+        self.assertEqual(
+            [o.status for o in report.outcomes],
+            [fleet.ROLLED_BACK, fleet.ROLLED_BACK])
+        self.assertEqual(report.outcomes[1].mismatches, [b'K474'])
+        self.assertEqual(good.settings[b'K200'], b'<K200,0,244>')
+        self.assertEqual(
+            drivers[0].config.trigger.trigger_mode,
+            config.TriggerMode.ContinuousRead)
+
+    def test_unchanged_reader_keeps_status(self):
+        unchanged = connected_driver('COM1', SimulatedDevicePort(recipe()))
+        unchanged._config = recipe()
+        bad = SimulatedDevicePort(
+            config.MicroscanConfiguration(), stuck=[b'K474'])
+        report = fleet.rollout(
+            [unchanged, connected_driver('COM2', bad)], recipe())
+
+        self.assertTrue(report.rolled_back)
+        self.assertEqual(
+            [o.status for o in report.outcomes],
+            [fleet.OK, fleet.ROLLED_BACK])
+        self.assertEqual(unchanged.port.written, b'')
+
+    def test_snapshot_failure(self):
+        good = SimulatedDevicePort(config.MicroscanConfiguration())
+        broken = connected_driver('COM2', FakePort())
+        # after a lazy connect, the configuration is read on first access
+        broken._config_pending = True
+
+        def read_config():
+            raise OSError('port gone')
+        broken.read_config = read_config
+        report = fleet.rollout(
+            [connected_driver('COM1', good), broken], recipe())
+
+        self.assertEqual(
+            [o.status for o in report.outcomes],
+            [fleet.ROLLED_BACK, fleet.FAILED])
+        self.assertIsInstance(report.outcomes[1].error, OSError)
+        self.assertEqual(broken.port.written, b'')
+        self.assertEqual(good.settings[b'K200'], b'<K200,0,244>')
@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+from microscan import config
+from microscan.gs1 import GS1Error, GS1Parser
+from microscan.symbols import Symbol
+
+
+FIELDS = {'01': '09501101530003', '10': 'AB-123', '3103': '000750',
+          '17': '250101'}
+
+
+class TestGS1Parser(TestCase):
+    def test_standard(self):
+        parser = GS1Parser()
+        data = '\x1d0109501101530003' '10AB-123\x1d' '3103000750' '17250101'
+        self.assertEqual(parser.parse(data), FIELDS)
+        self.assertEqual(parser.parse(']C1' + data), FIELDS)
+
+    def test_application_record(self):
+        parser = GS1Parser(separator=b',', brackets=True)
+        data = '(01)09501101530003,(10)AB-123,(3103)000750,(17)250101'
+        self.assertEqual(parser.parse(data), FIELDS)
+        parser = GS1Parser(brackets=True)
+        self.assertEqual(parser.parse(data.replace(',', '')), FIELDS)
+        parser = GS1Parser(separator=',')
+        self.assertEqual(
+            parser.parse(data.replace('(', '').replace(')', '')), FIELDS)
+
+    def test_padding(self):
+        parser = GS1Parser(padding=True)
+        data = '0109501101530003' '10AB-123' + ' ' * 14 + '3103000750' \
+            '17250101'
+        self.assertEqual(parser.parse(data), FIELDS)
+
+    def test_from_config(self):
+        cfg = config.MicroscanConfiguration()
+        self.assertEqual(GS1Parser.from_config(cfg).separator, None)
+        code128 = cfg.code128
+        code128.output_format = config.Code128OutputFormat.ApplicationRecord
+        code128.application_record_separator_status = \
+            config.ApplicationRecordSeparatorStatus.Enabled
+        code128.application_record_separator_character = b'|'
+        code128.application_record_brackets = \
+            config.ApplicationRecordBrackets.Enabled
+        parser = GS1Parser.from_config(cfg)
+        self.assertEqual(parser.separator, '|')
+        self.assertTrue(parser.brackets)
+        self.assertFalse(parser.padding)
+
+    def test_escaped_separator(self):
+        code128 = config.MicroscanConfiguration().code128
+        code128.output_format = config.Code128OutputFormat.ApplicationRecord
+        code128.application_record_separator_status = \
+            config.ApplicationRecordSeparatorStatus.Enabled
+        code128.application_record_separator_character = b'^^'
+        parser = GS1Parser.from_config(code128)
+        self.assertEqual(parser.separator, '\x1e')
+        self.assertEqual(
+            parser.parse('10AB12\x1e17250101'),
+            {'10': 'AB12', '17': '250101'})
+
+    def test_errors(self):
+        parser = GS1Parser()
+        for data in ('0109501101', '9', '05123', '30123456789'):
+            with self.assertRaises(GS1Error):
+                parser.parse(data)
+        with self.assertRaises(GS1Error):
+            GS1Parser(brackets=True).parse('(01')
+
+    def test_parse_symbols(self):
+        symbols = [Symbol(1, 0.0, '20AB'), Symbol(2, 0.0, 'NOREAD')]
+        self.assertEqual(
+            [fields for _, fields in GS1Parser().parse_symbols(symbols)],
+            [{'20': 'AB'}, None])
@@ -0,0 +1,113 @@
+from unittest import TestCase
+
+from microscan import config
+from microscan.history import ConfigHistory
+
+
+def drifted_config():
+    cfg = config.MicroscanConfiguration()
+    cfg.code128.status = config.Code128Status.Enabled
+    cfg.trigger.trigger_filter_duration = 100
+    cfg.multisymbol.multisymbol_separator = b'|'
+    return cfg
+
+
+class TestConfigHistory(TestCase):
+    def setUp(self):
+        self.history = ConfigHistory()
+        self.recipe = config.MicroscanConfiguration()
+        for t in range(10):
+            self.history.append('reader1', self.recipe, float(t))
+            self.history.append(
+                'reader2', drifted_config() if t == 5 else self.recipe,
+                float(t))
+
+    def test_length(self):
+        self.assertEqual(len(self.history), 20)
+        self.assertEqual(self.history.reader_names, ['reader1', 'reader2'])
+
+    def test_chronological_order(self):
+        with self.assertRaises(ValueError):
+            self.history.append('reader1', self.recipe, 1.0)
+
+    def test_differs(self):
+        self.assertEqual(
+            self.history.differs(self.recipe, 'code128', 'status'),
+            ['reader2'])
+        self.assertEqual(
+            self.history.differs(
+                self.recipe, 'trigger', 'trigger_filter_duration'),
+            ['reader2'])
+        self.assertEqual(
+            self.history.differs(
+                self.recipe, 'multisymbol', 'multisymbol_separator'),
+            ['reader2'])
+        self.assertEqual(
+            self.history.differs(self.recipe, 'trigger', 'trigger_mode'), [])
+
+    def test_parsed_text_values(self):
+        # defaults are strings, parsed values are bytes
+        recipe = config.MicroscanConfiguration()
+        parsed = config.MicroscanConfiguration.from_config_strings(
+            recipe.to_config_string(separator=b'\n').split(b'\n'))
+        history = ConfigHistory()
+        history.append('reader1', parsed, 1.0)
+        for setting, field in history.columns:
+            self.assertEqual(
+                history.differs(recipe, setting, field), [],
+                (setting, field))
+
+    def test_differs_does_not_store_target(self):
+        recipe = config.MicroscanConfiguration()
+        recipe.multisymbol.multisymbol_separator = b'#'
+        self.assertEqual(
+            self.history.differs(
+                recipe, 'multisymbol', 'multisymbol_separator'),
+            ['reader1', 'reader2'])
+        self.assertNotIn(
+            b'#', self.history.columns[
+                ('multisymbol', 'multisymbol_separator')].values)
+
+    def test_differs_time_range(self):
+        self.assertEqual(
+            self.history.differs(
+                self.recipe, 'code128', 'status', start=6.0), [])
+        self.assertEqual(
+            self.history.differs(
+                self.recipe, 'code128', 'status', start=5.0, stop=6.0),
+            ['reader2'])
+
+    def test_slice(self):
+        sliced = self.history.slice(2.0, 4.0)
+        self.assertEqual(len(sliced), 4)
+        self.assertEqual(sliced.timestamps.tolist(), [2.0, 2.0, 3.0, 3.0])
+        self.assertEqual(
+            sliced.values('code128', 'status'),
+            [config.Code128Status.Disabled] * 4)
+
+    def test_slice_is_independent(self):
+        sliced = self.history.slice(9.0)
+        cfg = config.MicroscanConfiguration()
+        cfg.multisymbol.multisymbol_separator = b'#'
+        sliced.append('reader3', cfg, 10.0)
+        self.assertEqual(
+            sliced.reader_names, ['reader1', 'reader2', 'reader3'])
+        self.assertEqual(self.history.reader_names, ['reader1', 'reader2'])
+        self.assertIsNone(self.history.latest('reader3'))
+        self.assertNotIn(
+            b'#', self.history.columns[
+                ('multisymbol', 'multisymbol_separator')].values)
+
+    def test_snapshot(self):
+        reader, timestamp, cfg = self.history.snapshot(11)
+        self.assertEqual(reader, 'reader2')
+        self.assertEqual(timestamp, 5.0)
+        self.assertEqual(
+            cfg.to_config_string(), drifted_config().to_config_string())
+
+    def test_latest(self):
+        reader, timestamp, cfg = self.history.latest('reader2')
+        self.assertEqual(timestamp, 9.0)
+        self.assertEqual(
+            cfg.to_config_string(), self.recipe.to_config_string())
+        self.assertIsNone(self.history.latest('reader3'))
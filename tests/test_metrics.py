@@ -0,0 +1,150 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from microscan import config
+from microscan.driver import MicroscanDriver
+from microscan.rpc import RPCClient
+from microscan.rpc import RemoteError
+from microscan.tools import metrics
+from microscan.tools.server import InstrumentedRPCServer
+from microscan.tools.server import InstrumentedXMLRPCServer
+
+from .test_driver import FakePort
+
+
+class TestExposition(TestCase):
+    def test_counter(self):
+        registry = metrics.MetricsRegistry()
+        counter = registry.counter('symbols', 'Symbols read', ['device'])
+        counter.labels('COM1').inc()
+        counter.labels(device='COM1').inc(2)
+        lines = registry.expose().decode('utf-8').splitlines()
+        self.assertEqual(lines, [
+            '# HELP symbols_total Symbols read',
+            '# TYPE symbols_total counter',
+            'symbols_total{device="COM1"} 3',
+        ])
+
+    def test_gauge_function(self):
+        registry = metrics.MetricsRegistry()
+        gauge = registry.gauge('depth', 'Queue depth', ['device', 'queue'])
+        gauge.labels('COM"1', 'in').set_function(lambda: 17)
+        lines = registry.expose().decode('utf-8').splitlines()
+        self.assertEqual(lines[-1], 'depth{device="COM\\"1",queue="in"} 17')
+
+    def test_summary(self):
+        registry = metrics.MetricsRegistry()
+        summary = registry.summary(
+            'latency', 'Latency', ['device'], quantiles=(0.5, 0.9))
+        for value in range(1, 11):
+            summary.labels('COM1').observe(float(value))
+        lines = registry.expose().decode('utf-8').splitlines()
+        self.assertEqual(lines[2:], [
+            'latency{device="COM1",quantile="0.5"} 6.0',
+            'latency{device="COM1",quantile="0.9"} 10.0',
+            'latency_sum{device="COM1"} 55.0',
+            'latency_count{device="COM1"} 10',
+        ])
+
+    def test_duplicate_name(self):
+        registry = metrics.MetricsRegistry()
+        registry.counter('a', 'A')
+        with self.assertRaises(ValueError):
+            registry.gauge('a', 'A')
+
+    def test_wrong_labels(self):
+        counter = metrics.Counter('a', 'A', ['device'])
+        with self.assertRaises(ValueError):
+            counter.labels('COM1', 'extra')
+
+    def test_merge_expositions(self):
+        expositions = []
+        for device in ('COM1', 'COM2'):
+            registry = metrics.MetricsRegistry()
+            registry.counter('a', 'A', ['device']).labels(device).inc()
+            registry.gauge('b', 'B', ['device']).labels(device).set(2)
+            expositions.append(registry.expose())
+        self.assertEqual(
+            metrics.merge_expositions(expositions).decode('utf-8'),
+            '# HELP a_total A\n'
+            '# TYPE a_total counter\n'
+            'a_total{device="COM1"} 1\n'
+            'a_total{device="COM2"} 1\n'
+            '# HELP b B\n'
+            '# TYPE b gauge\n'
+            'b{device="COM1"} 2\n'
+            'b{device="COM2"} 2\n')
+
+
+class TestServerMetrics(TestCase):
+    def test_observe_symbol(self):
+        server_metrics = metrics.ServerMetrics()
+        server_metrics.observe_symbol('COM1', '')
+        server_metrics.observe_symbol('COM1', '12345')
+        self.assertEqual(server_metrics.symbols.labels('COM1').get(), 1)
+        self.assertGreater(
+            server_metrics.symbols_per_second.labels('COM1').get(), 0)
+
+    def test_duplicates_suppressed(self):
+        server_metrics = metrics.ServerMetrics()
+        driver = MicroscanDriver('COM1', suppress_duplicates=0.5)
+        driver.port = FakePort()
+        metrics.instrument_driver(server_metrics, 'COM1', driver)
+        driver._publish_symbol(b'12345\r\n')
+        driver._publish_symbol(b'12345\r\n')
+        lines = server_metrics.registry.expose().decode('utf-8').splitlines()
+        self.assertIn(
+            'microscan_duplicates_suppressed_total{device="COM1"} 1', lines)
+
+    def test_streamed_symbols(self):
+        server_metrics = metrics.ServerMetrics()
+        driver = MicroscanDriver('COM1')
+        driver.port = FakePort()
+        metrics.instrument_driver(server_metrics, 'COM1', driver)
+        driver._publish_symbol(b'12345\r\n')
+        driver._publish_symbol(b'67890\r\n')
+        self.assertEqual(server_metrics.symbols.labels('COM1').get(), 2)
+
+
+class TestInstrumentedServer(TestCase):
+    def test_unknown_method_label(self):
+        server_metrics = metrics.ServerMetrics()
+        server = InstrumentedXMLRPCServer(
+            ('localhost', 0), server_metrics, 'COM1', logRequests=False)
+        self.addCleanup(server.server_close)
+        server.register_instance(MicroscanDriver('COM1'))
+        with self.assertRaises(Exception):
+            server._dispatch('no_such_method_%d' % id(self), ())
+        with self.assertRaises(Exception):
+            server._dispatch('read_barcode', ())
+        requests = server_metrics.rpc_requests
+        self.assertEqual(
+            requests.labels('COM1', 'unknown', 'error').get(), 1)
+        self.assertEqual(
+            requests.labels('COM1', 'read_barcode', 'error').get(), 1)
+
+    def test_unix_socket(self):
+        server_metrics = metrics.ServerMetrics()
+        driver = MicroscanDriver('COM1')
+        driver._config = config.MicroscanConfiguration()
+        driver.port = FakePort()
+        driver.port.incoming += b'0\r\n12345\r\n'
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'microscan.sock')
+        server = InstrumentedRPCServer(path, driver, server_metrics, 'COM1')
+        threading.Thread(target=server.serve_forever).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with RPCClient(path, timeout=5) as client:
+            self.assertEqual(client.call('read_barcode'), '12345')
+            with self.assertRaises(RemoteError):
+                client.call('no_such_method')
+
+        requests = server_metrics.rpc_requests
+        self.assertEqual(
+            requests.labels('COM1', 'read_barcode', 'ok').get(), 1)
+        self.assertEqual(requests.labels('COM1', 'unknown', 'error').get(), 1)
+        self.assertEqual(server_metrics.symbols.labels('COM1').get(), 1)
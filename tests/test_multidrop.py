@@ -0,0 +1,214 @@
+import os
+import select
+import threading
+import time
+from unittest import TestCase
+
+import serial
+
+from microscan import multidrop
+from microscan import polling
+
+from .test_driver import FakePort
+
+
+class SimulatedReaders:
+    """Readers on a multidrop bus, answering the host's messages
+
+    `symbols` maps addresses to lists of symbols waiting to be sent.
+    """
+    def __init__(self, symbols):
+        self.symbols = {a: list(s) for a, s in symbols.items()}
+        self.commands = {a: [] for a in symbols}
+        self.polls = []
+        self._by_poll = {
+            multidrop.poll_address(a): a for a in symbols}
+        self._by_select = {
+            multidrop.select_address(a): a for a in symbols}
+        self._selected = None
+        self._buffer = b''
+
+    def _frame(self, address):
+        return polling.frame_message(self.symbols[address][0])
+
+    def handle(self, data):
+        """Process bytes from the host, returns the answer"""
+        self._buffer += data
+        answer = b''
+        while self._buffer:
+            buffer = self._buffer
+            if self._selected is not None and buffer[:1] == polling.STX:
+                end = buffer.find(polling.ETX)
+                if end < 0 or len(buffer) < end + 2:
+                    break
+                self.commands[self._selected].append(buffer[1:end])
+                self._selected = None
+                answer += polling.ACK
+                self._buffer = buffer[end + 2:]
+            elif buffer[:1] == polling.RES:
+                if len(buffer) < 3:
+                    break
+                address = buffer[1:2]
+                if address in self._by_poll:
+                    reader = self._by_poll[address]
+                    self.polls.append(reader)
+                    if self.symbols[reader]:
+                        answer += self._frame(reader)
+                    else:
+                        answer += polling.RES
+                elif address in self._by_select:
+                    self._selected = self._by_select[address]
+                    answer += polling.ACK
+                self._buffer = buffer[3:]
+            elif len(buffer) >= 2 and buffer[:1] in self._by_poll:
+                reader = self._by_poll[buffer[:1]]
+                if buffer[1:2] == polling.ACK:
+                    self.symbols[reader].pop(0)
+                elif buffer[1:2] == polling.NAK:
+                    answer += self._frame(reader)
+                self._buffer = buffer[2:]
+            elif len(buffer) < 2:
+                break
+            else:
+                # a message for a reader that is not on the bus
+                self._buffer = buffer[1:]
+        return answer
+
+
+class SimulatedBusPort(FakePort):
+    """In-memory port connected to SimulatedReaders"""
+    def __init__(self, readers):
+        super().__init__()
+        self.readers = readers
+
+    def write(self, data):
+        self.written += data
+        self.incoming += self.readers.handle(data)
+
+
+class PtyBus:
+    """SimulatedReaders answering on the master side of a pseudo terminal"""
+    def __init__(self, readers):
+        self.readers = readers
+        self.master, self.slave = os.openpty()
+        self.portname = os.ttyname(self.slave)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self.master], [], [], 0.05)
+            if readable:
+                answer = self.readers.handle(os.read(self.master, 1024))
+                if answer:
+                    os.write(self.master, answer)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out')
+        time.sleep(0.01)
+
+
+class TestAddresses(TestCase):
+    def test_addresses(self):
+        self.assertEqual(multidrop.poll_address(1), b'\x1c')
+        self.assertEqual(multidrop.select_address(1), b'\x1d')
+        self.assertEqual(multidrop.poll_address(50), b'\x7e')
+        with self.assertRaises(ValueError):
+            multidrop.poll_address(51)
+        with self.assertRaises(ValueError):
+            multidrop.MultidropBus(FakePort(), [0])
+
+
+class TestScheduler(TestCase):
+    def test_round_robin(self):
+        readers = SimulatedReaders({
+            1: [b'A%d' % i for i in range(3)],
+            2: [b'B%d' % i for i in range(3)],
+            3: []})
+        bus = multidrop.MultidropBus(SimulatedBusPort(readers), [1, 2, 3])
+        for _ in range(6):
+            bus.step()
+        # readers with data are polled in turn, the idle reader once
+        self.assertEqual(readers.polls, [1, 2, 3, 1, 2, 1])
+        self.assertEqual(bus[1].stats.symbols, 3)
+        self.assertEqual(bus[2].stats.symbols, 2)
+        # the last symbol of reader 2 was not acknowledged yet
+        self.assertEqual(readers.symbols[2], [b'B2'])
+
+    def test_idle_backoff(self):
+        readers = SimulatedReaders({1: [], 2: []})
+        bus = multidrop.MultidropBus(
+            SimulatedBusPort(readers), [1, 2], max_poll_interval=0.04,
+            min_poll_interval=0.01)
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            bus.step()
+        self.assertEqual(bus[1].poll_interval, 0.04)
+        # idle readers are polled about every max_poll_interval
+        self.assertLess(bus[1].stats.polls, 25)
+        self.assertLess(bus[1].stats.max_poll_gap, 0.1)
+
+    def test_retransmit_and_timeout(self):
+        readers = SimulatedReaders({1: [b'A']})
+        port = SimulatedBusPort(readers)
+        bus = multidrop.MultidropBus(port, [1, 2], response_timeout=0.01)
+        corrupt = [True]
+
+        def handle(data, handle=readers.handle):
+            answer = handle(data)
+            if corrupt and answer[:1] == polling.STX:
+                corrupt.pop()
+                answer = answer[:-1] + b'\x00'
+            return answer
+        readers.handle = handle
+        self.assertEqual(bus.poll(1), b'A')
+        self.assertEqual(bus[1].stats.retransmits, 1)
+        self.assertIsNone(bus.poll(2))
+        self.assertEqual(bus[2].stats.timeouts, 1)
+
+
+class TestPtyBus(TestCase):
+    def setUp(self):
+        self.readers = SimulatedReaders({
+            1: [b'A%d' % i for i in range(5)],
+            2: [b'B%d' % i for i in range(3)],
+            50: []})
+        self.pty = PtyBus(self.readers)
+        self.addCleanup(self.pty.close)
+        self.port = serial.Serial(self.pty.portname, 9600, timeout=1)
+        self.addCleanup(self.port.close)
+        self.bus = multidrop.MultidropBus(self.port, [1, 2, 3, 50])
+
+    def test_symbols(self):
+        received = []
+        self.bus[1].add_symbol_listener(received.append)
+        self.bus.start()
+        self.addCleanup(self.bus.stop)
+        wait_until(lambda: len(received) == 5)
+        self.assertEqual([s.data for s in received],
+                         ['A0', 'A1', 'A2', 'A3', 'A4'])
+        self.assertEqual(
+            [self.bus[2].read_barcode() for _ in range(3)],
+            ['B0', 'B1', 'B2'])
+        self.assertEqual(self.bus[50].read_barcode(timeout=0.05), '')
+        self.bus.stop()
+        self.assertEqual(self.readers.symbols[1], [])
+        self.assertGreater(self.bus[3].stats.timeouts, 0)
+        self.assertIsNone(self.bus.error)
+
+    def test_command(self):
+        self.bus[2].write(b'<K200,4>')
+        self.assertEqual(self.readers.commands[2], [b'<K200,4>'])
+        with self.assertRaises(polling.PollingError):
+            self.bus[3].write(b'<K200,4>')
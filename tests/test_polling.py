@@ -0,0 +1,118 @@
+import time
+from unittest import TestCase
+
+from microscan import polling
+from microscan.driver import MicroscanDriver
+
+from .test_driver import FakePort
+
+
+class PollingDevicePort(FakePort):
+    """Fake port simulating a reader in Polling Mode D
+
+    Answers each REQ with the next queued symbol or RES, and NAK with a
+    retransmission. The first `corrupt` transmissions have a wrong LRC.
+    """
+    def __init__(self, symbols, corrupt=0):
+        super().__init__()
+        self.symbols = list(symbols)
+        self.corrupt = corrupt
+        self.acks = 0
+
+    def _send_symbol(self):
+        frame = polling.frame_message(self.symbols[0])
+        if self.corrupt:
+            self.corrupt -= 1
+            frame = frame[:-1] + bytes([frame[-1] ^ 0xff])
+        self.incoming += frame
+
+    def write(self, data):
+        self.written += data
+        for byte in data:
+            byte = bytes([byte])
+            if byte == polling.ACK:
+                self.symbols.pop(0)
+                self.acks += 1
+            elif byte == polling.NAK:
+                self._send_symbol()
+            elif byte == polling.REQ:
+                if self.symbols:
+                    self._send_symbol()
+                else:
+                    self.incoming += polling.RES
+
+
+def polling_driver(port):
+    driver = MicroscanDriver('COM1')
+    driver.port = port
+    return driver
+
+
+class TestFraming(TestCase):
+    def test_frame(self):
+        frame = polling.frame_message(b'AB')
+        self.assertEqual(frame, b'\x02AB\x03' + bytes([0x41 ^ 0x42 ^ 0x03]))
+
+    def test_parser(self):
+        parser = polling.FrameParser()
+        data = (
+            polling.RES + polling.frame_message(b'123') + b'\r\n' +
+            polling.frame_message(b'456')[:-1] + b'\x00')
+        self.assertEqual(parser.feed(data[:6]), [(polling.EMPTY, None)])
+        self.assertEqual(parser.feed(data[6:]), [
+            (polling.DATA, b'123'), (polling.CORRUPT, b'456')])
+
+
+class TestPollingModeD(TestCase):
+    def test_poll(self):
+        port = PollingDevicePort([b'111', b'222'])
+        transport = polling.PollingModeD(polling_driver(port))
+        self.assertEqual(transport.poll(), '111')
+        self.assertEqual(port.written, polling.REQ)
+        self.assertEqual(transport.poll(), '222')
+        # the ACK is sent together with the next poll
+        self.assertEqual(port.written, polling.REQ + polling.ACK + polling.REQ)
+        self.assertIsNone(transport.poll())
+        self.assertEqual(port.acks, 2)
+        transport.flush()
+        self.assertEqual(transport.stats.symbols, 2)
+        self.assertEqual(transport.stats.polls, 3)
+
+    def test_retransmit(self):
+        port = PollingDevicePort([b'111'], corrupt=2)
+        transport = polling.PollingModeD(polling_driver(port))
+        self.assertEqual(transport.poll(), '111')
+        self.assertEqual(transport.stats.retransmits, 2)
+        self.assertEqual(port.written, polling.REQ + polling.NAK * 2)
+
+        port = PollingDevicePort([b'111'], corrupt=5)
+        transport = polling.PollingModeD(polling_driver(port), retries=2)
+        with self.assertRaises(polling.PollingError):
+            transport.poll()
+
+    def test_timeout(self):
+        transport = polling.PollingModeD(
+            polling_driver(FakePort()), response_timeout=0.01)
+        with self.assertRaises(polling.PollingError):
+            transport.poll()
+        self.assertEqual(transport.stats.timeouts, 1)
+
+    def test_background_polling(self):
+        port = PollingDevicePort([b'%03d' % i for i in range(50)])
+        driver = polling_driver(port)
+        symbols = []
+        driver.add_symbol_listener(symbols.append)
+        transport = polling.PollingModeD(driver)
+        transport.start()
+        deadline = time.monotonic() + 5
+        while len(symbols) < 50 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        transport.stop()
+        self.assertEqual(
+            [s.data for s in symbols], ['%03d' % i for i in range(50)])
+        self.assertEqual(port.acks, 50)
+        self.assertEqual(transport.stats.symbols, 50)
+        # at 9600 baud, each 3 byte symbol takes 8 characters on the line
+        self.assertAlmostEqual(
+            transport.stats.theoretical_symbols_per_second, 120)
+        self.assertIn('120.0/s theoretical', transport.stats.summary())
@@ -0,0 +1,65 @@
+from unittest import TestCase
+
+from microscan.driver import MS3Driver
+from microscan.readrate import parse_read_rate
+from microscan.trace import OUTBOUND, TraceRecorder
+
+from .test_driver import FakePort
+
+
+class TestParse(TestCase):
+    def test_parse(self):
+        update = parse_read_rate(b'087% 12345\r\n', 1.0)
+        self.assertEqual(tuple(update), (1.0, 87, True, '12345'))
+        update = parse_read_rate(b' 42\r\n', 1.0)
+        self.assertEqual(tuple(update), (1.0, 42, False, ''))
+        self.assertIsNone(parse_read_rate(b'NOREAD'))
+
+
+class TestReadRateTest(TestCase):
+    def setUp(self):
+        self.driver = MS3Driver('COM1')
+        self.driver.port = FakePort(responses={
+            b'<Cp>': b'050%\r\n075% 12345\r\n', b'<C>': b'12\r\n'})
+
+    def test_percent(self):
+        test = self.driver.start_read_rate_test(percent=True)
+        self.assertEqual(self.driver.port.written, b'<Cp>')
+        first = test.next_update(5)
+        self.assertEqual((first.value, first.percent), (50, True))
+        self.driver.port.incoming += b'100% 12345\r\n'
+        updates = []
+        for update in test:
+            updates.append(update)
+            if len(updates) == 2:
+                self.driver.stop_read_rate_test()
+        self.assertEqual(
+            [(u.value, u.data) for u in updates], [(75, '12345'),
+                                                   (100, '12345')])
+        self.assertEqual(test.latest, updates[-1])
+        self.assertFalse(test.running)
+        self.assertEqual(self.driver.port.written, b'<Cp><J>')
+        self.assertIsNone(test.next_update(0))
+
+    def test_symbol_stream_paused(self):
+        self.driver.start_symbol_stream()
+        test = self.driver.start_read_rate_test()
+        self.assertFalse(self.driver.symbol_stream_alive)
+        self.assertEqual(test.next_update(5).value, 12)
+        self.driver.close()
+        self.assertFalse(test.running)
+        self.assertEqual(self.driver.port.written, b'<C><J>')
+
+    def test_reads_hold_lock(self):
+        recorder = TraceRecorder()
+        self.driver.add_trace_hook(recorder)
+        with self.driver._lock:
+            test = self.driver.start_read_rate_test()
+            # the report is not read while another operation runs
+            self.assertIsNone(test.next_update(0.05))
+        self.assertEqual(test.next_update(5).value, 12)
+        self.driver.stop_read_rate_test()
+        self.assertEqual(
+            [event.operation for event in recorder.events
+             if event.direction == OUTBOUND],
+            ['start_read_rate_test', 'stop_read_rate_test'])
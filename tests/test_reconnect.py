@@ -0,0 +1,114 @@
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import serial
+
+from microscan import config
+from microscan.driver import MicroscanDriver
+from microscan.tools import metrics
+
+from .test_fleet import SimulatedDevicePort
+
+
+class DevicePort(SimulatedDevicePort):
+    """Simulated device that also answers <K?> and can be unplugged"""
+    def __init__(self, cfg):
+        super().__init__(cfg)
+        self.unplugged = False
+
+    @property
+    def in_waiting(self):
+        if self.unplugged:
+            raise serial.SerialException('device disconnected')
+        return len(self.incoming)
+
+    def write(self, data):
+        if self.unplugged:
+            raise serial.SerialException('device disconnected')
+        super().write(data)
+        if b'<K?>' in data:
+            self.incoming += b'\r\n'.join(self.settings.values())
+
+
+class TestReconnect(TestCase):
+    def setUp(self):
+        self.port = DevicePort(config.MicroscanConfiguration())
+        self.driver = MicroscanDriver('COM1', auto_reconnect=True)
+        self.patcher = patch('serial.Serial')
+        self.serial = self.patcher.start()
+        self.addCleanup(self.patcher.stop)
+        self.serial.side_effect = [self.port]
+        self.driver.connect()
+
+    def test_retry_after_error(self):
+        new_port = DevicePort(config.MicroscanConfiguration())
+        self.serial.side_effect = [new_port]
+        self.port.unplugged = True
+
+        settings = self.driver.read_settings([b'K201'])
+        self.assertEqual(settings[b'K201'].serial_trigger_character, b'^')
+        self.assertEqual(self.driver.reconnects, 1)
+        self.assertIs(self.driver.port, new_port)
+        # the configuration was confirmed without a full dump
+        self.assertNotIn(b'<K?>', new_port.written)
+        self.assertIn(b'<K200?>', new_port.written)
+        self.assertEqual(
+            self.serial.call_args_list[0], self.serial.call_args_list[1])
+
+    def test_changed_configuration(self):
+        cfg = config.MicroscanConfiguration()
+        cfg.trigger.trigger_mode = config.TriggerMode.SerialData
+        new_port = DevicePort(cfg)
+        self.serial.side_effect = [new_port]
+        self.driver.reconnect()
+        self.assertIn(b'<K?>', new_port.written)
+        self.assertEqual(
+            self.driver.config.trigger.trigger_mode,
+            config.TriggerMode.SerialData)
+
+    def test_backoff(self):
+        new_port = DevicePort(config.MicroscanConfiguration())
+        error = serial.SerialException('No such file or directory')
+        self.serial.side_effect = [error, error, new_port]
+        start = time.monotonic()
+        self.driver.reconnect()
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertIs(self.driver.port, new_port)
+
+    def test_timeout(self):
+        self.serial.side_effect = serial.SerialException('gone')
+        with self.assertRaises(serial.SerialException):
+            self.driver.reconnect(timeout=0.2)
+        self.assertEqual(self.driver.reconnects, 0)
+
+    def test_no_auto_reconnect(self):
+        self.driver.auto_reconnect = False
+        self.port.unplugged = True
+        with self.assertRaises(serial.SerialException):
+            self.driver.read_settings([b'K201'])
+
+    def test_symbol_stream_resumes(self):
+        new_port = DevicePort(config.MicroscanConfiguration())
+        self.serial.side_effect = [new_port]
+        symbols = []
+        self.driver.add_symbol_listener(symbols.append)
+        self.driver.start_symbol_stream()
+        self.port.unplugged = True
+        deadline = time.monotonic() + 5
+        while self.driver.reconnects == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        new_port.incoming += b'12345\r\n'
+        while not symbols and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.driver.stop_symbol_stream()
+        self.assertEqual([s.data for s in symbols], ['12345'])
+
+    def test_metrics(self):
+        server_metrics = metrics.ServerMetrics()
+        metrics.instrument_driver(server_metrics, 'COM1', self.driver)
+        new_port = DevicePort(config.MicroscanConfiguration())
+        self.serial.side_effect = [new_port]
+        self.driver.reconnect()
+        self.assertEqual(
+            server_metrics.reconnects.labels('COM1').get(), 1)
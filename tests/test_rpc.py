@@ -0,0 +1,137 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from microscan import config
+from microscan import rpc
+from microscan.driver import MicroscanDriver
+
+from .test_driver import FakePort
+
+
+class TestCodec(TestCase):
+    def test_round_trip(self):
+        value = [None, True, False, -5, 2 ** 40, 1.5, 'abc', b'\x00\xff',
+                 {'a': [1, 2], 3: {}}]
+        self.assertEqual(rpc.decode_value(rpc.encode_value(value))[0], value)
+
+    def test_settings(self):
+        setting = config.Trigger(trigger_mode=config.TriggerMode.SerialData)
+        decoded, _ = rpc.decode_value(rpc.encode_value(setting))
+        self.assertEqual(decoded.trigger_mode, config.TriggerMode.SerialData)
+
+        cfg = config.MicroscanConfiguration()
+        cfg.code128.status = config.Code128Status.Enabled
+        decoded, _ = rpc.decode_value(rpc.encode_value(cfg))
+        self.assertEqual(decoded.to_config_string(), cfg.to_config_string())
+
+    def test_errors(self):
+        with self.assertRaises(rpc.RPCError):
+            rpc.encode_value(object())
+        with self.assertRaises(rpc.RPCError):
+            rpc.decode_value(rpc.encode_value('abc')[:-1])
+        with self.assertRaises(rpc.RPCError):
+            rpc.decode_value(b'i\x00')
+
+    def test_read_frames(self):
+        data = rpc.frame(b'abc') + rpc.frame(b'') + rpc.frame(b'de')
+        buffer = bytearray(data[:-1])
+        self.assertEqual(rpc.read_frames(buffer), [b'abc', b''])
+        buffer += data[-1:]
+        self.assertEqual(rpc.read_frames(buffer), [b'de'])
+        self.assertEqual(buffer, b'')
+
+
+class TestServer(TestCase):
+    def setUp(self):
+        self.driver = MicroscanDriver('COM1')
+        self.driver._config = config.MicroscanConfiguration()
+        self.driver.port = FakePort(responses={
+            b'<K200?>': b'<K200,4,244>\r\n',
+        })
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'microscan.sock')
+        self.server = rpc.RPCServer(path, self.driver)
+        threading.Thread(target=self.server.serve_forever).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = rpc.RPCClient(path, timeout=5)
+        self.addCleanup(self.client.close)
+
+    def test_call(self):
+        settings = self.client.call('read_settings', [b'K200'])
+        self.assertEqual(
+            settings[b'K200'].trigger_mode, config.TriggerMode.SerialData)
+        self.driver.port.incoming += b'0\r\n12345\r\n'
+        self.assertEqual(self.client.call('read_barcode'), '12345')
+
+    def test_pipeline(self):
+        self.driver.port.incoming += b'0\r\n1\r\n'
+        results = self.client.pipeline(
+            [('write', [b'<A>']), ('read_barcode', ()), ('write', [b'<B>'])])
+        self.assertEqual(results, [None, '1', None])
+        self.assertEqual(self.driver.port.written, b'<A><B>')
+
+    def test_remote_error(self):
+        with self.assertRaises(rpc.RemoteError) as cm:
+            self.client.pipeline([('write', [b'<A>']), ('missing', ())])
+        self.assertEqual(cm.exception.type_name, 'AttributeError')
+        # the connection is still usable and requests were still executed
+        self.assertEqual(self.driver.port.written, b'<A>')
+        with self.assertRaises(rpc.RemoteError):
+            self.client.call('_port_write', b'<H>')
+        self.assertIsNone(self.client.call('write', b'<H>'))
+
+    def test_short_frame(self):
+        raw = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(raw.close)
+        raw.settimeout(5)
+        raw.connect(self.server.server_address)
+        buffer = bytearray()
+
+        def receive():
+            payloads = rpc.read_frames(buffer)
+            while not payloads:
+                buffer.extend(raw.recv(65536))
+                payloads = rpc.read_frames(buffer)
+            return payloads
+
+        raw.sendall(rpc.frame(b'ab'))
+        payload, = receive()
+        self.assertEqual(payload[4:5], bytes([rpc.ERROR]))
+        # the handler thread is still serving the connection
+        raw.sendall(rpc.frame(
+            b'\x01\x00\x00\x00' + rpc.encode_value(['write', [b'<A>']])))
+        payload, = receive()
+        self.assertEqual(payload[:5], b'\x01\x00\x00\x00' + bytes([rpc.OK]))
+        self.assertEqual(self.driver.port.written, b'<A>')
+
+
+class Sleeper:
+    def sleep(self, seconds):
+        time.sleep(seconds)
+        return seconds
+
+
+class TestClientTimeout(TestCase):
+    def test_timeout_closes_connection(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'microscan.sock')
+        server = rpc.RPCServer(path, Sleeper())
+        threading.Thread(target=server.serve_forever).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = rpc.RPCClient(path, timeout=0.05)
+        self.addCleanup(client.close)
+
+        with self.assertRaises(socket.timeout):
+            client.call('sleep', 0.2)
+        time.sleep(0.3)
+        # the late response must not be taken for the response to this call
+        with self.assertRaises(rpc.RPCError):
+            client.call('sleep', 0)
@@ -0,0 +1,111 @@
+import multiprocessing
+from unittest import TestCase
+
+from microscan.symbols import DuplicateFilter, LineSplitter
+from microscan.symbols import Symbol, SymbolRing, SymbolRingReader
+
+
+def symbol(n):
+    return Symbol(n, 1000.0 + n, 'SYM%d' % n)
+
+
+def read_in_process(name, queue):
+    with SymbolRingReader(name, from_oldest=True) as reader:
+        queue.put([s.data for s in reader.read()])
+
+
+class TestSymbolRing(TestCase):
+    def setUp(self):
+        self.ring = SymbolRing(capacity=4, slot_size=32)
+        self.addCleanup(self.ring.close)
+        self.reader = SymbolRingReader(self.ring.name)
+        self.addCleanup(self.reader.close)
+
+    def test_read(self):
+        self.assertEqual(self.reader.read(), [])
+        self.ring(symbol(1))
+        self.ring(symbol(2))
+        self.assertEqual(self.reader.read(), [symbol(1), symbol(2)])
+        self.assertEqual(self.reader.read(), [])
+        self.assertEqual(self.ring.publish(symbol(3)), 3)
+        self.assertEqual(self.reader.read(), [symbol(3)])
+        self.assertEqual(self.reader.lost, 0)
+
+    def test_overrun(self):
+        for n in range(1, 11):
+            self.ring(symbol(n))
+        self.assertEqual(
+            [s.sequence for s in self.reader.read()], [7, 8, 9, 10])
+        self.assertEqual(self.reader.lost, 6)
+
+    def test_from_oldest(self):
+        for n in range(1, 4):
+            self.ring(symbol(n))
+        with SymbolRingReader(self.ring.name) as latest:
+            self.assertEqual(latest.read(), [])
+        with SymbolRingReader(self.ring.name, from_oldest=True) as oldest:
+            self.assertEqual(len(oldest.read()), 3)
+
+    def test_truncated(self):
+        self.ring(Symbol(1, 0.0, 'X' * 20))
+        self.assertEqual(self.reader.read()[0].data, 'X' * 6)
+
+    def test_other_process(self):
+        self.ring(symbol(1))
+        self.ring(symbol(2))
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        process = context.Process(
+            target=read_in_process, args=(self.ring.name, queue))
+        process.start()
+        self.assertEqual(queue.get(timeout=30), ['SYM1', 'SYM2'])
+        process.join()
+        # the consumer exiting does not remove the ring
+        with SymbolRingReader(self.ring.name, from_oldest=True) as reader:
+            self.assertEqual(len(reader.read()), 2)
+
+
+class TestDuplicateFilter(TestCase):
+    def test_window(self):
+        f = DuplicateFilter(window=0.5, resolution=0.1)
+        self.assertFalse(f.is_duplicate('A', 100.0))
+        self.assertFalse(f.is_duplicate('B', 100.1))
+        self.assertTrue(f.is_duplicate('A', 100.4))
+        # the repeat restarted the window of A
+        self.assertTrue(f.is_duplicate('A', 100.8))
+        self.assertFalse(f.is_duplicate('B', 100.7))
+        self.assertFalse(f.is_duplicate('A', 101.4))
+        self.assertEqual((f.passed, f.suppressed), (4, 2))
+
+    def test_expiry(self):
+        f = DuplicateFilter(window=1.0, resolution=0.1)
+        for n in range(100):
+            f.is_duplicate('SYM%d' % n, 100.0 + n * 0.05)
+        self.assertLessEqual(len(f), 21)
+        # a jump past the whole wheel expires everything
+        self.assertFalse(f.is_duplicate('SYM99', 1000.0))
+        self.assertEqual(len(f), 1)
+
+    def test_max_entries(self):
+        f = DuplicateFilter(window=10.0, max_entries=3)
+        for data in 'ABCD':
+            f.is_duplicate(data, 100.0)
+        self.assertEqual(len(f), 3)
+        self.assertFalse(f.is_duplicate('A', 100.0))
+        self.assertTrue(f.is_duplicate('D', 100.0))
+
+    def test_clock_backwards(self):
+        f = DuplicateFilter(window=0.5)
+        f.is_duplicate('A', 100.0)
+        self.assertTrue(f.is_duplicate('A', 50.0))
+
+
+class TestLineSplitter(TestCase):
+    def test_feed(self):
+        splitter = LineSplitter(b'\r\n')
+        self.assertEqual(splitter.feed(b'123\r\n45'), [b'123'])
+        self.assertEqual(splitter.feed(b'6\r'), [])
+        self.assertEqual(splitter.feed(b'\n\r\n'), [b'456', b''])
+        splitter.feed(b'78')
+        splitter.reset()
+        self.assertEqual(splitter.pending, b'')
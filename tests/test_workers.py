@@ -0,0 +1,111 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from microscan.capture import read_capture
+from microscan.driver import MicroscanDriver
+from microscan.tools.server import SupervisorRPC
+from microscan.trace import INBOUND
+from microscan.workers import Supervisor, WorkerError
+
+from .test_driver import FakePort
+
+
+class FakeDriver(MicroscanDriver):
+    """Driver with a fake port that has two symbols waiting"""
+    def connect(self):
+        name = self.portname.encode('ascii')
+        self.attach(FakePort(b'%s-1\r\n%s-2\r\n' % (name, name)), lazy=True)
+
+    def echo(self, value):
+        return value
+
+    def crash(self):
+        os._exit(3)
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out')
+        time.sleep(0.02)
+
+
+class TestSupervisor(TestCase):
+    def setUp(self):
+        self.supervisor = Supervisor(
+            ['A', 'B'], driver_factory=FakeDriver, stream_symbols=True,
+            restart_delay=0.1)
+        self.supervisor.start()
+        self.addCleanup(self.supervisor.stop)
+
+    def test_call(self):
+        self.assertEqual(self.supervisor.call('A', 'echo', [1, 2]), [1, 2])
+        with self.assertRaises(TypeError):
+            self.supervisor.call('A', 'echo')
+        with self.assertRaises(AttributeError):
+            self.supervisor.call('A', '_port_write', b'<H>')
+        with self.assertRaises(WorkerError):
+            self.supervisor.call('C', 'echo', 1)
+
+    def test_symbols(self):
+        wait_until(lambda: len(self.supervisor.symbols()) == 4)
+        symbols = self.supervisor.symbols()
+        self.assertEqual(
+            sorted(symbol.data for _, _, symbol in symbols),
+            ['A-1', 'A-2', 'B-1', 'B-2'])
+        self.assertEqual([s[0] for s in symbols], [1, 2, 3, 4])
+        self.assertEqual(len(self.supervisor.symbols(after=3)), 1)
+
+    def test_restart(self):
+        with self.assertRaises(WorkerError):
+            self.supervisor.call('A', 'crash')
+        # other workers are not affected
+        self.assertEqual(self.supervisor.call('B', 'echo', 1), 1)
+        wait_until(lambda: self.supervisor.status()['A']['restarts'] == 1)
+        wait_until(lambda: self.supervisor.status()['A']['alive'])
+        self.assertEqual(self.supervisor.call('A', 'echo', 2), 2)
+        self.assertEqual(self.supervisor.status()['B']['restarts'], 0)
+
+    def test_rpc_routing(self):
+        rpc = SupervisorRPC(self.supervisor)
+        self.assertEqual(rpc._dispatch('devices', ()), ['A', 'B'])
+        self.assertEqual(rpc._dispatch('B.echo', ('x', )), 'x')
+        wait_until(lambda: len(rpc._dispatch('symbols', (3, ))) == 1)
+        with self.assertRaises(Exception):
+            rpc._dispatch('C.echo', ('x', ))
+
+
+class TestWorkerMetrics(TestCase):
+    def test_metrics_and_capture(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        capture = {
+            device: os.path.join(directory.name, device)
+            for device in ('A', 'B')}
+        supervisor = Supervisor(
+            ['A', 'B'], driver_factory=FakeDriver, stream_symbols=True,
+            metrics_interval=0.05, capture=capture)
+        with supervisor:
+            self.assertEqual(supervisor.call('A', 'echo', 1), 1)
+            expected = [
+                'microscan_rpc_requests_total'
+                '{device="A",method="echo",status="ok"} 1',
+                'microscan_symbols_total{device="A"} 2',
+                'microscan_symbols_total{device="B"} 2',
+            ]
+
+            def reported():
+                lines = supervisor.metrics().decode('utf-8').splitlines()
+                return all(line in lines for line in expected)
+            wait_until(reported)
+            lines = supervisor.metrics().decode('utf-8').splitlines()
+            self.assertEqual(
+                lines.count('# TYPE microscan_symbols_total counter'), 1)
+
+        inbound = b''.join(
+            event.data for event in read_capture(capture['B'])
+            if event.direction == INBOUND)
+        self.assertEqual(inbound, b'B-1\r\nB-2\r\n')